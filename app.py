@@ -1,82 +1,124 @@
+import os
+import click
 from flask import Flask
 from flask_login import LoginManager
-from flask_migrate import Migrate # <--- IMPORTAÇÃO NOVA
+from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from models import db, Igreja, Usuario
-import os
 from utils.saas import configurar_isolamento_saas
+from utils.auditoria import auditoria
+from utils.sessao import carregar_usuario_sessao, configurar_cache_sessao
+from utils.autenticacao import configurar_autenticacao
+from utils.instrumentacao import configurar_instrumentacao
+from services.dashboard_service import configurar_cache_dashboard
+from services.verificacao_service import configurar_cache_status
+from services.financeiro_service import configurar_cache_dizimistas
+from utils.credencial import configurar_credencial
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Inicializações
-db.init_app(app)
-migrate = Migrate(app, db) # <--- INICIALIZAÇÃO DA MIGRAÇÃO
-
-# Ativa o "Guarda-Costas" SaaS
-with app.app_context():
-    configurar_isolamento_saas(db.session)
-
+# Extensões criadas uma vez e ligadas a cada app pela fábrica
+migrate = Migrate()
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 
+
 @login_manager.user_loader
 def load_user(user_id):
-    return Usuario.query.get(int(user_id))
-
-# --- REGISTRO DOS BLUEPRINTS ---
-from routes.auth import auth_bp
-from routes.dashboard import dashboard_bp
-from routes.membros import membros_bp
-from routes.financeiro import financeiro_bp
-from routes.usuarios import usuarios_bp
-from routes.configuracoes import config_bp
-
-app.register_blueprint(auth_bp)
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(membros_bp)
-app.register_blueprint(financeiro_bp)
-app.register_blueprint(usuarios_bp)
-app.register_blueprint(config_bp)
-
-# --- INICIALIZAÇÃO DE BANCO E SEED ---
-# ATENÇÃO: Removemos o db.create_all() automático!
-# O banco agora é gerenciado pelos comandos 'flask db ...'
-# Mantemos apenas a criação de pastas e o Seed (que só roda se o banco existir)
+    # Cache por processo (utils/sessao.py): evita ir ao banco em toda requisição
+    return carregar_usuario_sessao(int(user_id))
+
+
+def create_app(config_class=Config):
+    """
+    Fábrica da aplicação. Não toca no banco nem no disco: subir um worker do
+    gunicorn ou rodar 'flask db ...' não paga seed nem criação de pastas
+    (isso agora é 'flask seed').
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    if app.config.get('PROXY_SALTOS'):
+        # Atrás de proxy (Procfile): remote_addr/esquema vêm dos cabeçalhos X-Forwarded-*
+        saltos = app.config['PROXY_SALTOS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=saltos, x_proto=saltos, x_host=saltos)
+
+    # Inicializações
+    db.init_app(app)
+    configurar_instrumentacao(app) # Server-Timing e /metrics (opcional); primeiro, para medir a requisição inteira
+    migrate.init_app(app, db)
+    auditoria.init_app(app) # Gravação de logs em lote (utils/auditoria.py)
+
+    # Ativa o "Guarda-Costas" SaaS
+    configurar_isolamento_saas(app)
+
+    login_manager.init_app(app)
+    configurar_autenticacao(app)
+    configurar_cache_sessao(app)
+    configurar_cache_dashboard(app)
+    configurar_cache_status(app)
+    configurar_cache_dizimistas(app)
+    configurar_credencial(app)
+
+    # --- REGISTRO DOS BLUEPRINTS ---
+    from routes.auth import auth_bp
+    from routes.dashboard import dashboard_bp
+    from routes.membros import membros_bp
+    from routes.financeiro import financeiro_bp
+    from routes.usuarios import usuarios_bp
+    from routes.configuracoes import config_bp
+    from routes.auditoria import auditoria_bp
+    from routes.verificacao import verificacao_bp
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(membros_bp)
+    app.register_blueprint(financeiro_bp)
+    app.register_blueprint(usuarios_bp)
+    app.register_blueprint(config_bp)
+    app.register_blueprint(auditoria_bp)
+    app.register_blueprint(verificacao_bp)
+
+    app.cli.add_command(seed_command)
+    return app
+
+
+# --- SEED (via CLI) ---
+# O banco é gerenciado pelos comandos 'flask db ...'; depois do primeiro
+# 'flask db upgrade', rode 'flask seed' para criar pastas e dados iniciais.
 
 def criar_seed():
-    with app.app_context():
-        # Verifica se as tabelas existem antes de tentar inserir
-        # (O try/except evita erro se rodar o app antes da primeira migração)
-        try:
-            if not Igreja.query.first():
-                print("--- SEED: Criando dados iniciais... ---")
-                igreja = Igreja(
-                    nome="IGREJA ASSEMBLEIA DE DEUS, JESUS CRISTO É O CENTRO",
-                    cnpj="59.767.708/0001-15",
-                    endereco="Av. Vitória Régia, 3170 - Birigui/SP",
-                    cidade_uf="Birigui - SP",
-                    responsavel="LEANDRO APARECIDO DE SOUZA",
-                    cargo_responsavel="Pastor Presidente"
-                )
-                db.session.add(igreja)
-                db.session.commit()
-                
-                admin = Usuario(nome="Administrador", email="admin@ekklesia.com", role="admin", igreja_id=igreja.id)
-                admin.set_senha("admin123")
-                db.session.add(admin)
-                db.session.commit()
-                print("--- SEED CONCLUÍDO ---")
-        except Exception:
-            pass # Banco ainda não migrado, ignora o seed por enquanto
-
-# Cria pastas necessárias
-os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(os.path.join(Config.BASE_DIR, 'static', 'logos'), exist_ok=True)
-
-# Executa seed ao iniciar (opcional, melhor seria via comando CLI, mas mantém simples por enquanto)
-criar_seed()
+    """Cria a igreja e o admin iniciais se o banco estiver vazio. Retorna True se criou."""
+    if Igreja.query.first():
+        return False
+
+    igreja = Igreja(
+        nome="IGREJA ASSEMBLEIA DE DEUS, JESUS CRISTO É O CENTRO",
+        cnpj="59.767.708/0001-15",
+        endereco="Av. Vitória Régia, 3170 - Birigui/SP",
+        cidade_uf="Birigui - SP",
+        responsavel="LEANDRO APARECIDO DE SOUZA",
+        cargo_responsavel="Pastor Presidente"
+    )
+    db.session.add(igreja)
+    db.session.flush()
+
+    admin = Usuario(nome="Administrador", email="admin@ekklesia.com", role="admin", igreja_id=igreja.id)
+    admin.set_senha("admin123")
+    db.session.add(admin)
+    db.session.commit()
+    return True
+
+
+@click.command('seed')
+def seed_command():
+    """Cria as pastas de upload e os dados iniciais (igreja + admin)."""
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(os.path.join(Config.BASE_DIR, 'static', 'logos'), exist_ok=True)
+
+    if criar_seed():
+        click.echo("--- SEED CONCLUÍDO: admin@ekklesia.com criado ---")
+    else:
+        click.echo("Banco já possui dados; seed ignorado.")
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,97 @@
+"""
+Benchmark da inicialização da aplicação.
+
+Mede, cada um em processo novo (como um worker do gunicorn):
+  - boot a frio:  importar app.py e criar a aplicação
+  - após fork:    pai já importou os módulos (gunicorn --preload), filho só cria a app
+Em ambos informa quantas consultas ao banco rodaram durante a subida e quais módulos
+pesados de renderização (PIL, qrcode, fpdf, openpyxl) já foram carregados.
+
+Também funciona com versões antigas do projeto (app global em vez de create_app),
+para comparação:
+
+Uso:
+    python benchmarks/bench_inicializacao.py [repeticoes] [raiz_do_projeto]
+    git worktree add /tmp/antigo <commit> && python benchmarks/bench_inicializacao.py 10 /tmp/antigo
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS_PESADOS = ('PIL.Image', 'qrcode', 'fpdf', 'openpyxl')
+
+# Roda dentro do processo filho. Imprime um JSON com as medições.
+SCRIPT_FILHO = r'''
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+inicio = time.perf_counter()
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+comandos = []
+# Conta as consultas ORM disparadas na subida (mesmo as que falham por banco não migrado)
+event.listen(Session, 'do_orm_execute', lambda *a: comandos.append(1))
+
+def criar():
+    import importlib
+    modulo = importlib.import_module('app')
+    return modulo.create_app() if hasattr(modulo, 'create_app') else modulo.app
+
+if os.environ.get('BENCH_FORK'):
+    # Pai importa tudo (como o gunicorn --preload) e cada filho cria a app
+    import app as _modulo
+    leitura, escrita = os.pipe()
+    if os.fork() == 0:
+        os.close(leitura)
+        inicio = time.perf_counter()
+        criar()
+        dados = {'tempo': time.perf_counter() - inicio, 'sql': len(comandos),
+                 'pesados': [m for m in MODULOS if m in sys.modules]}
+        os.write(escrita, json.dumps(dados).encode())
+        os._exit(0)
+    os.close(escrita)
+    os.wait()
+    print(os.read(leitura, 65536).decode())
+else:
+    criar()
+    print(json.dumps({'tempo': time.perf_counter() - inicio, 'sql': len(comandos),
+                      'pesados': [m for m in MODULOS if m in sys.modules]}))
+'''
+
+
+def medir(raiz, repeticoes, fork=False):
+    ambiente = dict(os.environ, PYTHONDONTWRITEBYTECODE='0')
+    if fork:
+        ambiente['BENCH_FORK'] = '1'
+    script = f'MODULOS = {MODULOS_PESADOS!r}\n' + SCRIPT_FILHO
+    resultados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', script], cwd=raiz, env=ambiente,
+                               capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(saida.strip().splitlines()[-1]))
+    return resultados
+
+
+def relatorio(rotulo, resultados):
+    tempos = sorted(r['tempo'] * 1000 for r in resultados)
+    ultimo = resultados[-1]
+    print(f"  {rotulo:<10} mediana {statistics.median(tempos):7.1f} ms   "
+          f"min {tempos[0]:7.1f} ms   consultas na subida: {ultimo['sql']}")
+    print(f"  {'':<10} módulos de renderização carregados: {', '.join(ultimo['pesados']) or 'nenhum'}")
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    raiz = os.path.abspath(sys.argv[2]) if len(sys.argv) > 2 else RAIZ
+    print(f"{repeticoes} repetições em {raiz}")
+    medir(raiz, 1)  # aquece o cache de bytecode (.pyc)
+    relatorio('boot frio', medir(raiz, repeticoes))
+    if hasattr(os, 'fork'):
+        relatorio('após fork', medir(raiz, repeticoes, fork=True))
+
+
+if __name__ == '__main__':
+    main()
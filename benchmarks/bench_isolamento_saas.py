@@ -0,0 +1,101 @@
+"""
+Micro-benchmark do Guarda-Costas SaaS (utils/saas.py).
+
+Mede o custo por consulta ORM em três cenários, numa base SQLite em memória:
+  - sem hook:   referência (nenhum filtro de igreja)
+  - hook antigo: lê current_user e monta dois with_loader_criteria a cada SELECT
+  - hook novo:  critérios montados uma vez por igreja e igreja_id fixado por requisição
+
+Também conta quantas execuções acertaram o cache de SQL compilado do SQLAlchemy.
+
+Uso:
+    python benchmarks/bench_isolamento_saas.py [n_consultas]
+"""
+import os
+import sys
+import time
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_login import current_user, login_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+from app import create_app
+from models import db, Igreja, Usuario, Membro, Lancamento
+from utils.saas import interceptar_consulta
+
+app = create_app()
+
+
+def hook_antigo(execute_state):
+    """Cópia da versão anterior do interceptar_consulta, para comparação."""
+    if not execute_state.is_select:
+        return
+    if not current_user or not current_user.is_authenticated:
+        return
+    try:
+        tenant_id = current_user.igreja_id
+    except Exception:
+        return
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(Membro, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+        with_loader_criteria(Lancamento, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+    )
+
+
+def preparar_banco():
+    db.create_all()
+    for n in (1, 2):
+        igreja = Igreja(nome=f'Igreja {n}')
+        db.session.add(igreja)
+        db.session.flush()
+        db.session.add(Usuario(nome='Admin', email=f'admin{n}@teste', role='admin', igreja_id=igreja.id))
+        db.session.add_all(Membro(nome=f'Membro {i}', igreja_id=igreja.id) for i in range(50))
+    db.session.commit()
+
+
+def medir(rotulo, n, hook):
+    event.remove(Session, 'do_orm_execute', interceptar_consulta)
+    if hook is not None:
+        event.listen(Session, 'do_orm_execute', hook)
+
+    acertos = [0]
+
+    def contar_cache(conn, cursor, statement, parameters, context, executemany):
+        if context.cache_hit == context.dialect.CACHE_HIT:
+            acertos[0] += 1
+
+    event.listen(db.engine, 'after_cursor_execute', contar_cache)
+    try:
+        for tenant in (1, 2):
+            with app.test_request_context('/'):
+                login_user(Usuario.query.filter_by(igreja_id=tenant).first())
+                Membro.query.filter_by(id=1).all()  # aquece
+
+                inicio = time.perf_counter()
+                for i in range(n):
+                    Membro.query.filter_by(id=(i % 50) + 1).all()
+                decorrido = time.perf_counter() - inicio
+                db.session.remove()
+            print(f"  {rotulo:<12} igreja {tenant}: {decorrido / n * 1e6:8.1f} µs/consulta")
+        print(f"  {rotulo:<12} acertos no cache de SQL compilado: {acertos[0]}/{2 * (n + 1)}")
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', contar_cache)
+        if hook is not None:
+            event.remove(Session, 'do_orm_execute', hook)
+        event.listen(Session, 'do_orm_execute', interceptar_consulta)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with app.app_context():
+        preparar_banco()
+        print(f"{n} consultas por cenário")
+        medir('sem hook', n, None)
+        medir('hook antigo', n, hook_antigo)
+        medir('hook novo', n, interceptar_consulta)
+
+
+if __name__ == '__main__':
+    main()
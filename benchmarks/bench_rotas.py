@@ -0,0 +1,229 @@
+"""
+Benchmark das rotas principais pelo test client do Flask, sobre dados sintéticos.
+
+Percorre login, dashboard, membros.lista, financeiro.index, carteirinha e
+declaração, alternando entre as igrejas geradas, e mostra p50/p95 de latência
+e a média de instruções SQL por requisição.
+
+Sem DATABASE_URL, usa um SQLite temporário e gera os dados na hora. Com
+DATABASE_URL, use um banco já populado por benchmarks/dados_sinteticos.py
+(ou passe --gerar).
+
+Antes das medições, cada rota é chamada uma vez com os caches vazios e
+conferida contra o seu orçamento de instruções SQL (ORCAMENTOS_SQL, via
+utils/contador_sql.verificar_rota), que também exige resposta 200. Um N+1 que
+aparecer em alguma listagem, ou uma rota que quebre ou mande para o login, faz o
+script terminar com código 1, mesmo sem referência.
+
+Regressões: salve uma referência com --json e compare depois com --comparar;
+o script termina com código 1 se o p95 piorar além da tolerância ou se alguma
+rota passar a fazer mais consultas.
+
+Uso:
+    python benchmarks/bench_rotas.py --json /tmp/base.json
+    python benchmarks/bench_rotas.py --comparar /tmp/base.json --tolerancia 0.3
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BANCO_TEMPORARIO = 'DATABASE_URL' not in os.environ
+if BANCO_TEMPORARIO:
+    _pasta = tempfile.mkdtemp(prefix='ekklesia_bench_')
+    atexit.register(shutil.rmtree, _pasta, ignore_errors=True)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_pasta, 'bench.db')
+os.environ.setdefault('AUDITORIA_MODO', 'sync')
+
+from app import create_app
+from models import db, Membro, Usuario
+from utils.contador_sql import ContadorSQL, OrcamentoSQLExcedido, RespostaInesperada, verificar_rota
+from utils.sessao import cache_sessao
+from services.dashboard_service import cache_dashboard
+from services.financeiro_service import cache_dizimistas
+from services.render_cache import render_cache
+from benchmarks.dados_sinteticos import gerar, SENHA
+
+
+# Máximo de instruções SQL por rota, com os caches vazios (pior caso). Não dependem
+# do tamanho da página: uma consulta por membro/lançamento estoura na hora.
+ORCAMENTOS_SQL = {
+    'dashboard.index': ('/', 7),
+    'membros.lista': ('/membros/', 2),
+    'membros.busca_json': ('/membros/api/busca?q=silva', 2),
+    'financeiro.index': ('/financeiro/', 5),
+    'financeiro.novo': ('/financeiro/novo', 2),
+    'financeiro.dizimistas_json': ('/financeiro/api/dizimistas?q=silva', 2),
+    'membros.carteirinha': ('/membros/{membro_id}/carteirinha', 2),
+    'membros.declaracao': ('/membros/{membro_id}/declaracao', 2),
+    'auditoria.index': ('/auditoria/', 3),
+}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class Medidor:
+    def __init__(self, engine):
+        self.engine = engine
+        self.rotas = {}  # nome -> {'tempos': [...], 'consultas': [...], 'erros': n}
+
+    def medir(self, nome, requisicao, status_ok=(200, 302)):
+        with ContadorSQL(self.engine) as contador:
+            inicio = time.perf_counter()
+            resposta = requisicao()
+            resposta.get_data()  # consome respostas em streaming
+            decorrido = time.perf_counter() - inicio
+        dados = self.rotas.setdefault(nome, {'tempos': [], 'consultas': [], 'erros': 0})
+        dados['tempos'].append(decorrido)
+        dados['consultas'].append(contador.total)
+        if resposta.status_code not in status_ok:
+            dados['erros'] += 1
+
+    def resumo(self):
+        return {
+            nome: {
+                'n': len(d['tempos']),
+                'p50_ms': round(statistics.median(d['tempos']) * 1000, 2),
+                'p95_ms': round(percentil(d['tempos'], 95) * 1000, 2),
+                'max_ms': round(max(d['tempos']) * 1000, 2),
+                'consultas': round(statistics.mean(d['consultas']), 1),
+                'erros': d['erros'],
+            }
+            for nome, d in self.rotas.items()
+        }
+
+
+def verificar_orcamentos(cliente, membro_id):
+    """Cada rota de ORCAMENTOS_SQL uma vez, com os caches vazios. Retorna as que estouraram ou não responderam 200."""
+    falhas = []
+    for nome, (url, maximo) in ORCAMENTOS_SQL.items():
+        for cache in (cache_sessao, cache_dashboard, cache_dizimistas, render_cache):
+            cache.limpar()
+        try:
+            verificar_rota(cliente, url.format(membro_id=membro_id), maximo)
+        except (OrcamentoSQLExcedido, RespostaInesperada) as e:
+            falhas.append(f'{nome}: {e}')
+    return falhas
+
+
+def executar(app, repeticoes):
+    with app.app_context():
+        engine = db.engine
+        administradores = [(u.igreja_id, u.email) for u in Usuario.query.filter(Usuario.email.like('%@bench.local'))]
+        membros_por_igreja = {
+            igreja_id: [m.id for m in Membro.query.filter_by(igreja_id=igreja_id, deleted_at=None)
+                        .order_by(Membro.id).limit(repeticoes + 1)]
+            for igreja_id, _ in administradores
+        }
+    if not administradores:
+        sys.exit('Nenhum admin @bench.local no banco: rode benchmarks/dados_sinteticos.py ou use --gerar.')
+
+    clientes = {}
+    for igreja_id, email in administradores:
+        cliente = app.test_client()
+        cliente.post('/login', data={'email': email, 'senha': SENHA})
+        clientes[igreja_id] = cliente
+
+    igreja_id, cliente = next(iter(clientes.items()))
+    falhas = verificar_orcamentos(cliente, membros_por_igreja[igreja_id][-1])
+    if falhas:
+        print('ORÇAMENTO DE SQL EXCEDIDO OU STATUS INESPERADO:\n' + '\n'.join(falhas))
+        sys.exit(1)
+
+    medidor = Medidor(engine)
+    # Aquecimento: importações tardias (PIL/fpdf), caches de SQL compilado e templates
+    for igreja_id, cliente in clientes.items():
+        membro_id = membros_por_igreja[igreja_id][-1]
+        for url in ('/', '/membros/', '/financeiro/', f'/membros/{membro_id}/carteirinha', f'/membros/{membro_id}/declaracao'):
+            cliente.get(url).get_data()
+
+    for i in range(repeticoes):
+        for igreja_id, email in administradores:
+            cliente = clientes[igreja_id]
+            # Cada repetição usa outro membro: carteirinha/declaração renderizam de verdade (sem cache)
+            membro_id = membros_por_igreja[igreja_id][i % len(membros_por_igreja[igreja_id])]
+
+            novo_cliente = app.test_client()
+            medidor.medir('auth.login', lambda: novo_cliente.post('/login', data={'email': email, 'senha': SENHA}))
+            medidor.medir('dashboard.index', lambda: cliente.get('/'))
+            medidor.medir('membros.lista', lambda: cliente.get('/membros/'))
+            medidor.medir('financeiro.index', lambda: cliente.get('/financeiro/'))
+            medidor.medir('membros.carteirinha', lambda: cliente.get(f'/membros/{membro_id}/carteirinha'))
+            medidor.medir('membros.declaracao', lambda: cliente.get(f'/membros/{membro_id}/declaracao'))
+    return medidor.resumo()
+
+
+def imprimir(resumo):
+    print(f"{'rota':<22}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}{'SQL/req':>9}{'erros':>7}")
+    for nome, r in resumo.items():
+        print(f"{nome:<22}{r['n']:>5}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['max_ms']:>10.1f}"
+              f"{r['consultas']:>9.1f}{r['erros']:>7}")
+
+
+def comparar(resumo, referencia, tolerancia):
+    """Lista de regressões em relação à referência salva com --json."""
+    regressoes = []
+    for nome, base in referencia.items():
+        atual = resumo.get(nome)
+        if atual is None:
+            continue
+        if atual['p95_ms'] > base['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {base['p95_ms']:.1f} -> {atual['p95_ms']:.1f} ms")
+        if atual['consultas'] > base['consultas']:
+            regressoes.append(f"{nome}: consultas {base['consultas']} -> {atual['consultas']}")
+        if atual['erros'] > base['erros']:
+            regressoes.append(f"{nome}: {atual['erros']} respostas com erro")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=30, help='por igreja e por rota')
+    parser.add_argument('--gerar', action='store_true', help='gera dados sintéticos antes (automático no SQLite temporário)')
+    parser.add_argument('--igrejas', type=int, default=3)
+    parser.add_argument('--membros', type=int, default=2000)
+    parser.add_argument('--lancamentos', type=int, default=10000)
+    parser.add_argument('--logs', type=int, default=5000)
+    parser.add_argument('--json', help='salva o resumo neste arquivo (referência)')
+    parser.add_argument('--comparar', help='compara com uma referência salva por --json')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='piora aceitável do p95 (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    app = create_app()
+    if BANCO_TEMPORARIO or args.gerar:
+        with app.app_context():
+            if BANCO_TEMPORARIO:
+                db.create_all()
+            print('Gerando dados sintéticos...')
+            gerar(args.igrejas, args.membros, args.lancamentos, args.logs)
+
+    with app.app_context():
+        print(f"Banco: {db.engine.url.render_as_string(hide_password=True)}")
+    resumo = executar(app, args.repeticoes)
+    imprimir(resumo)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(resumo, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print('\nREGRESSÕES:\n  ' + '\n  '.join(regressoes))
+            sys.exit(1)
+        print('\nSem regressões em relação à referência.')
+
+
+if __name__ == '__main__':
+    main()
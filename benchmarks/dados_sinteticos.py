@@ -0,0 +1,162 @@
+"""
+Gerador de dados sintéticos multi-igreja para benchmarks.
+
+Cria N igrejas, cada uma com um admin (admin{n}@bench.local / senha123), membros
+com CPF válido, lançamentos dos últimos 24 meses (com saldo_mensal consistente)
+e registros de auditoria. Usa INSERT em lote (Core), então 100 mil linhas levam
+poucos segundos.
+
+Uso:
+    # SQLite descartável (cria as tabelas)
+    DATABASE_URL=sqlite:////tmp/bench.db python benchmarks/dados_sinteticos.py --criar-tabelas
+    # PostgreSQL local já migrado ('flask db upgrade')
+    DATABASE_URL=postgresql://localhost/ekklesia_bench python benchmarks/dados_sinteticos.py --igrejas 10
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from models import db, Igreja, Usuario, Membro, Lancamento, LogAuditoria
+from services.financeiro_service import aplicar_no_saldo_mensal
+from utils.validacao import texto_busca_membro
+
+SENHA = 'senha123'
+TAMANHO_LOTE = 2000
+
+NOMES = ['Ana', 'Antônio', 'Beatriz', 'Carlos', 'Daniela', 'Eduardo', 'Fernanda', 'Gabriel', 'Helena',
+         'Isabela', 'João', 'José', 'Juliana', 'Lucas', 'Marcos', 'Maria', 'Mateus', 'Patrícia',
+         'Paulo', 'Pedro', 'Rafael', 'Raquel', 'Rebeca', 'Samuel', 'Sara', 'Tiago', 'Vitória']
+SOBRENOMES = ['Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins',
+              'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza', 'Teixeira']
+CARGOS = ['Membro'] * 20 + ['Diácono'] * 3 + ['Presbítero'] * 2 + ['Evangelista', 'Pastor', 'Missionário']
+CATEGORIAS = {
+    'entrada': ['Dízimo'] * 6 + ['Oferta'] * 3 + ['Missões'],
+    'saida': ['Aluguel', 'Luz', 'Água', 'Internet', 'Manutenção', 'Ajuda Social', 'Eventos'],
+}
+ACOES = ['CREATE', 'UPDATE', 'ARCHIVE', 'CREATE_FIN', 'UPDATE_CONFIG']
+
+
+def cpf_valido(numero):
+    """CPF com dígitos verificadores corretos a partir de um número sequencial (único)."""
+    digitos = [int(d) for d in f'{numero % 10 ** 9:09d}']
+    for posicao in (9, 10):
+        soma = sum(digitos[i] * (posicao + 1 - i) for i in range(posicao))
+        digitos.append(soma * 10 % 11 % 10)
+    texto = ''.join(map(str, digitos))
+    return f'{texto[:3]}.{texto[3:6]}.{texto[6:9]}-{texto[9:]}'
+
+
+def _inserir(conexao, tabela, linhas):
+    for i in range(0, len(linhas), TAMANHO_LOTE):
+        conexao.execute(insert(tabela), linhas[i:i + TAMANHO_LOTE])
+
+
+def gerar(igrejas=3, membros=1000, lancamentos=5000, logs=5000, semente=42, saida=print):
+    """Gera os dados e devolve a lista de (igreja_id, email_admin)."""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    modelo = Usuario()
+    modelo.set_senha(SENHA)  # hash calculado uma vez e reaproveitado em todos os admins
+    senha_hash = modelo.senha_hash
+
+    conexao = db.session.connection()
+    proximo_cpf = (conexao.scalar(select(db.func.count()).select_from(Membro.__table__)) or 0) + 100_000_000
+    administradores = []
+
+    for n in range(igrejas):
+        inicio = time.perf_counter()
+        igreja_id = conexao.execute(insert(Igreja.__table__).values(
+            nome=f'Igreja Sintética {n + 1}', cnpj=f'{n + 1:02d}.000.000/0001-00',
+            endereco=f'Rua {n + 1}, 100', cidade_uf='Birigui - SP',
+            responsavel='Pastor Responsável', cargo_responsavel='Pastor Presidente',
+        )).inserted_primary_key[0]
+        email = f'admin{igreja_id}@bench.local'
+        usuario_id = conexao.execute(insert(Usuario.__table__).values(
+            nome=f'Admin {igreja_id}', email=email, senha_hash=senha_hash, role='admin', igreja_id=igreja_id,
+        )).inserted_primary_key[0]
+        administradores.append((igreja_id, email))
+
+        linhas_membro = [{
+            'nome': f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}',
+            'sexo': aleatorio.choice('MF'),
+            'estado_civil': aleatorio.choice(['Solteiro', 'Casado', 'Viúvo']),
+            'rg': f'{aleatorio.randrange(10 ** 8, 10 ** 9)}',
+            'cpf': cpf_valido(proximo_cpf + i),
+            'endereco': f'Rua {aleatorio.choice(SOBRENOMES)}, {aleatorio.randrange(1, 2000)}',
+            'data_nascimento': hoje - timedelta(days=aleatorio.randrange(365 * 5, 365 * 90)),
+            'data_batismo': hoje - timedelta(days=aleatorio.randrange(30, 365 * 30)) if aleatorio.random() < 0.7 else None,
+            'cargo': aleatorio.choice(CARGOS),
+            'ativo': aleatorio.random() < 0.9,
+            'telefone': f'(18) 9{aleatorio.randrange(10 ** 7, 10 ** 8)}',
+            'deleted_at': datetime.utcnow() if aleatorio.random() < 0.03 else None,
+            'igreja_id': igreja_id,
+        } for i in range(membros)]
+        for linha in linhas_membro:
+            linha['busca'] = texto_busca_membro(linha['nome'], linha['cpf'], linha['telefone'])
+        _inserir(conexao, Membro.__table__, linhas_membro)
+        proximo_cpf += membros
+        ids_membros = list(conexao.scalars(select(Membro.__table__.c.id).where(Membro.__table__.c.igreja_id == igreja_id)))
+
+        linhas_lancamento = []
+        for _ in range(lancamentos):
+            tipo = 'entrada' if aleatorio.random() < 0.65 else 'saida'
+            categoria = aleatorio.choice(CATEGORIAS[tipo])
+            linhas_lancamento.append({
+                'data': hoje - timedelta(days=aleatorio.randrange(0, 730)),
+                'tipo': tipo,
+                'categoria': categoria,
+                'descricao': None if categoria == 'Dízimo' else f'{categoria} - ref. {aleatorio.randrange(1, 99)}',
+                'valor_centavos': aleatorio.randrange(1_000, 200_000),
+                'igreja_id': igreja_id,
+                'membro_id': aleatorio.choice(ids_membros) if categoria == 'Dízimo' and ids_membros else None,
+                'criado_em': datetime.utcnow(),
+            })
+        _inserir(conexao, Lancamento.__table__, linhas_lancamento)
+        # INSERT em lote não passa pelos eventos do ORM: atualiza o saldo mensal explicitamente
+        aplicar_no_saldo_mensal(conexao, linhas_lancamento)
+
+        _inserir(conexao, LogAuditoria.__table__, [{
+            'data_hora': datetime.utcnow() - timedelta(minutes=aleatorio.randrange(0, 60 * 24 * 365)),
+            'acao': aleatorio.choice(ACOES),
+            'entidade': 'Membro',
+            'entidade_id': aleatorio.choice(ids_membros) if ids_membros else None,
+            'detalhes': 'Registro sintético',
+            'usuario_id': usuario_id,
+            'igreja_id': igreja_id,
+        } for _ in range(logs)])
+
+        db.session.commit()
+        conexao = db.session.connection()
+        saida(f'  igreja {igreja_id}: {membros} membros, {lancamentos} lançamentos, {logs} logs '
+              f'em {time.perf_counter() - inicio:.1f}s')
+    return administradores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--igrejas', type=int, default=3)
+    parser.add_argument('--membros', type=int, default=1000, help='por igreja')
+    parser.add_argument('--lancamentos', type=int, default=5000, help='por igreja')
+    parser.add_argument('--logs', type=int, default=5000, help='por igreja')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--criar-tabelas', action='store_true', help='db.create_all() (SQLite descartável)')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        if args.criar_tabelas:
+            db.create_all()
+        print(f"Gerando dados em {db.engine.url.render_as_string(hide_password=True)}")
+        administradores = gerar(args.igrejas, args.membros, args.lancamentos, args.logs, args.semente)
+    print(f"Logins: {', '.join(email for _, email in administradores)} (senha: {SENHA})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Verifica se as consultas "quentes" do sistema usam índice.
+
+Roda EXPLAIN (SQLite: EXPLAIN QUERY PLAN / PostgreSQL: EXPLAIN) em cada
+consulta e termina com código 1 se alguma cair numa varredura sequencial.
+
+Uso:
+    python benchmarks/explain_indices.py              # banco do .env / instance/ekklesia.db
+    DATABASE_URL=postgresql://... python benchmarks/explain_indices.py
+
+O banco precisa estar migrado ('flask db upgrade'); não precisa ter dados.
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models import db, Membro, Lancamento, LogAuditoria, Usuario, SaldoMensal
+from services.financeiro_service import FinanceiroService
+from services.membro_service import MembroService
+
+app = create_app()
+IGREJA_ID = 1
+
+
+def consultas_quentes():
+    """(nome, consulta ORM) dos caminhos de acesso usados pelos blueprints."""
+    membros = MembroService(IGREJA_ID)
+    financeiro = FinanceiroService(IGREJA_ID)
+
+    return [
+        ('membros.lista', membros.consulta().order_by(Membro.nome, Membro.id).limit(51)),
+        ('membros.lista (cursor)', membros.consulta()
+            .filter(db.tuple_(Membro.nome, Membro.id) > db.tuple_('Maria', 42))
+            .order_by(Membro.nome, Membro.id).limit(51)),
+        ('membros.lista (busca)', membros.consulta(busca='jo', ativo=True).order_by(Membro.nome, Membro.id).limit(51)),
+        ('membros.editar', Membro.query.filter_by(id=1, igreja_id=IGREJA_ID, deleted_at=None)),
+        ('dashboard.total', Membro.query.filter_by(igreja_id=IGREJA_ID, ativo=True, deleted_at=None)
+            .with_entities(db.func.count(Membro.id))),
+        ('financeiro.index', Lancamento.query.filter_by(igreja_id=IGREJA_ID)
+            .order_by(Lancamento.data.desc(), Lancamento.id.desc()).limit(50)),
+        ('financeiro.totais_por_tipo', financeiro._consulta(Lancamento.tipo, db.func.sum(Lancamento.valor_centavos))
+            .group_by(Lancamento.tipo)),
+        ('financeiro.totais_por_mes', financeiro._consulta(Lancamento.data, Lancamento.valor_centavos)
+            .filter(Lancamento.data >= date(2025, 1, 1))),
+        ('financeiro.resumo', SaldoMensal.query.filter_by(igreja_id=IGREJA_ID)
+            .with_entities(db.func.sum(SaldoMensal.entradas_centavos))),
+        ('lancamento.membro', Lancamento.query.filter_by(membro_id=1)),
+        ('usuarios.lista', Usuario.query.filter_by(igreja_id=IGREJA_ID)),
+        ('auditoria.usuario', LogAuditoria.query.filter_by(usuario_id=1).order_by(LogAuditoria.data_hora.desc())),
+        ('auditoria.entidade', LogAuditoria.query.filter_by(entidade='Membro', entidade_id=1)),
+    ]
+
+
+def plano(conexao, consulta):
+    compilada = consulta.statement.compile(dialect=conexao.dialect, compile_kwargs={'literal_binds': True})
+    sql = str(compilada)
+    if conexao.dialect.name == 'sqlite':
+        linhas = conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+        return [linha[-1] for linha in linhas]
+    linhas = conexao.exec_driver_sql(f'EXPLAIN {sql}').fetchall()
+    return [linha[0] for linha in linhas]
+
+
+def varredura_sequencial(conexao, linhas_plano):
+    if conexao.dialect.name == 'sqlite':
+        # 'SCAN membro' = tabela inteira; 'SCAN membro USING INDEX ...' ainda é índice
+        return [l for l in linhas_plano if l.startswith('SCAN ') and ' USING ' not in l]
+    return [l for l in linhas_plano if 'Seq Scan' in l]
+
+
+def main():
+    falhas = 0
+    with app.app_context():
+        with db.engine.connect() as conexao:
+            if conexao.dialect.name == 'postgresql':
+                # Com tabelas pequenas o planner prefere Seq Scan de qualquer jeito;
+                # desligando, verificamos se existe um índice utilizável.
+                conexao.exec_driver_sql('SET enable_seqscan = off')
+
+            print(f"Banco: {conexao.dialect.name}")
+            for nome, consulta in consultas_quentes():
+                linhas_plano = plano(conexao, consulta)
+                ruins = varredura_sequencial(conexao, linhas_plano)
+                status = 'FALHOU' if ruins else 'ok'
+                print(f"[{status:>6}] {nome}")
+                for linha in linhas_plano:
+                    print(f"           {linha}")
+                falhas += bool(ruins)
+
+    if falhas:
+        print(f"\n{falhas} consulta(s) com varredura sequencial.")
+        return 1
+    print("\nTodas as consultas usam índice.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,6 +20,68 @@ class Config:
     
     # Uploads
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024    # Flask recusa (413) corpos maiores
+    UPLOAD_MAX_PIXELS = 40_000_000            # ~40 MP decodificados
+    UPLOAD_THREADS = int(os.getenv('UPLOAD_THREADS', 2))  # 0 = processa dentro da requisição
+
+    # Paginação
+    FINANCEIRO_POR_PAGINA = int(os.getenv('FINANCEIRO_POR_PAGINA', 50))
+    MEMBROS_POR_PAGINA = int(os.getenv('MEMBROS_POR_PAGINA', 50))
+    MEMBROS_POR_PAGINA_MAX = 200
+
+    # Carteirinhas em lote: nº de processos de renderização (0 ou 1 = em série)
+    CARTEIRINHAS_PROCESSOS = int(os.getenv('CARTEIRINHAS_PROCESSOS', min(4, os.cpu_count() or 1)))
+    # Folha A4 em PDF: o FPDF mantém todas as imagens na memória até gerar o arquivo
+    CARTEIRINHAS_PDF_MAX = int(os.getenv('CARTEIRINHAS_PDF_MAX', 200))
+
+    # Login: algoritmo/custo do hash (formato do werkzeug) e limite de falhas por janela (segundos)
+    SENHA_HASH_METODO = os.getenv('SENHA_HASH_METODO', 'scrypt:32768:8:1')
+    LOGIN_JANELA = int(os.getenv('LOGIN_JANELA', 300))
+    LOGIN_TENTATIVAS_EMAIL = int(os.getenv('LOGIN_TENTATIVAS_EMAIL', 5))
+    # Proxies confiáveis à frente do gunicorn (ProxyFix lê o IP real do X-Forwarded-For).
+    # Sem isso todo cliente aparece com o IP do proxy: o limite por IP fica desligado (0)
+    # por padrão, senão viraria um balde global que bloquearia todo mundo
+    PROXY_SALTOS = int(os.getenv('PROXY_SALTOS', 0))
+    LOGIN_TENTATIVAS_IP = int(os.getenv('LOGIN_TENTATIVAS_IP', 30 if PROXY_SALTOS else 0))
+
+    # QR das carteirinhas: chave do HMAC (padrão: SECRET_KEY; trocar invalida as impressas),
+    # cache da situação dos membros (segundos) e limite de códigos por check-in em lote
+    CARTEIRINHA_CHAVE = os.getenv('CARTEIRINHA_CHAVE')
+    VERIFICACAO_CACHE_TTL = int(os.getenv('VERIFICACAO_CACHE_TTL', 60))
+    CHECKIN_MAX_CODIGOS = int(os.getenv('CHECKIN_MAX_CODIGOS', 500))
+
+    # Cache do usuário logado (segundos); 0 desliga
+    SESSAO_CACHE_TTL = int(os.getenv('SESSAO_CACHE_TTL', 60))
+
+    # Cache dos números do painel por igreja (segundos); 0 desliga
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 300))
+
+    # Formulário de lançamento: cache dos dizimistas recentes por igreja (segundos)
+    # e máximo de sugestões por busca
+    DIZIMISTAS_CACHE_TTL = int(os.getenv('DIZIMISTAS_CACHE_TTL', 300))
+    DIZIMISTAS_SUGESTOES_MAX = 20
+
+    # Máximo de lançamentos por lote (conferência dos envelopes do culto)
+    LOTE_LANCAMENTOS_MAX = int(os.getenv('LOTE_LANCAMENTOS_MAX', 500))
+
+    # Cache de carteirinhas/declarações renderizadas (por processo)
+    RENDER_CACHE_MAX_MB = int(os.getenv('RENDER_CACHE_MAX_MB', 64))
+
+    # Auditoria: 'async' grava em lote numa thread de fundo; 'sync' grava na própria transação (testes)
+    AUDITORIA_MODO = os.getenv('AUDITORIA_MODO', 'async')
+    AUDITORIA_SPOOL_DIR = os.getenv('AUDITORIA_SPOOL_DIR', os.path.join(BASE_DIR, 'instance', 'auditoria_spool'))
+    AUDITORIA_TAMANHO_LOTE = 200
+    AUDITORIA_INTERVALO = 1.0  # segundos
+    # Visualizador e retenção ('flask auditoria manter'): meses além da retenção vão para .jsonl.gz
+    AUDITORIA_POR_PAGINA = int(os.getenv('AUDITORIA_POR_PAGINA', 50))
+    AUDITORIA_RETENCAO_MESES = int(os.getenv('AUDITORIA_RETENCAO_MESES', 24))
+    AUDITORIA_ARQUIVO_DIR = os.getenv('AUDITORIA_ARQUIVO_DIR', os.path.join(BASE_DIR, 'instance', 'auditoria_arquivo'))
+
+    # Instrumentação por requisição (Server-Timing + /metrics). Sem METRICAS_TOKEN o /metrics
+    # não é publicado; METRICAS_DIR (compartilhada pelos workers) guarda os retratos de cada processo
+    INSTRUMENTACAO = os.getenv('INSTRUMENTACAO', '0') == '1'
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+    METRICAS_DIR = os.getenv('METRICAS_DIR', os.path.join(BASE_DIR, 'instance', 'metricas'))
 
     # DADOS DA IGREJA (Fallback para PDFService antigo)
     IGREJA_NOME = "IGREJA ASSEMBLEIA DE DEUS, JESUS CRISTO É O CENTRO"
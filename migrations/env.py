@@ -51,6 +51,18 @@ def get_metadata():
     return target_db.metadata
 
 
+# Objetos criados por SQL próprio, fora dos modelos: partições mensais da auditoria
+# (PostgreSQL) e o índice de busca de membros (FTS5 no SQLite, pg_trgm no PostgreSQL).
+# Sem este filtro o autogenerate tentaria removê-los.
+OBJETOS_FORA_DOS_MODELOS = ('log_auditoria_', 'membro_busca', 'ix_membro_busca_trgm')
+
+
+def include_object(objeto, nome, tipo, refletido, comparado_com):
+    if refletido and comparado_com is None and nome and nome.startswith(OBJETOS_FORA_DOS_MODELOS):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -93,6 +105,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,55 @@
+"""Indices por igreja
+
+Revision ID: 4c2a9e7d1b35
+Revises: dfc746833602
+Create Date: 2026-10-18 09:12:41.207315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2a9e7d1b35'
+down_revision = 'dfc746833602'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índices compostos alinhados com os filtros do Guarda-Costas (igreja_id = ?)
+    with op.batch_alter_table('membro', schema=None) as batch_op:
+        batch_op.create_index('ix_membro_igreja_deleted_nome', ['igreja_id', 'deleted_at', 'nome', 'id'], unique=False)
+        batch_op.create_index('ix_membro_igreja_deleted_ativo', ['igreja_id', 'deleted_at', 'ativo'], unique=False)
+
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_usuario_igreja_id'), ['igreja_id'], unique=False)
+
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.create_index('ix_lancamento_igreja_data', ['igreja_id', sa.text('data DESC'), sa.text('id DESC')], unique=False)
+        batch_op.create_index('ix_lancamento_igreja_tipo_categoria', ['igreja_id', 'tipo', 'categoria'], unique=False)
+        batch_op.create_index('ix_lancamento_membro', ['membro_id'], unique=False)
+
+    with op.batch_alter_table('log_auditoria', schema=None) as batch_op:
+        batch_op.create_index('ix_log_auditoria_usuario_data', ['usuario_id', 'data_hora'], unique=False)
+        batch_op.create_index('ix_log_auditoria_entidade', ['entidade', 'entidade_id'], unique=False)
+        batch_op.create_index('ix_log_auditoria_data_hora', ['data_hora'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('log_auditoria', schema=None) as batch_op:
+        batch_op.drop_index('ix_log_auditoria_data_hora')
+        batch_op.drop_index('ix_log_auditoria_entidade')
+        batch_op.drop_index('ix_log_auditoria_usuario_data')
+
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.drop_index('ix_lancamento_membro')
+        batch_op.drop_index('ix_lancamento_igreja_tipo_categoria')
+        batch_op.drop_index('ix_lancamento_igreja_data')
+
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_usuario_igreja_id'))
+
+    with op.batch_alter_table('membro', schema=None) as batch_op:
+        batch_op.drop_index('ix_membro_igreja_deleted_ativo')
+        batch_op.drop_index('ix_membro_igreja_deleted_nome')
@@ -0,0 +1,95 @@
+"""Valor em centavos e saldo mensal
+
+Revision ID: 9e1f3a6c2d84
+Revises: 4c2a9e7d1b35
+Create Date: 2026-10-18 14:03:27.518902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f3a6c2d84'
+down_revision = '4c2a9e7d1b35'
+branch_labels = None
+depends_on = None
+
+
+lancamento = sa.table(
+    'lancamento',
+    sa.column('igreja_id', sa.Integer),
+    sa.column('data', sa.Date),
+    sa.column('tipo', sa.String),
+    sa.column('valor', sa.Float),
+    sa.column('valor_centavos', sa.BigInteger),
+)
+
+saldo_mensal = sa.table(
+    'saldo_mensal',
+    sa.column('igreja_id', sa.Integer),
+    sa.column('ano', sa.Integer),
+    sa.column('mes', sa.Integer),
+    sa.column('entradas_centavos', sa.BigInteger),
+    sa.column('saidas_centavos', sa.BigInteger),
+)
+
+
+def upgrade():
+    # 1. Float -> centavos (inteiro)
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('valor_centavos', sa.BigInteger(), nullable=True))
+
+    op.execute(
+        lancamento.update().values(
+            valor_centavos=sa.cast(sa.func.round(lancamento.c.valor * 100), sa.BigInteger)
+        )
+    )
+
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.alter_column('valor_centavos', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column('valor')
+
+    # 2. Totais mensais por igreja
+    op.create_table('saldo_mensal',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('igreja_id', sa.Integer(), nullable=False),
+    sa.Column('ano', sa.Integer(), nullable=False),
+    sa.Column('mes', sa.Integer(), nullable=False),
+    sa.Column('entradas_centavos', sa.BigInteger(), nullable=False),
+    sa.Column('saidas_centavos', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['igreja_id'], ['igreja.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('igreja_id', 'ano', 'mes', name='uq_saldo_mensal_igreja_mes')
+    )
+
+    # 3. Carga inicial a partir dos lançamentos existentes
+    ano = sa.extract('year', lancamento.c.data)
+    mes = sa.extract('month', lancamento.c.data)
+    centavos_se = lambda tipo: sa.func.coalesce(sa.func.sum(
+        sa.case((lancamento.c.tipo == tipo, lancamento.c.valor_centavos), else_=0)), 0)
+    op.execute(
+        saldo_mensal.insert().from_select(
+            ['igreja_id', 'ano', 'mes', 'entradas_centavos', 'saidas_centavos'],
+            sa.select(
+                lancamento.c.igreja_id,
+                sa.cast(ano, sa.Integer),
+                sa.cast(mes, sa.Integer),
+                centavos_se('entrada'),
+                centavos_se('saida'),
+            ).group_by(lancamento.c.igreja_id, ano, mes)
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('saldo_mensal')
+
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('valor', sa.Float(), nullable=True))
+
+    op.execute(lancamento.update().values(valor=lancamento.c.valor_centavos / 100.0))
+
+    with op.batch_alter_table('lancamento', schema=None) as batch_op:
+        batch_op.alter_column('valor', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('valor_centavos')
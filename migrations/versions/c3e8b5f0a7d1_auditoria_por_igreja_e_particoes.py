@@ -0,0 +1,137 @@
+"""Auditoria por igreja e particionamento mensal
+
+Revision ID: c3e8b5f0a7d1
+Revises: 9e1f3a6c2d84
+Create Date: 2026-10-18 18:41:09.305117
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8b5f0a7d1'
+down_revision = '9e1f3a6c2d84'
+branch_labels = None
+depends_on = None
+
+MESES_A_FRENTE = 3
+
+log_auditoria = sa.table(
+    'log_auditoria',
+    sa.column('usuario_id', sa.Integer),
+    sa.column('igreja_id', sa.Integer),
+)
+usuario = sa.table('usuario', sa.column('id', sa.Integer), sa.column('igreja_id', sa.Integer))
+
+
+def _somar_meses(dia, meses):
+    total = dia.year * 12 + dia.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _criar_indices():
+    op.create_index('ix_log_auditoria_usuario_data', 'log_auditoria', ['usuario_id', 'data_hora'], unique=False)
+    op.create_index('ix_log_auditoria_entidade', 'log_auditoria', ['entidade', 'entidade_id'], unique=False)
+    op.create_index('ix_log_auditoria_data_hora', 'log_auditoria', ['data_hora'], unique=False)
+
+
+def _trocar_tabela(nova):
+    # A sequência do id pertence à tabela antiga: solta antes do DROP e religa na nova
+    op.execute("ALTER SEQUENCE log_auditoria_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE log_auditoria")
+    op.execute(f"ALTER TABLE {nova} RENAME TO log_auditoria")
+    op.execute(f"ALTER TABLE log_auditoria RENAME CONSTRAINT {nova}_pkey TO log_auditoria_pkey")
+    op.execute(f"ALTER TABLE log_auditoria RENAME CONSTRAINT {nova}_usuario_id_fkey TO log_auditoria_usuario_id_fkey")
+    op.execute("ALTER SEQUENCE log_auditoria_id_seq OWNED BY log_auditoria.id")
+
+
+def _upgrade_postgresql():
+    # Tabela particionada por mês: a chave primária precisa incluir data_hora
+    op.execute("""
+        CREATE TABLE log_auditoria_nova (
+            id integer NOT NULL DEFAULT nextval('log_auditoria_id_seq'),
+            data_hora timestamp without time zone NOT NULL,
+            acao varchar(50),
+            entidade varchar(50),
+            entidade_id integer,
+            detalhes text,
+            usuario_id integer REFERENCES usuario (id),
+            igreja_id integer CONSTRAINT log_auditoria_igreja_id_fkey REFERENCES igreja (id),
+            PRIMARY KEY (id, data_hora)
+        ) PARTITION BY RANGE (data_hora)
+    """)
+    op.execute("CREATE TABLE log_auditoria_padrao PARTITION OF log_auditoria_nova DEFAULT")
+
+    primeiro = op.get_bind().scalar(sa.text("SELECT min(data_hora) FROM log_auditoria")) or datetime.utcnow()
+    mes = date(primeiro.year, primeiro.month, 1)
+    ultimo = _somar_meses(date.today().replace(day=1), MESES_A_FRENTE)
+    while mes <= ultimo:
+        seguinte = _somar_meses(mes, 1)
+        op.execute(
+            f"CREATE TABLE log_auditoria_{mes.year}_{mes.month:02d} PARTITION OF log_auditoria_nova "
+            f"FOR VALUES FROM ('{mes:%Y-%m-%d}') TO ('{seguinte:%Y-%m-%d}')"
+        )
+        mes = seguinte
+
+    # Cópia já preenchendo a igreja a partir do usuário que gerou o evento
+    op.execute("""
+        INSERT INTO log_auditoria_nova (id, data_hora, acao, entidade, entidade_id, detalhes, usuario_id, igreja_id)
+        SELECT l.id, COALESCE(l.data_hora, now() AT TIME ZONE 'utc'), l.acao, l.entidade, l.entidade_id,
+               l.detalhes, l.usuario_id, u.igreja_id
+        FROM log_auditoria l LEFT JOIN usuario u ON u.id = l.usuario_id
+    """)
+    _trocar_tabela('log_auditoria_nova')
+    _criar_indices()
+    op.create_index('ix_log_auditoria_igreja_data', 'log_auditoria', ['igreja_id', 'data_hora', 'id'], unique=False)
+
+
+def _downgrade_postgresql():
+    op.execute("""
+        CREATE TABLE log_auditoria_plana (
+            id integer NOT NULL DEFAULT nextval('log_auditoria_id_seq') PRIMARY KEY,
+            data_hora timestamp without time zone,
+            acao varchar(50),
+            entidade varchar(50),
+            entidade_id integer,
+            detalhes text,
+            usuario_id integer REFERENCES usuario (id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO log_auditoria_plana (id, data_hora, acao, entidade, entidade_id, detalhes, usuario_id)
+        SELECT id, data_hora, acao, entidade, entidade_id, detalhes, usuario_id FROM log_auditoria
+    """)
+    _trocar_tabela('log_auditoria_plana')  # o DROP da particionada leva junto as partições
+    _criar_indices()
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    with op.batch_alter_table('log_auditoria', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('igreja_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_log_auditoria_igreja_id', 'igreja', ['igreja_id'], ['id'])
+        batch_op.create_index('ix_log_auditoria_igreja_data', ['igreja_id', 'data_hora', 'id'], unique=False)
+
+    op.execute(
+        log_auditoria.update()
+        .where(log_auditoria.c.usuario_id.isnot(None))
+        .values(igreja_id=sa.select(usuario.c.igreja_id)
+                .where(usuario.c.id == log_auditoria.c.usuario_id)
+                .scalar_subquery())
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _downgrade_postgresql()
+        return
+
+    with op.batch_alter_table('log_auditoria', schema=None) as batch_op:
+        batch_op.drop_index('ix_log_auditoria_igreja_data')
+        batch_op.drop_constraint('fk_log_auditoria_igreja_id', type_='foreignkey')
+        batch_op.drop_column('igreja_id')
@@ -0,0 +1,95 @@
+"""Busca de membros sem acento (FTS5 / pg_trgm)
+
+Revision ID: e4a9c1d7b3f2
+Revises: c3e8b5f0a7d1
+Create Date: 2026-10-18 20:15:52.640318
+
+"""
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c1d7b3f2'
+down_revision = 'c3e8b5f0a7d1'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 2000
+
+membro = sa.table(
+    'membro',
+    sa.column('id', sa.Integer),
+    sa.column('nome', sa.String),
+    sa.column('cpf', sa.String),
+    sa.column('telefone', sa.String),
+    sa.column('busca', sa.String),
+)
+
+# Cópia de utils/validacao.texto_busca_membro no momento desta migração
+def _texto_busca(nome, cpf, telefone):
+    decomposto = unicodedata.normalize('NFKD', nome or '').lower()
+    sem_marcas = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    partes = [' '.join(re.sub(r'[^a-z0-9]+', ' ', sem_marcas).split()),
+              re.sub(r'\D', '', cpf or ''), re.sub(r'\D', '', telefone or '')]
+    return ' '.join(p for p in partes if p)
+
+
+SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS membro_busca USING fts5("
+    "busca, content='membro', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_ai AFTER INSERT ON membro BEGIN "
+    "INSERT INTO membro_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_ad AFTER DELETE ON membro BEGIN "
+    "INSERT INTO membro_busca(membro_busca, rowid, busca) VALUES ('delete', old.id, old.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_au AFTER UPDATE OF busca ON membro BEGIN "
+    "INSERT INTO membro_busca(membro_busca, rowid, busca) VALUES ('delete', old.id, old.busca); "
+    "INSERT INTO membro_busca(rowid, busca) VALUES (new.id, new.busca); END",
+)
+POSTGRESQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_membro_busca_trgm ON membro USING gin (busca gin_trgm_ops)",
+)
+
+
+def upgrade():
+    with op.batch_alter_table('membro', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('busca', sa.String(length=200), nullable=True))
+
+    # Preenche em blocos, por id (o texto é normalizado em Python, igual à aplicação)
+    conexao = op.get_bind()
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            sa.select(membro.c.id, membro.c.nome, membro.c.cpf, membro.c.telefone)
+            .where(membro.c.id > ultimo_id).order_by(membro.c.id).limit(TAMANHO_LOTE)
+        ).all()
+        if not linhas:
+            break
+        conexao.execute(
+            membro.update().where(membro.c.id == sa.bindparam('b_id')).values(busca=sa.bindparam('b_busca')),
+            [{'b_id': l.id, 'b_busca': _texto_busca(l.nome, l.cpf, l.telefone)} for l in linhas],
+        )
+        ultimo_id = linhas[-1].id
+
+    dialeto = conexao.dialect.name
+    for comando in SQLITE if dialeto == 'sqlite' else POSTGRESQL if dialeto == 'postgresql' else ():
+        op.execute(comando)
+    if dialeto == 'sqlite':
+        # Indexa o que já existia (as triggers só pegam o que vier depois)
+        op.execute("INSERT INTO membro_busca(membro_busca) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+    if dialeto == 'sqlite':
+        for trigger in ('membro_busca_ai', 'membro_busca_ad', 'membro_busca_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS membro_busca")
+    elif dialeto == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_membro_busca_trgm")
+
+    with op.batch_alter_table('membro', schema=None) as batch_op:
+        batch_op.drop_column('busca')
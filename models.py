@@ -2,6 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, DDL
+from utils.dinheiro import para_centavos, de_centavos
+from utils.validacao import texto_busca_membro
 
 db = SQLAlchemy()
 
@@ -25,13 +28,20 @@ class Usuario(UserMixin, db.Model):
     # Campo de Nível de Acesso (admin, secretaria, financeiro)
     role = db.Column(db.String(20), default='secretaria', nullable=False)
     
-    igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=False)
+    igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=False, index=True)
+
+    # Algoritmo e custo do hash (Config.SENHA_HASH_METODO, ver utils/autenticacao.py)
+    metodo_hash = 'scrypt:32768:8:1'
 
     def set_senha(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = generate_password_hash(senha, method=self.metodo_hash)
 
     def check_senha(self, senha):
         return check_password_hash(self.senha_hash, senha)
+
+    def precisa_rehash(self):
+        """True se o hash salvo usa outro algoritmo/custo que o configurado hoje."""
+        return not self.senha_hash or self.senha_hash.split('$', 1)[0] != self.metodo_hash
     
     # Helper para verificar se é admin no template
     @property
@@ -56,6 +66,49 @@ class Membro(db.Model):
     
     igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=False)
 
+    # Nome sem acentos + dígitos do CPF/telefone (utils/validacao.texto_busca_membro).
+    # Indexado por trigramas: FTS5 no SQLite, pg_trgm no PostgreSQL (ver DDL abaixo).
+    busca = db.Column(db.String(200))
+
+    # Índices seguem os caminhos reais de acesso (todo SELECT recebe igreja_id = ?)
+    __table_args__ = (
+        db.Index('ix_membro_igreja_deleted_nome', 'igreja_id', 'deleted_at', 'nome', 'id'),
+        db.Index('ix_membro_igreja_deleted_ativo', 'igreja_id', 'deleted_at', 'ativo'),
+    )
+
+
+@event.listens_for(Membro, 'before_insert')
+@event.listens_for(Membro, 'before_update')
+def _atualizar_busca(mapper, connection, membro):
+    # INSERT em lote (Core) não passa por aqui: quem grava assim preenche 'busca' (ver importacao_service)
+    membro.busca = texto_busca_membro(membro.nome, membro.cpf, membro.telefone)
+
+
+# Índice de busca por trigramas. O SQLite mantém a tabela FTS5 por triggers, então
+# vale também para INSERT em lote; a mesma DDL está na migração correspondente.
+DDL_BUSCA_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS membro_busca USING fts5("
+    "busca, content='membro', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_ai AFTER INSERT ON membro BEGIN "
+    "INSERT INTO membro_busca(rowid, busca) VALUES (new.id, new.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_ad AFTER DELETE ON membro BEGIN "
+    "INSERT INTO membro_busca(membro_busca, rowid, busca) VALUES ('delete', old.id, old.busca); END",
+    "CREATE TRIGGER IF NOT EXISTS membro_busca_au AFTER UPDATE OF busca ON membro BEGIN "
+    "INSERT INTO membro_busca(membro_busca, rowid, busca) VALUES ('delete', old.id, old.busca); "
+    "INSERT INTO membro_busca(rowid, busca) VALUES (new.id, new.busca); END",
+)
+DDL_BUSCA_POSTGRESQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_membro_busca_trgm ON membro USING gin (busca gin_trgm_ops)",
+)
+
+for _comando in DDL_BUSCA_SQLITE:
+    event.listen(Membro.__table__, 'after_create', DDL(_comando).execute_if(dialect='sqlite'))
+for _comando in DDL_BUSCA_POSTGRESQL:
+    event.listen(Membro.__table__, 'after_create', DDL(_comando).execute_if(dialect='postgresql'))
+event.listen(Membro.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS membro_busca").execute_if(dialect='sqlite'))
+
 class LogAuditoria(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data_hora = db.Column(db.DateTime, default=datetime.utcnow)
@@ -67,13 +120,25 @@ class LogAuditoria(db.Model):
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=True)
     usuario = db.relationship('Usuario')
 
+    # Igreja dona do evento (isolamento SaaS no visualizador). No PostgreSQL a
+    # tabela é particionada por mês em data_hora (ver services/auditoria_service.py).
+    igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_log_auditoria_usuario_data', 'usuario_id', 'data_hora'),
+        db.Index('ix_log_auditoria_entidade', 'entidade', 'entidade_id'),
+        db.Index('ix_log_auditoria_data_hora', 'data_hora'),
+        db.Index('ix_log_auditoria_igreja_data', 'igreja_id', 'data_hora', 'id'),
+    )
+
 class Lancamento(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     tipo = db.Column(db.String(10), nullable=False) # 'entrada' ou 'saida'
     categoria = db.Column(db.String(50), nullable=False) # Ex: Dízimo, Oferta, Aluguel, Luz
     descricao = db.Column(db.String(200))
-    valor = db.Column(db.Float, nullable=False)
+    # Dinheiro em centavos (inteiro): somas exatas, sem o arredondamento do Float
+    valor_centavos = db.Column(db.BigInteger, nullable=False)
     
     # Relacionamentos
     igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=False)
@@ -83,4 +148,49 @@ class Lancamento(db.Model):
     membro = db.relationship('Membro', backref='lancamentos')
 
     # Auditoria interna
-    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def valor(self):
+        return de_centavos(self.valor_centavos)
+
+    @valor.setter
+    def valor(self, valor):
+        self.valor_centavos = para_centavos(valor)
+
+    __table_args__ = (
+        # Histórico da Tesouraria (mais recentes primeiro)
+        db.Index('ix_lancamento_igreja_data', 'igreja_id', data.desc(), id.desc()),
+        # Totais por tipo/categoria (FinanceiroService)
+        db.Index('ix_lancamento_igreja_tipo_categoria', 'igreja_id', 'tipo', 'categoria'),
+        db.Index('ix_lancamento_membro', 'membro_id'),
+    )
+
+class SaldoMensal(db.Model):
+    """
+    Totais da Tesouraria por igreja e mês, mantidos a cada lançamento
+    (services/financeiro_service.py). Saldo e extratos mensais leem daqui
+    em O(meses), sem varrer a tabela de lançamentos.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    igreja_id = db.Column(db.Integer, db.ForeignKey('igreja.id'), nullable=False)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    entradas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+    saidas_centavos = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('igreja_id', 'ano', 'mes', name='uq_saldo_mensal_igreja_mes'),
+    )
+
+    @property
+    def entradas(self):
+        return de_centavos(self.entradas_centavos)
+
+    @property
+    def saidas(self):
+        return de_centavos(self.saidas_centavos)
+
+    @property
+    def saldo(self):
+        return de_centavos(self.entradas_centavos - self.saidas_centavos)
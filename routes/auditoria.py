@@ -0,0 +1,63 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from models import db, Usuario
+from services.auditoria_service import AuditoriaService, ACOES, ENTIDADES, garantir_particoes, arquivar_antigos
+from config import Config
+from datetime import datetime
+from functools import wraps
+import click
+
+auditoria_bp = Blueprint('auditoria', __name__, url_prefix='/auditoria')
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            flash('🚫 Acesso restrito a Administradores.')
+            return redirect(url_for('dashboard.index'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _data_filtro(campo):
+    try:
+        return datetime.strptime(request.args.get(campo, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@auditoria_bp.route('/')
+@login_required
+@admin_required
+def index():
+    # Isolamento SaaS: o filtro por igreja vale aqui também (LogAuditoria está no Guarda-Costas)
+    filtros = {
+        'acao': request.args.get('acao') or None,
+        'entidade': request.args.get('entidade') or None,
+        'usuario_id': request.args.get('usuario', type=int),
+        'inicio': _data_filtro('inicio'),
+        'fim': _data_filtro('fim'),
+    }
+    logs, proximo = AuditoriaService(current_user.igreja_id).pagina(
+        cursor=request.args.get('cursor'), limite=Config.AUDITORIA_POR_PAGINA, **filtros
+    )
+    usuarios = {u.id: u.nome for u in Usuario.query.filter_by(igreja_id=current_user.igreja_id).order_by(Usuario.nome)}
+    return render_template('auditoria/index.html', logs=logs, proximo=proximo, filtros=request.args,
+                           acoes=ACOES, entidades=ENTIDADES, usuarios=usuarios,
+                           retencao_meses=Config.AUDITORIA_RETENCAO_MESES)
+
+@auditoria_bp.cli.command('manter')
+@click.option('--retencao-meses', type=int, default=None, help='Meses mantidos no banco (padrão: AUDITORIA_RETENCAO_MESES)')
+@click.option('--meses-a-frente', type=int, default=3, help='Partições futuras a criar (PostgreSQL)')
+def manter_cli(retencao_meses, meses_a_frente):
+    """Cria as partições dos próximos meses e arquiva os meses além da retenção (rodar 1x por dia/mês)."""
+    retencao_meses = retencao_meses if retencao_meses is not None else Config.AUDITORIA_RETENCAO_MESES
+
+    criadas = garantir_particoes(db.session.connection(), meses_a_frente)
+    db.session.commit()
+    for nome in criadas:
+        click.echo(f'Partição criada: {nome}')
+
+    def informar(mes, linhas):
+        click.echo(f'{mes:%m/%Y}: {linhas} registros arquivados')
+
+    arquivados = arquivar_antigos(db.session, Config.AUDITORIA_ARQUIVO_DIR, retencao_meses, ao_arquivar=informar)
+    click.echo(f'Concluído: {sum(arquivados.values())} registros arquivados em {Config.AUDITORIA_ARQUIVO_DIR}')
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from models import db, Usuario, Igreja, LogAuditoria
+from models import db, Usuario, Igreja
+from utils.auditoria import registrar_log
+from utils.autenticacao import autenticar
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -10,15 +12,16 @@ def login():
         return redirect(url_for('dashboard.index'))
     
     if request.method == 'POST':
-        email = request.form['email']
-        senha = request.form['senha']
-        usuario = Usuario.query.filter_by(email=email).first()
+        # Limite de tentativas + rehash transparente (utils/autenticacao.py)
+        usuario, espera = autenticar(request.form['email'], request.form['senha'], request.remote_addr)
         
-        if usuario and usuario.check_senha(senha):
+        if usuario:
             login_user(usuario)
             return redirect(url_for('dashboard.index'))
-        else:
-            flash('E-mail ou senha inválidos.')
+        if espera:
+            flash(f'Muitas tentativas de login. Tente novamente em {(espera + 59) // 60} minuto(s).')
+            return render_template('login.html'), 429
+        flash('E-mail ou senha inválidos.')
             
     return render_template('login.html')
 
@@ -60,22 +63,20 @@ def registrar():
             )
             novo_admin.set_senha(senha)
             db.session.add(novo_admin)
+            db.session.flush() # Gera o ID do admin para o log
             
-            # Passo C: Efetivar tudo
+            # Passo C: Auditoria Inicial
+            # Como o usuário ainda não está logado na sessão, informamos o ID manualmente
+            registrar_log("SIGNUP", "Igreja", nova_igreja.id,
+                          f"Nova organização criada: {nova_igreja.nome}",
+                          usuario_id=novo_admin.id, igreja_id=nova_igreja.id)
+            
+            # Passo D: Efetivar tudo
             db.session.commit()
             
-            # 4. Auditoria Inicial
-            # Como o usuário ainda não está logado na sessão, inserimos o ID manualmente ou deixamos null
-            # Mas vamos logar ele agora:
+            # 4. Já entra logado
             login_user(novo_admin)
             
-            # Registrar Log de Boas Vindas
-            db.session.add(LogAuditoria(
-                acao="SIGNUP", entidade="Igreja", entidade_id=nova_igreja.id, 
-                detalhes=f"Nova organização criada: {nova_igreja.nome}", usuario_id=novo_admin.id
-            ))
-            db.session.commit()
-            
             flash(f'Bem-vindo ao EkklesiaApp! Configure os dados da sua igreja.')
             # Redireciona direto para configurações para ele terminar o cadastro
             return redirect(url_for('configuracoes.index'))
@@ -1,9 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from models import db, Igreja, LogAuditoria
-from config import Config
-import os
-from PIL import Image
+from models import db, Igreja
+from utils.auditoria import registrar_log
+from services.render_cache import render_cache
+from utils.sessao import cache_sessao
 from functools import wraps
 
 config_bp = Blueprint('configuracoes', __name__, url_prefix='/configuracoes')
@@ -36,34 +36,25 @@ def index():
             igreja.cidade_uf = request.form['cidade_uf']
             
             # Processamento de Upload da Logo
+            logo = None
             if 'logo' in request.files:
                 arquivo = request.files['logo']
                 if arquivo.filename != '':
-                    # Salva como logo_{id}.png para garantir unicidade
-                    img = Image.open(arquivo)
-                    nome_arquivo = f"logo_{igreja.id}.png"
-                    
-                    # Cria pasta de logos se não existir
-                    pasta_logos = os.path.join(Config.BASE_DIR, 'static', 'logos')
-                    os.makedirs(pasta_logos, exist_ok=True)
-                    
-                    caminho_salvar = os.path.join(pasta_logos, nome_arquivo)
-                    img.convert("RGBA").save(caminho_salvar, "PNG")
+                    from services.imagem_service import ImagemService # PIL só carrega quando há upload
+                    # Valida agora; a conversão para logo_{id}.png roda fora da requisição
+                    logo = ImagemService().ler_upload(arquivo)
                     
                     # Auditoria
-                    db.session.add(LogAuditoria(
-                        acao="UPDATE_LOGO", entidade="Igreja", entidade_id=igreja.id, 
-                        detalhes="Logo atualizada", usuario_id=current_user.id
-                    ))
+                    registrar_log("UPDATE_LOGO", "Igreja", igreja.id, "Logo atualizada")
 
-            db.session.commit()
-            
             # Auditoria de dados
-            db.session.add(LogAuditoria(
-                acao="UPDATE_CONFIG", entidade="Igreja", entidade_id=igreja.id, 
-                detalhes="Dados institucionais atualizados", usuario_id=current_user.id
-            ))
+            registrar_log("UPDATE_CONFIG", "Igreja", igreja.id, "Dados institucionais atualizados")
             db.session.commit()
+            if logo:
+                ImagemService().salvar_logo(igreja.id, *logo)
+            # Logo/dados da igreja mudaram: descarta carteirinhas e declarações em cache
+            render_cache.invalidar(f'igreja:{igreja.id}')
+            cache_sessao.invalidar_igreja(igreja.id)
             
             flash('Configurações salvas com sucesso!')
             return redirect(url_for('configuracoes.index'))
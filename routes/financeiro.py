@@ -1,56 +1,105 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Response, stream_with_context, jsonify
 from flask_login import login_required, current_user
-from models import db, Lancamento, Membro, LogAuditoria
+from models import db, Lancamento, Membro
+from utils.auditoria import registrar_log
+from utils.dinheiro import para_centavos
+from utils.instrumentacao import cronometro
+from services.financeiro_service import FinanceiroService, cache_dizimistas
+from services.membro_service import MembroService
+from services.relatorio_service import RelatorioFinanceiroService, RELATORIOS, MESES
+from config import Config
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 financeiro_bp = Blueprint('financeiro', __name__, url_prefix='/financeiro')
 
 @financeiro_bp.route('/')
 @login_required
 def index():
-    # Filtra lançamentos da igreja do usuário
-    lancamentos = Lancamento.query.filter_by(igreja_id=current_user.igreja_id).order_by(Lancamento.data.desc()).all()
+    # Totais calculados no banco (GROUP BY), sem carregar todos os lançamentos
+    servico = FinanceiroService(current_user.igreja_id)
+    resumo = servico.resumo()
+    categorias = servico.totais_por_categoria()
     
-    # Cálculo simples de Saldo (No futuro faremos via SQL para performance)
-    total_entradas = sum(l.valor for l in lancamentos if l.tipo == 'entrada')
-    total_saidas = sum(l.valor for l in lancamentos if l.tipo == 'saida')
-    saldo = total_entradas - total_saidas
+    # Histórico paginado: só a página atual sai do banco.
+    # joinedload traz o nome do dizimista no mesmo SELECT (evita N+1 no template)
+    pagina = request.args.get('pagina', 1, type=int)
+    lancamentos = (Lancamento.query
+                   .options(joinedload(Lancamento.membro))
+                   .filter_by(igreja_id=current_user.igreja_id)
+                   .order_by(Lancamento.data.desc(), Lancamento.id.desc())
+                   .paginate(page=pagina, per_page=Config.FINANCEIRO_POR_PAGINA, error_out=False))
     
     return render_template('financeiro/index.html', 
                            lancamentos=lancamentos, 
-                           entradas=total_entradas, 
-                           saidas=total_saidas, 
-                           saldo=saldo)
+                           categorias=categorias,
+                           entradas=resumo['entradas'], 
+                           saidas=resumo['saidas'], 
+                           saldo=resumo['saldo'],
+                           meses=MESES,
+                           ano_atual=datetime.today().year)
+
+@financeiro_bp.route('/relatorio')
+@login_required
+def relatorio():
+    nome = request.args.get('relatorio', 'categoria')
+    formato = request.args.get('formato', 'pdf')
+    ano = request.args.get('ano', datetime.today().year, type=int)
+    mes = request.args.get('mes', type=int)
+    # Ano fora de 1..9998 estouraria o date() do intervalo (que vai até o ano seguinte)
+    if (nome not in RELATORIOS or formato not in ('pdf', 'csv') or not 1 <= ano <= 9998
+            or (mes and not 1 <= mes <= 12)):
+        flash('Relatório inválido.')
+        return redirect(url_for('financeiro.index'))
+
+    servico = RelatorioFinanceiroService(current_user.igreja_id, ano, mes)
+    arquivo = f"relatorio_{nome}_{ano}{f'_{mes:02d}' if mes else ''}.{formato}"
+    titulo, cabecalho, larguras = RELATORIOS[nome]
+
+    if formato == 'csv':
+        # Vai para o navegador em pedaços enquanto o cursor percorre o banco
+        return Response(stream_with_context(servico.gerar_csv(nome)),
+                        content_type='text/csv; charset=utf-8',
+                        headers={'Content-Disposition': f'attachment; filename={arquivo}'})
+
+    from services.pdf_service import RelatorioPDF # fpdf só é carregado quando alguém pede o PDF
+    pdf = RelatorioPDF()
+    with cronometro('render'):
+        conteudo = pdf.gerar_relatorio(titulo, servico.periodo, cabecalho, larguras, servico.linhas(nome))
+    return Response(bytes(conteudo), content_type='application/pdf',
+                    headers={'Content-Disposition': f'inline; filename={arquivo}'})
 
 @financeiro_bp.route('/novo', methods=['GET', 'POST'])
 @login_required
 def novo():
     if request.method == 'POST':
         try:
-            valor = float(request.form['valor'].replace(',', '.')) # Trata R$ brasileiro
-            
+            valor = para_centavos(request.form['valor']) # Trata R$ brasileiro, sem float
+
+            # O id vem do type-ahead (campo oculto): confere que é membro desta igreja e não arquivado
+            membro_id = request.form.get('membro_id', type=int)
+            if membro_id and not (Membro.query.with_entities(Membro.id)
+                                  .filter(Membro.id == membro_id, Membro.igreja_id == current_user.igreja_id,
+                                          Membro.deleted_at.is_(None)).first()):
+                flash('Membro não encontrado. Selecione o dizimista na lista de sugestões.')
+                return redirect(url_for('financeiro.novo'))
+
             novo_lancamento = Lancamento(
                 data=datetime.strptime(request.form['data'], '%Y-%m-%d'),
                 tipo=request.form['tipo'],
                 categoria=request.form['categoria'],
                 descricao=request.form['descricao'],
-                valor=valor,
+                valor_centavos=valor,
                 igreja_id=current_user.igreja_id,
-                membro_id=request.form.get('membro_id') or None # Se vazio, vira None
+                membro_id=membro_id or None # Se vazio, vira None
             )
             
             db.session.add(novo_lancamento)
-            db.session.commit()
+            db.session.flush() # Gera o ID para o log
             
-            # Log de Auditoria
-            user_id = current_user.id
-            db.session.add(LogAuditoria(
-                acao="CREATE_FIN", 
-                entidade="Lancamento", 
-                entidade_id=novo_lancamento.id, 
-                detalhes=f"{novo_lancamento.tipo} de R$ {novo_lancamento.valor}",
-                usuario_id=user_id
-            ))
+            # Log de Auditoria (gravado junto com o commit, em lote)
+            registrar_log("CREATE_FIN", "Lancamento", novo_lancamento.id,
+                          f"{novo_lancamento.tipo} de R$ {novo_lancamento.valor}")
             db.session.commit()
             
             flash('Lançamento registrado com sucesso!')
@@ -59,6 +108,52 @@ def novo():
             db.session.rollback()
             flash(f'Erro: {e}')
             
-    # Carrega membros para o select de Dízimo
-    membros = Membro.query.filter_by(igreja_id=current_user.igreja_id, deleted_at=None).all()
-    return render_template('financeiro/formulario.html', membros=membros, hoje=datetime.today().strftime('%Y-%m-%d'))
\ No newline at end of file
+    # Dizimistas recentes (cache por igreja); os demais vêm da busca enquanto digita
+    recentes = cache_dizimistas.obter(current_user.igreja_id)
+    return render_template('financeiro/formulario.html', recentes=recentes, hoje=datetime.today().strftime('%Y-%m-%d'))
+
+@financeiro_bp.route('/api/dizimistas')
+@login_required
+def dizimistas_json():
+    # Sem ?q: os recentes do cache. Com ?q: busca sem acento por nome, CPF ou telefone
+    limite = max(1, min(request.args.get('limite', 10, type=int), Config.DIZIMISTAS_SUGESTOES_MAX))
+    termo = request.args.get('q', '').strip()
+    if not termo:
+        return jsonify({'membros': cache_dizimistas.obter(current_user.igreja_id)[:limite]})
+    sugestoes = MembroService(current_user.igreja_id).sugestoes(termo, limite)
+    return jsonify({'membros': [{'id': m['id'], 'nome': m['nome'], 'cpf': m['cpf']} for m in sugestoes]})
+
+@financeiro_bp.route('/lote', methods=['GET', 'POST'])
+@login_required
+def lote():
+    """
+    Vários lançamentos de uma vez. POST em JSON:
+    {"data": "2026-10-18", "tipo": "entrada", "categoria": "Dízimo", "descricao": "Culto de domingo",
+     "lancamentos": [{"valor": "50,00", "membro_id": 12}, {"valor": "20", "categoria": "Oferta"}, ...]}
+    Os campos de fora valem para as linhas que não os trouxerem.
+    """
+    if request.method == 'GET':
+        return render_template('financeiro/lote.html', hoje=datetime.today().strftime('%Y-%m-%d'))
+
+    from services.lote_financeiro_service import LoteLancamentosService
+    dados = request.get_json(silent=True) or {}
+    itens = dados.get('lancamentos')
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'erro': 'Envie {"lancamentos": [{...}, ...]}'}), 400
+    if len(itens) > Config.LOTE_LANCAMENTOS_MAX:
+        return jsonify({'erro': f'No máximo {Config.LOTE_LANCAMENTOS_MAX} lançamentos por lote'}), 413
+
+    padrao = {campo: dados[campo] for campo in ('data', 'tipo', 'categoria') if dados.get(campo)}
+    descricao_lote = str(dados.get('descricao') or '').strip()[:100] or None
+    try:
+        resultado = LoteLancamentosService(current_user.igreja_id).registrar(itens, padrao, descricao_lote)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': f'Erro: {e}'}), 500
+
+    if resultado.erros:
+        return jsonify({'erros': [{'indice': i, 'mensagem': m} for i, m in resultado.erros]}), 400
+    flash(f'{resultado.criados} lançamentos registrados '
+          f'(entradas R$ {resultado.entradas}, saídas R$ {resultado.saidas}).')
+    return jsonify({'criados': resultado.criados, 'entradas': str(resultado.entradas),
+                    'saidas': str(resultado.saidas), 'url': url_for('financeiro.index')}), 201
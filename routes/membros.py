@@ -1,35 +1,118 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response, jsonify, Response, current_app, abort
 from flask_login import login_required, current_user
-from models import db, Membro, LogAuditoria
-from services.pdf_service import PDFService
-from services.card_service import CardService
+from models import db, Membro
+from utils.auditoria import registrar_log
+from utils.instrumentacao import cronometro
+from services.membro_service import MembroService
+from services.render_cache import render_cache
+from services.verificacao_service import cache_status
 from config import Config
 from datetime import datetime
 import os
-from PIL import Image
 from sqlalchemy.exc import IntegrityError
 from markupsafe import Markup
+import click
 
 membros_bp = Blueprint('membros', __name__, url_prefix='/membros')
 
-# Função auxiliar de log (poderia ir para um utils.py no futuro)
-def registrar_log(acao, entidade, id_ref, detalhes):
-    try:
-        user_id = current_user.id if current_user.is_authenticated else None
-        novo_log = LogAuditoria(acao=acao, entidade=entidade, entidade_id=id_ref, detalhes=detalhes, usuario_id=user_id)
-        db.session.add(novo_log)
-    except Exception:
-        pass
+# Os serviços de renderização (PIL, qrcode, fpdf) são importados dentro das views:
+# o worker sobe sem eles e só paga a importação na primeira vez que forem usados.
+
+def _ler_foto_enviada():
+    """(bytes, formato) da foto do formulário já validada, ou None se não veio foto"""
+    from services.imagem_service import ImagemService
+    arquivo = request.files.get('foto')
+    if not arquivo or arquivo.filename == '':
+        return None
+    return ImagemService().ler_upload(arquivo)
+
+@membros_bp.app_template_global()
+def miniatura_membro(membro_id):
+    """URL da miniatura da foto (gerada no upload) ou None"""
+    from services.imagem_service import ImagemService
+    if os.path.exists(ImagemService.caminho_miniatura(membro_id)):
+        return url_for('static', filename=f'uploads/membro_{membro_id}_mini.jpg')
+    return None
+
+def _data_opcional(campo):
+    valor = request.form.get(campo)
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+def _filtros_lista():
+    """Lê os filtros da querystring (compartilhado entre a página e a API JSON)"""
+    ativo = request.args.get('ativo', '')
+    return {
+        'busca': request.args.get('busca', '').strip() or None,
+        'cargo': request.args.get('cargo') or None,
+        'ativo': {'1': True, '0': False}.get(ativo),
+    }
+
+def _ler_ids():
+    """
+    ?ids=1,2,3 -> [1, 2, 3] (None sem o parâmetro). Só dígitos ASCII dentro do INTEGER
+    do banco; o resto é ignorado, e uma lista só com ids inválidos não encontra ninguém.
+    """
+    if not request.args.get('ids', '').strip():
+        return None
+    ids = []
+    for parte in request.args.get('ids', '').split(','):
+        parte = parte.strip()
+        if parte.isascii() and parte.isdigit() and len(parte) <= 10 and 0 < int(parte) < 2 ** 31:
+            ids.append(int(parte))
+    return ids
+
+def _limite_pagina():
+    limite = request.args.get('limite', Config.MEMBROS_POR_PAGINA, type=int)
+    return max(1, min(limite, Config.MEMBROS_POR_PAGINA_MAX))
 
 @membros_bp.route('/')
 @login_required
 def lista():
-    membros = Membro.query.filter_by(igreja_id=current_user.igreja_id, deleted_at=None).all()
-    return render_template('membros/lista.html', membros=membros)
+    filtros = _filtros_lista()
+    membros, proximo = MembroService(current_user.igreja_id).pagina(
+        cursor=request.args.get('cursor'), limite=_limite_pagina(), **filtros
+    )
+    return render_template('membros/lista.html', membros=membros, proximo=proximo, filtros=request.args)
+
+@membros_bp.route('/api/lista')
+@login_required
+def lista_json():
+    # Carregamento incremental da lista (botão "Carregar mais")
+    membros, proximo = MembroService(current_user.igreja_id).pagina(
+        cursor=request.args.get('cursor'), limite=_limite_pagina(), **_filtros_lista()
+    )
+    return jsonify({
+        'membros': [{
+            'id': m.id,
+            'nome': m.nome,
+            'cargo': m.cargo,
+            'ativo': m.ativo,
+            'miniatura': miniatura_membro(m.id),
+            'urls': {
+                'carteirinha': url_for('membros.carteirinha', id=m.id),
+                'declaracao': url_for('membros.declaracao', id=m.id),
+                'editar': url_for('membros.editar', id=m.id),
+                'arquivar': url_for('membros.arquivar', id=m.id),
+            },
+        } for m in membros],
+        'proximo': proximo,
+    })
+
+@membros_bp.route('/api/busca')
+@login_required
+def busca_json():
+    # Type-ahead: ?q=joao silv | 123.456 | 9876 (sem acento, por pedaços; índice de trigramas)
+    limite = max(1, min(request.args.get('limite', 10, type=int), 50))
+    ativo = True if request.args.get('ativos') == '1' else None
+    sugestoes = MembroService(current_user.igreja_id).sugestoes(request.args.get('q', ''), limite, ativo)
+    for sugestao in sugestoes:
+        sugestao['url'] = url_for('membros.editar', id=sugestao['id'])
+    return jsonify({'membros': sugestoes})
 
 @membros_bp.route('/novo', methods=['GET', 'POST'])
 @login_required
 def novo():
+    from services.imagem_service import ImagemService
     if request.method == 'POST':
         try:
             novo = Membro(
@@ -40,22 +123,20 @@ def novo():
                 cpf=request.form['cpf'],
                 endereco=request.form['endereco'],
                 data_nascimento=datetime.strptime(request.form['data_nascimento'], '%Y-%m-%d'),
+                data_batismo=_data_opcional('data_batismo'),
                 cargo=request.form.get('cargo', 'Membro'),
                 ativo=True,
                 igreja_id=current_user.igreja_id
             )
+            foto = _ler_foto_enviada()
             db.session.add(novo)
             db.session.flush()
             registrar_log("CREATE", "Membro", novo.id, f"Cadastro: {novo.nome}")
-
-            if 'foto' in request.files:
-                arquivo = request.files['foto']
-                if arquivo.filename != '':
-                    img = Image.open(arquivo)
-                    caminho = os.path.join(Config.UPLOAD_FOLDER, f"membro_{novo.id}.png")
-                    img.convert("RGBA").save(caminho, "PNG")
-
             db.session.commit()
+
+            # Variantes da foto (cartão, miniatura, original) são geradas fora da requisição
+            if foto:
+                ImagemService().salvar_foto_membro(novo.id, *foto)
             flash('Membro cadastrado!')
             return redirect(url_for('membros.lista'))
             
@@ -79,6 +160,7 @@ def novo():
 @membros_bp.route('/editar/<int:id>', methods=['GET', 'POST'])
 @login_required
 def editar(id):
+    from services.imagem_service import ImagemService
     membro = Membro.query.filter_by(id=id, igreja_id=current_user.igreja_id, deleted_at=None).first_or_404()
     
     if request.method == 'POST':
@@ -90,18 +172,17 @@ def editar(id):
             membro.cpf = request.form['cpf']
             membro.endereco = request.form['endereco']
             membro.data_nascimento = datetime.strptime(request.form['data_nascimento'], '%Y-%m-%d')
+            membro.data_batismo = _data_opcional('data_batismo')
             membro.cargo = request.form.get('cargo')
             membro.ativo = 'ativo' in request.form 
-            
-            if 'foto' in request.files:
-                arquivo = request.files['foto']
-                if arquivo.filename != '':
-                    img = Image.open(arquivo)
-                    caminho = os.path.join(Config.UPLOAD_FOLDER, f"membro_{membro.id}.png")
-                    img.convert("RGBA").save(caminho, "PNG")
+            foto = _ler_foto_enviada()
 
             registrar_log("UPDATE", "Membro", membro.id, "Edição de dados")
             db.session.commit()
+            if foto:
+                ImagemService().salvar_foto_membro(membro.id, *foto)
+            render_cache.invalidar(f'membro:{membro.id}')
+            cache_status.invalidar(membro.id)
             flash('Atualizado com sucesso!')
             return redirect(url_for('membros.lista'))
         except Exception as e:
@@ -118,6 +199,8 @@ def arquivar(id):
     membro.ativo = False
     registrar_log("ARCHIVE", "Membro", membro.id, "Arquivado")
     db.session.commit()
+    render_cache.invalidar(f'membro:{membro.id}')
+    cache_status.invalidar(membro.id)
     flash('Membro arquivado.')
     return redirect(url_for('membros.lista'))
 
@@ -129,30 +212,185 @@ def reativar(id):
     membro.ativo = True
     registrar_log("REACTIVATE", "Membro", membro.id, "Reativado")
     db.session.commit()
+    render_cache.invalidar(f'membro:{membro.id}')
+    cache_status.invalidar(membro.id)
     flash(f'{membro.nome} reativado.')
     return redirect(url_for('membros.editar', id=membro.id))
 
+def _resposta_em_cache(chave, tags, renderizar, content_type, disposition):
+    """
+    Entrega um arquivo renderizado usando o cache por conteúdo.
+    A chave (hash das entradas) é o ETag: se o navegador já tem essa versão, responde 304
+    sem renderizar nada; se outro usuário já pediu, sai direto da memória.
+    """
+    if request.if_none_match.contains(chave):
+        response = make_response('', 304)
+        response.set_etag(chave)
+        return response
+
+    dados = render_cache.obter(chave)
+    if dados is None:
+        with cronometro('render'):
+            dados = renderizar()
+        render_cache.guardar(chave, dados, tags)
+
+    response = make_response(dados)
+    response.headers['Content-Type'] = content_type
+    response.headers['Content-Disposition'] = disposition
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(chave)
+    return response
+
 @membros_bp.route('/<int:id>/declaracao')
 @login_required
 def declaracao(id):
+    return documento(id, 'declaracao')
+
+@membros_bp.route('/<int:id>/documento/<tipo>')
+@login_required
+def documento(id, tipo):
+    """Declaração, carta de transferência (?destino=Igreja X) ou certificado de batismo."""
+    from services.pdf_service import PDFService, dados_documento
+    if tipo not in PDFService.DOCUMENTOS:
+        abort(404)
     membro = Membro.query.filter_by(id=id, igreja_id=current_user.igreja_id, deleted_at=None).first_or_404()
-    dados = {
-        'nome': membro.nome, 'rg': membro.rg, 'cpf': membro.cpf,
-        'estado_civil': membro.estado_civil, 'endereco': membro.endereco,
-        'sexo': membro.sexo, 'data_declaracao': datetime.today().strftime('%Y-%m-%d')
-    }
-    pdf_bytes = PDFService().gerar_declaracao(dados)
-    response = make_response(bytes(pdf_bytes))
+    extras = {'igreja_destino': request.args.get('destino', '').strip()} if tipo == 'transferencia' else {}
+    dados = dados_documento(membro, **extras)
+    if tipo == 'batismo' and not dados['data_batismo']:
+        flash('Cadastre a data de batismo do membro para emitir o certificado.')
+        return redirect(url_for('membros.editar', id=membro.id))
+    return _resposta_em_cache(
+        PDFService.chave_documento(tipo, dados, current_user.igreja),
+        (f'membro:{membro.id}', f'igreja:{membro.igreja_id}'),
+        lambda: bytes(PDFService().gerar_documento(tipo, dados)),
+        'application/pdf',
+        f'attachment; filename={tipo.capitalize()}.pdf',
+    )
+
+@membros_bp.route('/documentos')
+@login_required
+def documentos_lote():
+    """Um PDF com o documento de vários membros: ?tipo=declaracao&ids=1,2,3 ou ?cargo=Diácono."""
+    from services.pdf_service import PDFService, dados_documento
+    tipo = request.args.get('tipo', 'declaracao')
+    if tipo not in PDFService.DOCUMENTOS:
+        abort(404)
+    ids = _ler_ids()
+    consulta = MembroService(current_user.igreja_id).consulta(
+        cargo=request.args.get('cargo') or None,
+        ativo=None if ids is not None else True,
+    )
+    if ids is not None:
+        consulta = consulta.filter(Membro.id.in_(ids))
+    if tipo == 'batismo':
+        consulta = consulta.filter(Membro.data_batismo.isnot(None))
+
+    with cronometro('render'):
+        pdf, _ = PDFService().gerar_lote(tipo, (dados_documento(m) for m in consulta.order_by(Membro.nome, Membro.id)))
+    if pdf is None:
+        flash('Nenhum membro encontrado para este documento.')
+        return redirect(url_for('membros.lista'))
+    response = make_response(bytes(pdf))
     response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = 'attachment; filename=Declaracao.pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename={tipo.capitalize()}_lote.pdf'
     return response
 
 @membros_bp.route('/<int:id>/carteirinha')
 @login_required
 def carteirinha(id):
+    from services.card_service import CardService
     membro = Membro.query.filter_by(id=id, igreja_id=current_user.igreja_id, deleted_at=None).first_or_404()
-    img_bytes = CardService().gerar_frente(membro)
-    response = make_response(img_bytes.getvalue())
-    response.headers['Content-Type'] = 'image/png'
-    response.headers['Content-Disposition'] = 'inline; filename=Carteirinha.png'
-    return response
\ No newline at end of file
+    servico = CardService()
+    return _resposta_em_cache(
+        servico.chave_cache(membro),
+        (f'membro:{membro.id}', f'igreja:{membro.igreja_id}'),
+        lambda: servico.gerar_frente(membro).getvalue(),
+        'image/png',
+        'inline; filename=Carteirinha.png',
+    )
+
+@membros_bp.route('/carteirinhas')
+@login_required
+def carteirinhas_lote():
+    """
+    Carteirinhas em lote: ?ids=1,2,3 ou ?cargo=Diácono (padrão: todos os ativos).
+    ?formato=pdf gera a folha A4 para impressão (8 por página, até CARTEIRINHAS_PDF_MAX);
+    senão um .zip com os PNGs, enviado em streaming e sem limite.
+    """
+    from services.card_service import CardService, dados_cartao
+    ids = _ler_ids()
+    consulta = MembroService(current_user.igreja_id).consulta(
+        cargo=request.args.get('cargo') or None,
+        ativo=None if ids is not None else True,
+    )
+    if ids is not None:
+        consulta = consulta.filter(Membro.id.in_(ids))
+
+    # Só as colunas usadas na carteirinha (nada de objetos ORM completos)
+    linhas = consulta.with_entities(
+        Membro.id, Membro.nome, Membro.cargo, Membro.data_nascimento, Membro.igreja_id
+    ).order_by(Membro.nome, Membro.id)
+    membros = [dados_cartao(linha) for linha in linhas]
+
+    if not membros:
+        flash('Nenhum membro encontrado para gerar carteirinhas.')
+        return redirect(url_for('membros.lista'))
+
+    servico = CardService()
+    if request.args.get('formato') == 'pdf':
+        # O FPDF segura todas as imagens até o output(): a folha em PDF tem limite, o zip não
+        if len(membros) > Config.CARTEIRINHAS_PDF_MAX:
+            abort(413, description=f'A folha em PDF aceita até {Config.CARTEIRINHAS_PDF_MAX} carteirinhas '
+                                   f'({len(membros)} pedidas). Filtre por cargo/ids ou baixe o .zip.')
+        with cronometro('render'):
+            folha = servico.gerar_folha_impressao(membros)
+        response = make_response(folha)
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = 'attachment; filename=Carteirinhas.pdf'
+        return response
+
+    # Zip vai sendo enviado enquanto as carteirinhas são renderizadas
+    return Response(
+        servico.gerar_zip(membros),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=Carteirinhas.zip'},
+    )
+
+@membros_bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+def importar():
+    from services.importacao_service import ImportacaoMembrosService
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or arquivo.filename == '':
+            flash('Selecione uma planilha (.csv ou .xlsx).')
+            return redirect(url_for('membros.importar'))
+
+        def progresso(parcial):
+            current_app.logger.info('Importação igreja %s: %s linhas lidas, %s importadas',
+                                    current_user.igreja_id, parcial.lidas, parcial.importados)
+        try:
+            resultado = ImportacaoMembrosService(current_user.igreja_id, progresso).importar(arquivo.stream, arquivo.filename)
+            flash(f'{resultado.importados} membros importados, {resultado.duplicados} duplicados, '
+                  f'{resultado.total_erros} linhas com erro.')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Erro na importação: {e}')
+    return render_template('membros/importar.html', resultado=resultado)
+
+@membros_bp.cli.command('importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--igreja', 'igreja_id', type=int, required=True, help='ID da igreja que recebe os membros')
+def importar_cli(arquivo, igreja_id):
+    """Importa membros de uma planilha CSV/XLSX (flask membros importar arquivo.csv --igreja 1)."""
+    from services.importacao_service import ImportacaoMembrosService
+    def progresso(parcial):
+        click.echo(f'{parcial.lidas} linhas lidas, {parcial.importados} importadas, {parcial.duplicados} duplicadas')
+
+    with open(arquivo, 'rb') as f:
+        resultado = ImportacaoMembrosService(igreja_id, progresso).importar(f, arquivo)
+    for linha, mensagem in resultado.ocorrencias:
+        click.echo(f'Linha {linha}: {mensagem}', err=True)
+    click.echo(f'Concluído: {resultado.importados} importados, {resultado.duplicados} duplicados, '
+               f'{resultado.total_erros} com erro.')
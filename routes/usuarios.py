@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from models import db, Usuario, LogAuditoria
+from models import db, Usuario
+from utils.auditoria import registrar_log
+from utils.sessao import cache_sessao
 from sqlalchemy.exc import IntegrityError
 from functools import wraps
 
@@ -15,13 +17,6 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def registrar_log(acao, entidade, id_ref, detalhes):
-    try:
-        user_id = current_user.id
-        novo_log = LogAuditoria(acao=acao, entidade=entidade, entidade_id=id_ref, detalhes=detalhes, usuario_id=user_id)
-        db.session.add(novo_log)
-    except: pass
-
 @usuarios_bp.route('/')
 @login_required
 @admin_required
@@ -51,6 +46,7 @@ def novo():
             db.session.flush()
             registrar_log("CREATE_USER", "Usuario", novo.id, f"Criou: {novo.email}")
             db.session.commit()
+            cache_sessao.invalidar_usuario(novo.id)
             
             flash('Usuário criado!')
             return redirect(url_for('usuarios.lista'))
@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from services.verificacao_service import verificar_codigos
+from utils.auditoria import registrar_log
+from models import db
+from config import Config
+
+verificacao_bp = Blueprint('verificacao', __name__, url_prefix='/verificar')
+
+# Leitura dos QR das carteirinhas. Nada aqui importa PIL/qrcode: o código é
+# conferido pelo HMAC e a situação do membro vem do cache (services/verificacao_service.py).
+
+@verificacao_bp.route('/<codigo>')
+def verificar(codigo):
+    """Pública: confere uma carteirinha (quem tem o cartão em mãos vê nome, cargo e situação)."""
+    resultado = verificar_codigos([codigo])[0]
+    return jsonify(resultado), 200 if resultado['valido'] else 404
+
+@verificacao_bp.route('/checkin', methods=['POST'])
+@login_required
+def checkin():
+    """Check-in em lote: {"codigos": [...]} lidos na porta, respondidos na mesma ordem."""
+    dados = request.get_json(silent=True) or {}
+    codigos = dados.get('codigos')
+    if not isinstance(codigos, list) or not all(isinstance(c, str) for c in codigos):
+        return jsonify({'erro': 'Envie {"codigos": ["...", ...]}'}), 400
+    if len(codigos) > Config.CHECKIN_MAX_CODIGOS:
+        return jsonify({'erro': f'No máximo {Config.CHECKIN_MAX_CODIGOS} códigos por requisição'}), 413
+
+    resultados = verificar_codigos(codigos, igreja_id=current_user.igreja_id)
+    resumo = {}
+    for resultado in resultados:
+        resumo[resultado['situacao']] = resumo.get(resultado['situacao'], 0) + 1
+
+    if codigos:
+        # Um registro de auditoria por lote, não por código lido
+        registrar_log("CHECKIN", "Membro", None,
+                      f"{len(codigos)} carteirinhas lidas: " + ', '.join(f'{s} {n}' for s, n in sorted(resumo.items())))
+        db.session.commit()
+    return jsonify({'resultados': resultados, 'resumo': resumo})
@@ -0,0 +1,202 @@
+"""
+Leitura e manutenção do log de auditoria.
+
+- AuditoriaService: consulta do visualizador, sempre dentro de uma igreja, com
+  paginação por chave em (data_hora, id) do mais novo para o mais antigo.
+- Partições (PostgreSQL): a tabela é particionada por mês em data_hora
+  (log_auditoria_AAAA_MM + log_auditoria_padrao para o que cair fora).
+  garantir_particoes() cria as dos próximos meses antes que sejam necessárias.
+- Retenção: arquivar_antigos() grava os meses além da retenção em arquivos
+  .jsonl.gz (um por mês) e tira essas linhas do banco. No PostgreSQL a partição
+  inteira sai com DETACH + DROP; no SQLite os meses antigos são apagados em
+  blocos e a tabela vira uma janela móvel dos últimos meses.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timedelta
+import sqlalchemy as sa
+from models import LogAuditoria
+from utils.paginacao import paginar_keyset
+
+ACOES = {
+    'CREATE': 'Cadastro de membro',
+    'UPDATE': 'Edição de membro',
+    'ARCHIVE': 'Membro arquivado',
+    'REACTIVATE': 'Membro reativado',
+    'IMPORT': 'Importação de membros',
+    'CREATE_FIN': 'Lançamento financeiro',
+    'CREATE_FIN_LOTE': 'Lançamentos em lote',
+    'CHECKIN': 'Check-in de carteirinhas',
+    'CREATE_USER': 'Novo usuário',
+    'UPDATE_CONFIG': 'Configurações',
+    'UPDATE_LOGO': 'Logo',
+    'SIGNUP': 'Criação da conta',
+}
+ENTIDADES = ('Membro', 'Lancamento', 'Usuario', 'Igreja')
+
+TABELA = LogAuditoria.__table__
+PARTICAO_PADRAO = 'log_auditoria_padrao'
+_NOME_PARTICAO = re.compile(r'^log_auditoria_(\d{4})_(\d{2})$')
+
+
+class AuditoriaService:
+    """Consultas do visualizador de auditoria (filtros + paginação por chave)."""
+
+    def __init__(self, igreja_id):
+        self.igreja_id = igreja_id
+
+    def consulta(self, acao=None, entidade=None, usuario_id=None, inicio=None, fim=None):
+        consulta = LogAuditoria.query.filter_by(igreja_id=self.igreja_id)
+        if acao:
+            consulta = consulta.filter(LogAuditoria.acao == acao)
+        if entidade:
+            consulta = consulta.filter(LogAuditoria.entidade == entidade)
+        if usuario_id:
+            consulta = consulta.filter(LogAuditoria.usuario_id == usuario_id)
+        # Intervalo de datas também limita as partições lidas no PostgreSQL
+        if inicio:
+            consulta = consulta.filter(LogAuditoria.data_hora >= datetime.combine(inicio, datetime.min.time()))
+        if fim:
+            consulta = consulta.filter(LogAuditoria.data_hora < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+        return consulta
+
+    def pagina(self, cursor=None, limite=50, **filtros):
+        """Retorna (logs, proximo_cursor), do mais recente para o mais antigo."""
+        return paginar_keyset(
+            self.consulta(**filtros),
+            [LogAuditoria.data_hora, LogAuditoria.id],
+            cursor=cursor,
+            limite=limite,
+            decrescente=True,
+        )
+
+
+# --- Partições e retenção ---
+
+def _somar_meses(dia, meses):
+    total = dia.year * 12 + dia.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(mes):
+    return f'log_auditoria_{mes.year}_{mes.month:02d}'
+
+
+def particionada(conexao):
+    return conexao.dialect.name == 'postgresql'
+
+
+def _particoes_mensais(conexao):
+    """{primeiro dia do mês: nome} das partições mensais existentes (PostgreSQL)."""
+    nomes = conexao.scalars(sa.text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'log_auditoria'"
+    ))
+    particoes = {}
+    for nome in nomes:
+        encontrado = _NOME_PARTICAO.match(nome)
+        if encontrado:
+            particoes[date(int(encontrado[1]), int(encontrado[2]), 1)] = nome
+    return particoes
+
+
+def criar_particao(conexao, mes):
+    """
+    Cria a partição do mês. Se a partição padrão já tiver linhas desse mês, elas
+    são movidas para a tabela nova antes do ATTACH (o PostgreSQL recusaria a
+    criação direta com linhas conflitantes na padrão).
+    """
+    nome, seguinte = nome_particao(mes), _somar_meses(mes, 1)
+    limites = {'inicio': datetime(mes.year, mes.month, 1), 'fim': datetime(seguinte.year, seguinte.month, 1)}
+    conexao.execute(sa.text(f'CREATE TABLE {nome} (LIKE log_auditoria INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conexao.execute(sa.text(
+        f'WITH movidas AS (DELETE FROM {PARTICAO_PADRAO} WHERE data_hora >= :inicio AND data_hora < :fim RETURNING *) '
+        f'INSERT INTO {nome} SELECT * FROM movidas'
+    ), limites)
+    conexao.execute(sa.text(
+        f"ALTER TABLE log_auditoria ATTACH PARTITION {nome} "
+        f"FOR VALUES FROM ('{limites['inicio']:%Y-%m-%d}') TO ('{limites['fim']:%Y-%m-%d}')"
+    ))
+    return nome
+
+
+def garantir_particoes(conexao, meses_a_frente=3, hoje=None):
+    """Cria as partições do mês atual e dos próximos meses (só PostgreSQL). Retorna as criadas."""
+    if not particionada(conexao):
+        return []
+    atual = (hoje or date.today()).replace(day=1)
+    existentes = _particoes_mensais(conexao)
+    criadas = []
+    for i in range(meses_a_frente + 1):
+        mes = _somar_meses(atual, i)
+        if mes not in existentes:
+            criadas.append(criar_particao(conexao, mes))
+    return criadas
+
+
+def _exportar(conexao, tabela, pasta, mes, condicao=None):
+    """Acrescenta as linhas ao arquivo .jsonl.gz do mês. Retorna quantas foram gravadas."""
+    consulta = sa.select(*[tabela.c[c.name] for c in TABELA.columns]).order_by(tabela.c.id)
+    if condicao is not None:
+        consulta = consulta.where(condicao)
+
+    total = 0
+    arquivo = None
+    try:
+        for linha in conexao.execute(consulta.execution_options(yield_per=2000)).mappings():
+            if arquivo is None:
+                os.makedirs(pasta, exist_ok=True)
+                # 'at': se o mês já tiver arquivo (execução anterior), o gzip ganha um novo membro
+                arquivo = gzip.open(os.path.join(pasta, f'{nome_particao(mes)}.jsonl.gz'), 'at', encoding='utf-8')
+            arquivo.write(json.dumps(dict(linha), default=str, ensure_ascii=False) + '\n')
+            total += 1
+    finally:
+        if arquivo is not None:
+            arquivo.close()
+    return total
+
+
+def arquivar_antigos(sessao, pasta, retencao_meses, hoje=None, ao_arquivar=None):
+    """
+    Move para `pasta` tudo o que for anterior aos últimos `retencao_meses` meses.
+    Cada mês é gravado no arquivo e só então apagado do banco, com commit por mês.
+    Retorna {mês: linhas arquivadas}.
+    """
+    limite = _somar_meses((hoje or date.today()).replace(day=1), -retencao_meses)
+    arquivados = {}
+
+    if particionada(sessao.connection()):
+        for mes, nome in sorted(_particoes_mensais(sessao.connection()).items()):
+            if mes >= limite:
+                continue
+            conexao = sessao.connection()
+            arquivados[mes] = _exportar(conexao, sa.table(nome, *[sa.column(c.name) for c in TABELA.columns]), pasta, mes)
+            conexao.execute(sa.text(f'ALTER TABLE log_auditoria DETACH PARTITION {nome}'))
+            conexao.execute(sa.text(f'DROP TABLE {nome}'))
+            sessao.commit()
+            if ao_arquivar:
+                ao_arquivar(mes, arquivados[mes])
+
+    # SQLite (tabela única) e sobras antigas da partição padrão no PostgreSQL
+    mais_antigo = sessao.connection().scalar(sa.select(sa.func.min(TABELA.c.data_hora)).where(
+        TABELA.c.data_hora < datetime(limite.year, limite.month, 1)))
+    if mais_antigo is not None:
+        mes = date(mais_antigo.year, mais_antigo.month, 1)
+        while mes < limite:
+            seguinte = _somar_meses(mes, 1)
+            condicao = sa.and_(TABELA.c.data_hora >= datetime(mes.year, mes.month, 1),
+                               TABELA.c.data_hora < datetime(seguinte.year, seguinte.month, 1))
+            conexao = sessao.connection()
+            total = _exportar(conexao, TABELA, pasta, mes, condicao)
+            if total:
+                conexao.execute(TABELA.delete().where(condicao))
+                sessao.commit()
+                arquivados[mes] = arquivados.get(mes, 0) + total
+                if ao_arquivar:
+                    ao_arquivar(mes, total)
+            mes = seguinte
+    return arquivados
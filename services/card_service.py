@@ -4,8 +4,43 @@ from config import Config
 import os
 from datetime import datetime
 import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from types import SimpleNamespace
+from fpdf import FPDF
+from services.render_cache import chave_conteudo, mtime
+from utils.credencial import assinar, chave_atual, definir_chave
+
+
+# --- CACHES DO PROCESSO (compartilhados entre requisições) ---
+# Carregar uma TrueType e redimensionar a logo custa mais que desenhar a carteirinha inteira.
+
+@lru_cache(maxsize=128)
+def _fonte_em_cache(font_file, tamanho, bold):
+    try:
+        return ImageFont.truetype(font_file, tamanho)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=32)
+def _logo_em_cache(igreja_id, caminho, mtime, altura):
+    """Logo já convertida e redimensionada. O mtime na chave invalida quando o arquivo muda."""
+    logo = Image.open(caminho).convert("RGBA")
+    aspect = logo.width / logo.height
+    return logo.resize((int(altura * aspect), altura))
+
+
+def limpar_caches():
+    _fonte_em_cache.cache_clear()
+    _logo_em_cache.cache_clear()
+
 
 class CardService:
+    # Mude quando o desenho da carteirinha mudar (invalida o cache de renderização)
+    VERSAO_LAYOUT = 2
+
     def __init__(self):
         self.WIDTH = 1011
         self.HEIGHT = 638
@@ -26,28 +61,61 @@ class CardService:
         self.font_Bold = "arialbd.ttf"
 
     def _carregar_fonte(self, tamanho, bold=False):
-        try:
-            font_file = self.font_Bold if bold else self.font_Regular
-            return ImageFont.truetype(font_file, tamanho)
-        except:
-            return ImageFont.load_default()
+        font_file = self.font_Bold if bold else self.font_Regular
+        return _fonte_em_cache(font_file, tamanho, bold)
+
+    def _caminho_logo(self, igreja_id):
+        # Mesma regra do PDFService: logo personalizada da igreja, senão a padrão
+        caminho_custom = os.path.join(Config.BASE_DIR, 'static', 'logos', f'logo_{igreja_id}.png')
+        if os.path.exists(caminho_custom):
+            return caminho_custom
+        if os.path.exists(Config.LOGO_PATH):
+            return Config.LOGO_PATH
+        return None
+
+    def _caminho_foto(self, membro_id):
+        # Padrão: static/uploads/membro_ID.png
+        return os.path.join(Config.BASE_DIR, 'static', 'uploads', f'membro_{membro_id}.png')
 
-    def _desenhar_texto_ajustavel(self, draw, text, x, y, max_width, initial_size, color, bold=True):
+    def chave_cache(self, membro):
+        """Hash de tudo que aparece na carteirinha (usado no cache e como ETag)."""
+        caminho_logo = self._caminho_logo(membro.igreja_id)
+        return chave_conteudo(
+            'carteirinha', self.VERSAO_LAYOUT,
+            membro.id, membro.nome, membro.cargo, membro.data_nascimento, membro.igreja_id,
+            mtime(self._caminho_foto(membro.id)),
+            caminho_logo, mtime(caminho_logo) if caminho_logo else 0,
+            datetime.now().year,
+        )
+
+    def _carregar_logo(self, igreja_id, altura):
+        caminho = self._caminho_logo(igreja_id)
+        if not caminho:
+            return None
+        return _logo_em_cache(igreja_id, caminho, os.path.getmtime(caminho), altura)
+
+    def _desenhar_texto_ajustavel(self, draw, text, x, y, max_width, initial_size, color, bold=True, min_size=10):
         """
-        Reduz o tamanho da fonte até que o texto caiba na largura máxima permitida.
+        Usa o maior tamanho de fonte (entre min_size e initial_size) em que o texto
+        cabe na largura máxima. Busca binária: ~5 medições em vez de uma por passo.
         """
-        size = initial_size
-        font = self._carregar_fonte(size, bold)
-        
-        # Loop para reduzir fonte se estourar a largura
-        while draw.textlength(text, font=font) > max_width and size > 10:
-            size -= 2
-            font = self._carregar_fonte(size, bold)
-            
-        draw.text((x, y), text, font=font, fill=color)
+        if draw.textlength(text, font=self._carregar_fonte(initial_size, bold)) <= max_width:
+            size = initial_size
+        else:
+            menor, maior = min_size, initial_size - 1
+            size = min_size
+            while menor <= maior:
+                meio = (menor + maior) // 2
+                if draw.textlength(text, font=self._carregar_fonte(meio, bold)) <= max_width:
+                    size = meio
+                    menor = meio + 1
+                else:
+                    maior = meio - 1
+
+        draw.text((x, y), text, font=self._carregar_fonte(size, bold), fill=color)
         return size # Retorna o tamanho usado (útil para debug)
 
-    def gerar_frente(self, membro):
+    def gerar_frente(self, membro, formato='PNG'):
         # 1. Base Dark
         img = Image.new('RGB', (self.WIDTH, self.HEIGHT), self.COR_FUNDO)
         draw = ImageDraw.Draw(img)
@@ -59,20 +127,15 @@ class CardService:
         draw.rectangle([(0, altura_header), (self.WIDTH, altura_header + 6)], fill=self.COR_ACCENT)
 
         # --- LOGO DA IGREJA ---
-        if os.path.exists(Config.LOGO_PATH):
-            try:
-                logo = Image.open(Config.LOGO_PATH).convert("RGBA")
-                # Redimensiona para caber no header (altura 180px com margem)
-                aspect = logo.width / logo.height
-                new_h = 160
-                new_w = int(new_h * aspect)
-                logo = logo.resize((new_w, new_h))
-                
+        try:
+            # Redimensionada para caber no header (altura 160px com margem), vem do cache
+            logo = self._carregar_logo(membro.igreja_id, 160)
+            if logo:
                 # Cria uma máscara para colar (caso seja PNG transparente)
                 # Se for JPG preto, vai fundir com o fundo preto do header
                 img.paste(logo, (30, 20), logo if 'A' in logo.getbands() else None)
-            except Exception as e:
-                print(f"Erro logo: {e}")
+        except Exception as e:
+            print(f"Erro logo: {e}")
 
         # --- TEXTO DO CABEÇALHO (Alinhado à direita do Logo) ---
         # Parte 1: ASSEMBLEIA DE DEUS
@@ -92,8 +155,7 @@ class CardService:
         foto_w, foto_h = 240, 300
         
         # Caminho da foto específica do membro
-        # Padrão: static/uploads/membro_ID.png (ou jpg)
-        caminho_foto = os.path.join(Config.BASE_DIR, 'static', 'uploads', f'membro_{membro.id}.png')
+        caminho_foto = self._caminho_foto(membro.id)
         
         foto_carregada = False
         if os.path.exists(caminho_foto):
@@ -159,7 +221,8 @@ class CardService:
         qr_y = self.HEIGHT - qr_size - 40
         
         qr = qrcode.QRCode(box_size=4, border=1)
-        qr.add_data(f"ID:{membro.id}|{membro.nome}")
+        # Código assinado (utils/credencial.py), conferido em /verificar sem ir ao banco
+        qr.add_data(assinar(membro.igreja_id, membro.id))
         qr.make(fit=True)
         # QR Code Preto e Dourado
         img_qr = qr.make_image(fill_color="black", back_color=self.COR_ACCENT)
@@ -167,8 +230,127 @@ class CardService:
         
         img.paste(img_qr, (qr_x, qr_y))
 
-        # Retornar Bytes
+        # Retornar Bytes (JPEG é usado na folha de impressão: bem menor dentro do PDF)
         img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
+        if formato == 'JPEG':
+            img.save(img_byte_arr, format='JPEG', quality=90)
+        else:
+            img.save(img_byte_arr, format='PNG')
         img_byte_arr.seek(0)
-        return img_byte_arr
\ No newline at end of file
+        return img_byte_arr
+
+    # --- GERAÇÃO EM LOTE ---
+
+    def renderizar_lote(self, membros, formato='PNG'):
+        """
+        Gera as carteirinhas de vários membros, na ordem recebida, usando o pool de processos.
+        `membros` são dicts (ver dados_cartao). Renderiza em blocos pequenos para nunca
+        segurar todas as imagens na memória: cada bloco é entregue e descartado.
+        Gera tuplas (dados_membro, bytes_da_imagem).
+        """
+        pool = _pool_de_processos()
+        bloco = []
+        for dados in membros:
+            bloco.append(dados)
+            if len(bloco) >= TAMANHO_BLOCO_LOTE:
+                yield from self._renderizar_bloco(pool, bloco, formato)
+                bloco = []
+        if bloco:
+            yield from self._renderizar_bloco(pool, bloco, formato)
+
+    def _renderizar_bloco(self, pool, bloco, formato):
+        argumentos = [(dados, formato) for dados in bloco]
+        if pool is None:
+            resultados = map(_renderizar_cartao, argumentos)
+        else:
+            resultados = pool.map(_renderizar_cartao, argumentos)
+        yield from zip(bloco, resultados)
+
+    def gerar_zip(self, membros):
+        """Stream de um .zip (um PNG por membro), entregue em pedaços conforme renderiza."""
+        saida = _SaidaEmPedacos()
+        # PNG já é comprimido: ZIP_STORED evita gastar CPU à toa
+        with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+            for dados, imagem in self.renderizar_lote(membros, 'PNG'):
+                arquivo_zip.writestr(_nome_arquivo_cartao(dados), imagem)
+                yield saida.extrair()
+        yield saida.extrair()
+
+    def gerar_folha_impressao(self, membros):
+        """
+        PDF A4 com 8 carteirinhas por página (2 colunas x 4 linhas, tamanho CR80 85,6x54mm).
+        As imagens vão como JPEG, mas o FPDF guarda todas até o output(): a memória
+        cresce com o lote (a rota limita em CARTEIRINHAS_PDF_MAX; lotes grandes vão pelo zip).
+        """
+        largura, altura = 85.6, 54.0
+        margem_x = (210 - 2 * largura) / 2
+        margem_y = (297 - 4 * altura) / 2
+
+        pdf = FPDF(orientation='P', unit='mm', format='A4')
+        pdf.set_auto_page_break(False)
+        for posicao, (dados, imagem) in enumerate(self.renderizar_lote(membros, 'JPEG')):
+            indice = posicao % CARTOES_POR_PAGINA
+            if indice == 0:
+                pdf.add_page()
+            coluna, linha = indice % 2, indice // 2
+            pdf.image(io.BytesIO(imagem), x=margem_x + coluna * largura, y=margem_y + linha * altura, w=largura, h=altura)
+        if not pdf.pages:
+            pdf.add_page()
+        return bytes(pdf.output())
+
+
+TAMANHO_BLOCO_LOTE = 16
+CARTOES_POR_PAGINA = 8
+_pool = None
+
+
+def _pool_de_processos():
+    """Pool criado sob demanda e reaproveitado pelo processo (None = renderiza em série)."""
+    global _pool
+    processos = Config.CARTEIRINHAS_PROCESSOS
+    if processos <= 1:
+        return None
+    if _pool is None:
+        # Com spawn/forkserver os processos não herdam a chave do QR: vai no initializer
+        _pool = ProcessPoolExecutor(max_workers=processos, initializer=definir_chave, initargs=(chave_atual(),))
+    return _pool
+
+
+def dados_cartao(membro):
+    """Só o que a carteirinha precisa, em tipos simples (cruza a fronteira do processo)."""
+    return {
+        'id': membro.id,
+        'nome': membro.nome,
+        'cargo': membro.cargo,
+        'data_nascimento': membro.data_nascimento,
+        'igreja_id': membro.igreja_id,
+    }
+
+
+def _renderizar_cartao(argumentos):
+    dados, formato = argumentos
+    return CardService().gerar_frente(SimpleNamespace(**dados), formato).getvalue()
+
+
+def _nome_arquivo_cartao(dados):
+    nome = ''.join(c if c.isalnum() else '_' for c in (dados['nome'] or '')).strip('_')
+    return f"carteirinha_{dados['id']}_{nome[:60]}.png"
+
+
+class _SaidaEmPedacos(io.RawIOBase):
+    """Arquivo só-escrita que acumula bytes até serem extraídos (para streaming do zip)."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def extrair(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Números do painel inicial, em cache por igreja.
+
+O painel é a primeira página depois do login. Em vez de contar membros e somar
+lançamentos a cada acesso, cada processo guarda um retrato por igreja e o
+atualiza de forma incremental quando membros ou lançamentos são criados,
+arquivados ou reativados (eventos da sessão, aplicados só depois do commit).
+Casos raros (exclusão física, edição de lançamento, importação em lote) apenas
+descartam o retrato da igreja; o TTL cobre as alterações feitas em outros workers.
+"""
+import threading
+import time
+from datetime import date
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import db, Membro, Lancamento, SaldoMensal
+from utils.dinheiro import de_centavos
+
+CHAVE_PENDENTES = 'dashboard_pendente'
+LIMITE_RECENTES = 10  # guardados; o painel mostra 5
+CAMPOS_MEMBRO = ('nome', 'cargo', 'ativo', 'deleted_at', 'data_nascimento')
+
+
+class EstatisticasIgreja:
+    """Retrato do painel de uma igreja (o template lê estes atributos)."""
+
+    __slots__ = ('ano', 'mes', 'expira_em', 'membros_ativos', 'aniversariantes',
+                 'entradas_centavos', 'saidas_centavos', 'ultimos_membros', 'ultimos_lancamentos')
+
+    @property
+    def entradas_mes(self):
+        return de_centavos(self.entradas_centavos)
+
+    @property
+    def saidas_mes(self):
+        return de_centavos(self.saidas_centavos)
+
+    @property
+    def saldo_mes(self):
+        return de_centavos(self.entradas_centavos - self.saidas_centavos)
+
+
+def _dados_lancamento(lancamento):
+    return {'id': lancamento.id, 'data': lancamento.data, 'tipo': lancamento.tipo,
+            'categoria': lancamento.categoria, 'valor': de_centavos(lancamento.valor_centavos)}
+
+
+class CacheDashboard:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._itens = {}  # igreja_id -> EstatisticasIgreja
+        self._lock = threading.Lock()
+
+    # --- Leitura ---
+
+    def obter(self, igreja_id):
+        hoje = date.today()
+        estatisticas = self._itens.get(igreja_id)
+        if (estatisticas is None or estatisticas.expira_em <= time.monotonic()
+                or (estatisticas.ano, estatisticas.mes) != (hoje.year, hoje.month)):
+            estatisticas = self.calcular(igreja_id, hoje)
+            with self._lock:
+                self._itens[igreja_id] = estatisticas
+        return estatisticas
+
+    def calcular(self, igreja_id, hoje):
+        """Recalcula tudo no banco (só no primeiro acesso, na virada do mês ou após o TTL)."""
+        e = EstatisticasIgreja()
+        e.ano, e.mes = hoje.year, hoje.month
+        e.expira_em = time.monotonic() + self.ttl
+
+        membros = Membro.query.filter_by(igreja_id=igreja_id, deleted_at=None)
+        e.membros_ativos = membros.filter_by(ativo=True).count()
+        e.aniversariantes = sorted(
+            ({'id': m.id, 'nome': m.nome, 'dia': m.data_nascimento.day}
+             for m in membros.filter(Membro.ativo.is_(True),
+                                     db.extract('month', Membro.data_nascimento) == hoje.month)
+             .with_entities(Membro.id, Membro.nome, Membro.data_nascimento)),
+            key=lambda a: (a['dia'], a['nome']),
+        )
+        e.ultimos_membros = [
+            {'id': m.id, 'nome': m.nome, 'cargo': m.cargo}
+            for m in membros.with_entities(Membro.id, Membro.nome, Membro.cargo)
+            .order_by(Membro.id.desc()).limit(LIMITE_RECENTES)
+        ]
+
+        saldo = SaldoMensal.query.filter_by(igreja_id=igreja_id, ano=hoje.year, mes=hoje.month).first()
+        e.entradas_centavos = saldo.entradas_centavos if saldo else 0
+        e.saidas_centavos = saldo.saidas_centavos if saldo else 0
+        e.ultimos_lancamentos = [
+            _dados_lancamento(l) for l in
+            Lancamento.query.filter_by(igreja_id=igreja_id)
+            .order_by(Lancamento.id.desc()).limit(LIMITE_RECENTES)
+        ]
+        return e
+
+    # --- Atualização incremental ---
+
+    def aplicar(self, pendentes):
+        with self._lock:
+            for tipo, igreja_id, dados in pendentes:
+                estatisticas = self._itens.get(igreja_id)
+                if estatisticas is None:
+                    continue  # nada em cache: o próximo acesso calcula do zero
+                if tipo == 'invalidar':
+                    self._itens.pop(igreja_id, None)
+                elif tipo == 'membro':
+                    self._aplicar_membro(estatisticas, dados)
+                elif tipo == 'lancamento':
+                    self._aplicar_lancamento(estatisticas, dados)
+
+    def _aplicar_membro(self, e, dados):
+        e.membros_ativos += dados['conta_depois'] - dados['conta_antes']
+
+        nascimento = dados['data_nascimento']
+        e.aniversariantes = [a for a in e.aniversariantes if a['id'] != dados['id']]
+        if dados['conta_depois'] and nascimento and nascimento.month == e.mes:
+            e.aniversariantes.append({'id': dados['id'], 'nome': dados['nome'], 'dia': nascimento.day})
+            e.aniversariantes.sort(key=lambda a: (a['dia'], a['nome']))
+
+        # Lista ordenada por id decrescente; um reativado só entra se couber na janela guardada
+        recentes = [m for m in e.ultimos_membros if m['id'] != dados['id']]
+        if not dados['arquivado'] and (dados['novo'] or len(recentes) < len(e.ultimos_membros)
+                                       or (recentes and dados['id'] > recentes[-1]['id'])):
+            recentes.append({'id': dados['id'], 'nome': dados['nome'], 'cargo': dados['cargo']})
+            recentes.sort(key=lambda m: m['id'], reverse=True)
+        e.ultimos_membros = recentes[:LIMITE_RECENTES]
+
+    def _aplicar_lancamento(self, e, dados):
+        if (dados['data'].year, dados['data'].month) == (e.ano, e.mes):
+            if dados['tipo'] == 'entrada':
+                e.entradas_centavos += dados['valor_centavos']
+            else:
+                e.saidas_centavos += dados['valor_centavos']
+        e.ultimos_lancamentos = ([dados['recente']] + e.ultimos_lancamentos)[:LIMITE_RECENTES]
+
+    def invalidar(self, igreja_id):
+        with self._lock:
+            self._itens.pop(igreja_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_dashboard = CacheDashboard(ttl=300)
+
+
+def configurar_cache_dashboard(app):
+    cache_dashboard.ttl = app.config.get('DASHBOARD_CACHE_TTL', 300)
+
+
+# --- EVENTOS DA SESSÃO ---
+
+def _conta_como_ativo(ativo, deleted_at):
+    return 1 if ativo and deleted_at is None else 0
+
+
+def _alteracao_membro(membro, novo):
+    """Dados para o delta do membro, ou None se não der para saber o estado anterior."""
+    estado = inspect(membro)
+    anteriores = {}
+    for campo in CAMPOS_MEMBRO:
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            anteriores[campo] = historico.deleted[0]
+        elif historico.added and not novo:
+            return None  # valor antigo não estava carregado
+        else:
+            anteriores[campo] = getattr(membro, campo)
+    if not novo and anteriores == {campo: getattr(membro, campo) for campo in CAMPOS_MEMBRO}:
+        return False  # nada que apareça no painel mudou
+
+    return {
+        'id': membro.id, 'nome': membro.nome, 'cargo': membro.cargo,
+        'data_nascimento': membro.data_nascimento,
+        'novo': novo,
+        'arquivado': membro.deleted_at is not None,
+        'conta_antes': 0 if novo else _conta_como_ativo(anteriores['ativo'], anteriores['deleted_at']),
+        'conta_depois': _conta_como_ativo(membro.ativo if membro.ativo is not None else True, membro.deleted_at),
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_alteracoes(session, flush_context):
+    pendentes = []
+    for obj, novo in [(o, True) for o in session.new] + [(o, False) for o in session.dirty]:
+        if isinstance(obj, Membro):
+            dados = _alteracao_membro(obj, novo)
+            if dados is None:
+                pendentes.append(('invalidar', obj.igreja_id, None))
+            elif dados:
+                pendentes.append(('membro', obj.igreja_id, dados))
+        elif isinstance(obj, Lancamento):
+            if novo:
+                pendentes.append(('lancamento', obj.igreja_id, {
+                    'data': obj.data, 'tipo': obj.tipo, 'valor_centavos': obj.valor_centavos,
+                    'recente': _dados_lancamento(obj),
+                }))
+            elif session.is_modified(obj):
+                pendentes.append(('invalidar', obj.igreja_id, None))
+    for obj in session.deleted:
+        if isinstance(obj, (Membro, Lancamento)):
+            pendentes.append(('invalidar', obj.igreja_id, None))
+    if pendentes:
+        session.info.setdefault(CHAVE_PENDENTES, []).extend(pendentes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_apos_commit(session):
+    pendentes = session.info.pop(CHAVE_PENDENTES, None)
+    if pendentes:
+        cache_dashboard.aplicar(pendentes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_no_rollback(session):
+    session.info.pop(CHAVE_PENDENTES, None)
@@ -0,0 +1,265 @@
+import threading
+import time
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Lancamento, Membro, SaldoMensal
+from utils.dinheiro import de_centavos
+
+CHAVE_DIZIMISTAS = 'dizimistas_pendente'
+LIMITE_DIZIMISTAS = 10
+JANELA_DIZIMISTAS = 200  # lançamentos recentes lidos para montar a lista
+
+
+class FinanceiroService:
+    """
+    Consolida os números da Tesouraria direto no banco.
+    Saldo e totais mensais vêm da tabela SaldoMensal (O(meses));
+    quebras por categoria usam GROUP BY sobre os lançamentos.
+    """
+
+    def __init__(self, igreja_id):
+        self.igreja_id = igreja_id
+
+    def _consulta(self, *colunas):
+        # Filtro explícito da igreja (o Guarda-Costas só cobre consultas ORM de entidade)
+        return db.session.query(*colunas).filter(Lancamento.igreja_id == self.igreja_id)
+
+    def totais_por_tipo(self):
+        """Retorna {'entrada': {'total': x, 'quantidade': n}, 'saida': {...}}"""
+        linhas = (
+            self._consulta(Lancamento.tipo, func.sum(Lancamento.valor_centavos), func.count(Lancamento.id))
+            .group_by(Lancamento.tipo)
+            .all()
+        )
+        totais = {'entrada': {'total': de_centavos(0), 'quantidade': 0}, 'saida': {'total': de_centavos(0), 'quantidade': 0}}
+        for tipo, total, quantidade in linhas:
+            totais[tipo] = {'total': de_centavos(total), 'quantidade': quantidade}
+        return totais
+
+    def resumo(self):
+        """Entradas, saídas e saldo geral da igreja (soma dos meses já consolidados)."""
+        entradas, saidas = (
+            db.session.query(func.sum(SaldoMensal.entradas_centavos), func.sum(SaldoMensal.saidas_centavos))
+            .filter(SaldoMensal.igreja_id == self.igreja_id)
+            .one()
+        )
+        entradas, saidas = entradas or 0, saidas or 0
+        return {
+            'entradas': de_centavos(entradas),
+            'saidas': de_centavos(saidas),
+            'saldo': de_centavos(entradas - saidas),
+        }
+
+    def totais_por_categoria(self, tipo=None):
+        """Lista de (tipo, categoria, total, quantidade), maiores valores primeiro."""
+        consulta = self._consulta(
+            Lancamento.tipo,
+            Lancamento.categoria,
+            func.sum(Lancamento.valor_centavos).label('total'),
+            func.count(Lancamento.id),
+        )
+        if tipo:
+            consulta = consulta.filter(Lancamento.tipo == tipo)
+        linhas = (
+            consulta.group_by(Lancamento.tipo, Lancamento.categoria)
+            .order_by(func.sum(Lancamento.valor_centavos).desc())
+            .all()
+        )
+        return [(tipo, categoria, de_centavos(total), quantidade) for tipo, categoria, total, quantidade in linhas]
+
+    def totais_por_mes(self, ano=None):
+        """Lista de dicts {'ano', 'mes', 'entradas', 'saidas', 'saldo'} em ordem cronológica."""
+        consulta = SaldoMensal.query.filter_by(igreja_id=self.igreja_id)
+        if ano:
+            consulta = consulta.filter_by(ano=ano)
+        return [
+            {'ano': s.ano, 'mes': s.mes, 'entradas': s.entradas, 'saidas': s.saidas, 'saldo': s.saldo}
+            for s in consulta.order_by(SaldoMensal.ano, SaldoMensal.mes)
+        ]
+
+
+# --- SALDO MENSAL INCREMENTAL ---
+
+CAMPOS_SALDO = ('igreja_id', 'data', 'tipo', 'valor_centavos')
+
+
+def aplicar_no_saldo_mensal(conexao, lancamentos, sinal=1):
+    """
+    Soma (ou subtrai, com sinal=-1) os lançamentos nos totais mensais, com um
+    UPSERT por (igreja, mês). `lancamentos` são objetos ou dicts com
+    igreja_id, data, tipo e valor_centavos. Use também nas inserções em lote
+    (Core), que não disparam os eventos do ORM.
+    """
+    deltas = {}
+    for item in lancamentos:
+        if not isinstance(item, dict):
+            item = {campo: getattr(item, campo) for campo in CAMPOS_SALDO}
+        chave = (item['igreja_id'], item['data'].year, item['data'].month)
+        entradas, saidas = deltas.get(chave, (0, 0))
+        if item['tipo'] == 'entrada':
+            entradas += sinal * item['valor_centavos']
+        else:
+            saidas += sinal * item['valor_centavos']
+        deltas[chave] = (entradas, saidas)
+    if not deltas:
+        return
+
+    linhas = [
+        {'igreja_id': igreja_id, 'ano': ano, 'mes': mes, 'entradas_centavos': entradas, 'saidas_centavos': saidas}
+        for (igreja_id, ano, mes), (entradas, saidas) in deltas.items()
+    ]
+    dialeto = postgresql if conexao.dialect.name == 'postgresql' else sqlite
+    tabela = SaldoMensal.__table__
+    comando = dialeto.insert(tabela)
+    comando = comando.on_conflict_do_update(
+        index_elements=['igreja_id', 'ano', 'mes'],
+        set_={
+            'entradas_centavos': tabela.c.entradas_centavos + comando.excluded.entradas_centavos,
+            'saidas_centavos': tabela.c.saidas_centavos + comando.excluded.saidas_centavos,
+        },
+    )
+    conexao.execute(comando, linhas)
+
+
+def _manter_historico(alvo, valor, anterior, iniciador):
+    return valor
+
+
+# active_history: mesmo com o atributo expirado, o valor antigo é carregado ao alterar,
+# para o flush saber o que descontar do mês anterior
+for _campo in CAMPOS_SALDO:
+    event.listen(getattr(Lancamento, _campo), 'set', _manter_historico, active_history=True, retval=True)
+
+
+def _valores_anteriores(obj):
+    """Versão do lançamento antes das alterações desta transação (None se nada relevante mudou)."""
+    estado = inspect(obj)
+    anteriores, mudou = {}, False
+    for campo in CAMPOS_SALDO:
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            anteriores[campo] = historico.deleted[0]
+            mudou = True
+        else:
+            anteriores[campo] = getattr(obj, campo)
+    return anteriores if mudou else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_saldo_mensal(session, flush_context):
+    # Mesma transação do lançamento: saldo e lançamentos nunca ficam divergentes
+    somar, subtrair = [], []
+    for obj in session.new:
+        if isinstance(obj, Lancamento):
+            somar.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Lancamento):
+            subtrair.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Lancamento):
+            anteriores = _valores_anteriores(obj)
+            if anteriores:
+                subtrair.append(anteriores)
+                somar.append(obj)
+    if somar:
+        aplicar_no_saldo_mensal(session.connection(), somar)
+    if subtrair:
+        aplicar_no_saldo_mensal(session.connection(), subtrair, sinal=-1)
+
+
+# --- DIZIMISTAS RECENTES (formulário de lançamento) ---
+
+class CacheDizimistas:
+    """
+    Últimos membros vinculados a lançamentos, por igreja: são as primeiras
+    sugestões do formulário, antes de digitar. Montada com uma consulta curta
+    (os lançamentos mais recentes, pelo índice igreja/data) e mantida depois
+    do commit de cada lançamento; o TTL cobre os outros workers.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._itens = {}  # igreja_id -> (expira_em, [{'id', 'nome', 'cpf'}])
+        self._lock = threading.Lock()
+
+    def obter(self, igreja_id):
+        item = self._itens.get(igreja_id)
+        if item is None or item[0] <= time.monotonic():
+            item = (time.monotonic() + self.ttl, self.calcular(igreja_id))
+            with self._lock:
+                self._itens[igreja_id] = item
+        return item[1]
+
+    def calcular(self, igreja_id):
+        linhas = (
+            db.session.query(Membro.id, Membro.nome, Membro.cpf)
+            .join(Lancamento, Lancamento.membro_id == Membro.id)
+            .filter(Lancamento.igreja_id == igreja_id, Membro.deleted_at.is_(None))
+            .order_by(Lancamento.data.desc(), Lancamento.id.desc())
+            .limit(JANELA_DIZIMISTAS)
+        )
+        dizimistas, vistos = [], set()
+        for m in linhas:
+            if m.id not in vistos:
+                vistos.add(m.id)
+                dizimistas.append({'id': m.id, 'nome': m.nome, 'cpf': m.cpf})
+                if len(dizimistas) == LIMITE_DIZIMISTAS:
+                    break
+        return dizimistas
+
+    def aplicar(self, pendentes):
+        with self._lock:
+            for tipo, igreja_id, membro_id in pendentes:
+                item = self._itens.get(igreja_id)
+                if item is None:
+                    continue
+                expira_em, dizimistas = item
+                ids = [d['id'] for d in dizimistas]
+                if tipo == 'lancamento' and membro_id in ids:
+                    # Quem já está na lista só sobe para o topo; novo nome exige recalcular
+                    posicao = ids.index(membro_id)
+                    self._itens[igreja_id] = (expira_em, [dizimistas[posicao]] + dizimistas[:posicao] + dizimistas[posicao + 1:])
+                elif tipo == 'lancamento' or membro_id in ids:
+                    self._itens.pop(igreja_id, None)
+
+    def invalidar(self, igreja_id):
+        with self._lock:
+            self._itens.pop(igreja_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_dizimistas = CacheDizimistas(ttl=300)
+
+
+def configurar_cache_dizimistas(app):
+    cache_dizimistas.ttl = app.config.get('DIZIMISTAS_CACHE_TTL', 300)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_dizimistas(session, flush_context):
+    pendentes = []
+    for obj in session.new:
+        if isinstance(obj, Lancamento) and obj.membro_id:
+            pendentes.append(('lancamento', obj.igreja_id, obj.membro_id))
+    # Membro renomeado, arquivado ou excluído: sai da lista se estiver nela
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Membro):
+            pendentes.append(('membro', obj.igreja_id, obj.id))
+    if pendentes:
+        session.info.setdefault(CHAVE_DIZIMISTAS, []).extend(pendentes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_dizimistas(session):
+    pendentes = session.info.pop(CHAVE_DIZIMISTAS, None)
+    if pendentes:
+        cache_dizimistas.aplicar(pendentes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_dizimistas(session):
+    session.info.pop(CHAVE_DIZIMISTAS, None)
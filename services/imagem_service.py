@@ -0,0 +1,127 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from config import Config
+
+# Variantes geradas no upload (a carteirinha usa a de 240x300 direto, sem redimensionar)
+TAMANHO_CARTAO = (240, 300)
+TAMANHO_MINIATURA = (48, 60)
+ALTURA_MAX_LOGO = 480
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _pool_de_threads():
+    """Pool compartilhado (PIL libera o GIL ao decodificar/codificar). None = processa na hora."""
+    global _pool
+    if Config.UPLOAD_THREADS <= 0:
+        return None
+    with _lock_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=Config.UPLOAD_THREADS, thread_name_prefix='upload')
+        return _pool
+
+
+def _salvar_atomico(caminho, gravar):
+    """Grava num temporário e troca de uma vez: quem lê nunca pega arquivo pela metade."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.tmp{threading.get_ident()}"
+    gravar(temporario)
+    os.replace(temporario, caminho)
+
+
+def _gravar_bytes(caminho, dados):
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(dados)
+
+
+class ImagemService:
+    """Pipeline de upload de fotos de membros e logos das igrejas."""
+
+    def ler_upload(self, arquivo):
+        """
+        Lê o arquivo enviado e valida só o cabeçalho (sem decodificar os pixels).
+        Retorna os bytes; levanta ValueError se não for imagem ou for grande demais.
+        """
+        dados = arquivo.read()
+        try:
+            with Image.open(io.BytesIO(dados)) as img:
+                largura, altura = img.size
+                formato = img.format
+        except Exception:
+            raise ValueError('Arquivo de imagem inválido.')
+        if largura * altura > Config.UPLOAD_MAX_PIXELS:
+            raise ValueError(f'Imagem muito grande ({largura}x{altura}). Envie uma foto de até '
+                             f'{Config.UPLOAD_MAX_PIXELS // 1_000_000} megapixels.')
+        return dados, formato
+
+    # --- Caminhos das variantes ---
+
+    @staticmethod
+    def caminho_foto_cartao(membro_id):
+        return os.path.join(Config.UPLOAD_FOLDER, f"membro_{membro_id}.png")
+
+    @staticmethod
+    def caminho_miniatura(membro_id):
+        return os.path.join(Config.UPLOAD_FOLDER, f"membro_{membro_id}_mini.jpg")
+
+    @staticmethod
+    def caminho_original(nome_base, formato):
+        extensao = (formato or 'img').lower().replace('jpeg', 'jpg')
+        return os.path.join(Config.UPLOAD_FOLDER, 'originais', f"{nome_base}.{extensao}")
+
+    # --- Processamento (fora da requisição) ---
+
+    def salvar_foto_membro(self, membro_id, dados, formato):
+        """Agenda a geração das variantes da foto; a requisição não espera a codificação."""
+        return self._agendar(self._processar_foto, membro_id, dados, formato)
+
+    def salvar_logo(self, igreja_id, dados, formato):
+        return self._agendar(self._processar_logo, igreja_id, dados, formato)
+
+    def _agendar(self, funcao, *argumentos):
+        pool = _pool_de_threads()
+        if pool is None:
+            funcao(*argumentos)
+            return None
+        return pool.submit(self._executar_com_log, funcao, *argumentos)
+
+    @staticmethod
+    def _executar_com_log(funcao, *argumentos):
+        try:
+            funcao(*argumentos)
+        except Exception as e:
+            print(f"Erro ao processar imagem: {e}")
+            raise
+
+    def _abrir(self, dados, tamanho_alvo):
+        img = Image.open(io.BytesIO(dados))
+        # JPEG: decodifica já reduzido (1/2, 1/4, 1/8), bem mais rápido que abrir 12 MP inteiros
+        img.draft('RGB', (tamanho_alvo[0] * 2, tamanho_alvo[1] * 2))
+        # Fotos de celular vêm "deitadas" com a orientação só no EXIF
+        return ImageOps.exif_transpose(img)
+
+    def _processar_foto(self, membro_id, dados, formato):
+        _salvar_atomico(self.caminho_original(f"membro_{membro_id}", formato),
+                        lambda caminho: _gravar_bytes(caminho, dados))
+
+        img = self._abrir(dados, TAMANHO_CARTAO).convert("RGBA")
+        cartao = ImageOps.fit(img, TAMANHO_CARTAO, Image.LANCZOS)
+        _salvar_atomico(self.caminho_foto_cartao(membro_id), lambda caminho: cartao.save(caminho, "PNG"))
+
+        miniatura = ImageOps.fit(cartao, TAMANHO_MINIATURA, Image.LANCZOS).convert("RGB")
+        _salvar_atomico(self.caminho_miniatura(membro_id),
+                        lambda caminho: miniatura.save(caminho, "JPEG", quality=85))
+
+    def _processar_logo(self, igreja_id, dados, formato):
+        _salvar_atomico(self.caminho_original(f"logo_{igreja_id}", formato),
+                        lambda caminho: _gravar_bytes(caminho, dados))
+
+        img = self._abrir(dados, (ALTURA_MAX_LOGO * 4, ALTURA_MAX_LOGO)).convert("RGBA")
+        if img.height > ALTURA_MAX_LOGO:
+            img.thumbnail((img.width, ALTURA_MAX_LOGO), Image.LANCZOS)
+        pasta_logos = os.path.join(Config.BASE_DIR, 'static', 'logos')
+        _salvar_atomico(os.path.join(pasta_logos, f"logo_{igreja_id}.png"), lambda caminho: img.save(caminho, "PNG"))
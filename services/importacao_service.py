@@ -0,0 +1,217 @@
+import csv
+import io
+import os
+import unicodedata
+from sqlalchemy import insert, select
+from models import db, Membro
+from utils.auditoria import registrar_log
+from services.dashboard_service import cache_dashboard
+from utils.validacao import normalizar_cpf, ler_data, texto_busca_membro
+
+# Cabeçalho da planilha (sem acento, minúsculo) -> coluna do Membro
+COLUNAS = {
+    'nome': 'nome', 'nome_completo': 'nome',
+    'cpf': 'cpf',
+    'rg': 'rg',
+    'sexo': 'sexo',
+    'estado_civil': 'estado_civil',
+    'endereco': 'endereco', 'endereco_completo': 'endereco',
+    'telefone': 'telefone', 'celular': 'telefone',
+    'cargo': 'cargo',
+    'data_nascimento': 'data_nascimento', 'data_de_nascimento': 'data_nascimento', 'nascimento': 'data_nascimento',
+    'data_batismo': 'data_batismo', 'data_de_batismo': 'data_batismo', 'batismo': 'data_batismo',
+}
+CARGOS = ('Membro', 'Diácono', 'Presbítero', 'Evangelista', 'Pastor', 'Missionário')
+TAMANHOS = {coluna.name: coluna.type.length for coluna in Membro.__table__.columns if getattr(coluna.type, 'length', None)}
+MAX_ERROS_LISTADOS = 100
+
+
+def _normalizar_cabecalho(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(texto.strip().lower().split())
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.lidas = 0
+        self.importados = 0
+        self.duplicados = 0
+        self.total_erros = 0
+        self.ocorrencias = []  # (linha, mensagem) de erros e duplicados, limitado a MAX_ERROS_LISTADOS
+
+    def _anotar(self, linha, mensagem):
+        if len(self.ocorrencias) < MAX_ERROS_LISTADOS:
+            self.ocorrencias.append((linha, mensagem))
+
+    def erro(self, linha, mensagem):
+        self.total_erros += 1
+        self._anotar(linha, mensagem)
+
+    def duplicado(self, linha, mensagem):
+        self.duplicados += 1
+        self._anotar(linha, mensagem)
+
+
+class ImportacaoMembrosService:
+    """
+    Importa membros de CSV/XLSX para uma igreja.
+
+    A planilha é lida linha a linha (nunca inteira na memória). A cada bloco de
+    TAMANHO_LOTE linhas válidas: UMA consulta descobre quais CPFs já existem
+    (a unicidade do CPF é global), um INSERT de várias linhas grava o resto e o
+    bloco é confirmado. Reimportar o mesmo arquivo não duplica quem tem CPF:
+    o que já entrou vira "duplicado" (linhas sem CPF entram de novo).
+    """
+
+    TAMANHO_LOTE = 2000
+
+    def __init__(self, igreja_id, ao_progredir=None):
+        self.igreja_id = igreja_id
+        self.ao_progredir = ao_progredir
+
+    # --- Leitura ---
+
+    def ler_linhas(self, arquivo, nome_arquivo):
+        """Gera (numero_da_linha, {coluna: valor}) a partir do arquivo enviado."""
+        extensao = os.path.splitext(nome_arquivo or '')[1].lower()
+        if extensao == '.xlsx':
+            linhas = self._linhas_xlsx(arquivo)
+        elif extensao in ('.csv', '.txt'):
+            linhas = self._linhas_csv(arquivo)
+        else:
+            raise ValueError('Formato não suportado. Envie um arquivo .csv ou .xlsx.')
+
+        cabecalho = next(linhas, None)
+        if not cabecalho:
+            raise ValueError('Arquivo vazio.')
+        colunas = [COLUNAS.get(_normalizar_cabecalho(titulo)) for titulo in cabecalho]
+        if 'nome' not in colunas:
+            raise ValueError('A planilha precisa de uma coluna "Nome".')
+
+        for numero, valores in enumerate(linhas, start=2):
+            registro = {coluna: valor for coluna, valor in zip(colunas, valores) if coluna}
+            if any(valor not in (None, '') for valor in registro.values()):
+                yield numero, registro
+
+    def _linhas_csv(self, arquivo):
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', errors='replace', newline='')
+        primeira = texto.readline()
+        # Excel em português salva com ';'
+        delimitador = ';' if primeira.count(';') >= primeira.count(',') else ','
+        yield next(csv.reader([primeira], delimiter=delimitador), [])
+        yield from csv.reader(texto, delimiter=delimitador)
+
+    def _linhas_xlsx(self, arquivo):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError('Importação de .xlsx indisponível (pacote openpyxl). Salve a planilha como CSV.')
+        # read_only: as linhas são lidas do XML sob demanda
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            yield from planilha.active.iter_rows(values_only=True)
+        finally:
+            planilha.close()
+
+    # --- Validação ---
+
+    def validar(self, registro):
+        """Registro da planilha -> dict pronto para o INSERT (levanta ValueError)."""
+        texto = {campo: str(valor).strip() for campo, valor in registro.items()
+                 if valor not in (None, '') and campo not in ('data_nascimento', 'data_batismo')}
+        if not texto.get('nome'):
+            raise ValueError('Nome em branco')
+
+        membro = {'igreja_id': self.igreja_id, 'ativo': True, 'cargo': 'Membro'}
+        for campo in ('nome', 'rg', 'endereco', 'telefone', 'estado_civil'):
+            if campo in texto:
+                membro[campo] = texto[campo]
+        if 'cpf' in texto:
+            membro['cpf'] = normalizar_cpf(texto['cpf'])
+        if 'sexo' in texto:
+            sexo = texto['sexo'][0].upper()
+            if sexo not in ('M', 'F'):
+                raise ValueError(f"Sexo inválido: {texto['sexo']}")
+            membro['sexo'] = sexo
+        if 'cargo' in texto:
+            cargo = next((c for c in CARGOS if _normalizar_cabecalho(c) == _normalizar_cabecalho(texto['cargo'])), None)
+            if not cargo:
+                raise ValueError(f"Cargo desconhecido: {texto['cargo']}")
+            membro['cargo'] = cargo
+        for campo in ('data_nascimento', 'data_batismo'):
+            membro[campo] = ler_data(registro.get(campo))
+        for campo, valor in membro.items():
+            if isinstance(valor, str) and campo in TAMANHOS and len(valor) > TAMANHOS[campo]:
+                raise ValueError(f'{campo} maior que {TAMANHOS[campo]} caracteres')
+        # INSERT em lote não dispara o before_insert do modelo: o texto da busca vai pronto
+        membro['busca'] = texto_busca_membro(membro['nome'], membro.get('cpf'), membro.get('telefone'))
+        return membro
+
+    # --- Gravação ---
+
+    def importar(self, arquivo, nome_arquivo):
+        resultado = ResultadoImportacao()
+        cpfs_no_arquivo = set()
+        lote = []
+
+        for numero, registro in self.ler_linhas(arquivo, nome_arquivo):
+            resultado.lidas += 1
+            try:
+                membro = self.validar(registro)
+            except ValueError as e:
+                resultado.erro(numero, str(e))
+                continue
+
+            cpf = membro.get('cpf')
+            if cpf:
+                if cpf in cpfs_no_arquivo:
+                    resultado.duplicado(numero, f'CPF {cpf} repetido na planilha')
+                    continue
+                cpfs_no_arquivo.add(cpf)
+            lote.append((numero, membro))
+
+            if len(lote) >= self.TAMANHO_LOTE:
+                self._gravar_lote(lote, resultado)
+                lote = []
+        if lote:
+            self._gravar_lote(lote, resultado)
+
+        if resultado.importados:
+            # Um único registro de auditoria para a importação inteira
+            registrar_log("IMPORT", "Membro", None,
+                          f"{resultado.importados} membros importados de {nome_arquivo} "
+                          f"({resultado.duplicados} duplicados, {resultado.total_erros} erros)",
+                          igreja_id=self.igreja_id)
+            db.session.commit()
+            # INSERT em lote não passa pelos eventos do ORM: o painel recalcula no próximo acesso
+            cache_dashboard.invalidar(self.igreja_id)
+        return resultado
+
+    def _gravar_lote(self, lote, resultado):
+        cpfs = [membro['cpf'] for _, membro in lote if membro.get('cpf')]
+        existentes = set()
+        if cpfs:
+            # Pela conexão, sem o filtro por igreja: o CPF é único no banco todo
+            existentes = set(db.session.connection().scalars(
+                select(Membro.__table__.c.cpf).where(Membro.__table__.c.cpf.in_(cpfs))
+            ))
+
+        novos = []
+        for numero, membro in lote:
+            if membro.get('cpf') in existentes:
+                resultado.duplicado(numero, f"CPF {membro['cpf']} já cadastrado")
+            else:
+                novos.append(membro)
+
+        if novos:
+            # Todas as linhas do bloco precisam das mesmas chaves para o INSERT de várias linhas
+            campos = set().union(*novos)
+            db.session.connection().execute(
+                insert(Membro.__table__),
+                [{campo: membro.get(campo) for campo in campos} for membro in novos],
+            )
+            db.session.commit()
+            resultado.importados += len(novos)
+
+        if self.ao_progredir:
+            self.ao_progredir(resultado)
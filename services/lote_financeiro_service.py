@@ -0,0 +1,137 @@
+"""
+Lançamentos em lote (conferência dos envelopes depois do culto).
+
+O lote é validado inteiro antes de gravar: se alguma linha tiver erro, nada é
+gravado e todas as ocorrências voltam de uma vez para correção. Lote válido:
+UMA consulta confere os membros vinculados, um INSERT de várias linhas grava
+os lançamentos, o SaldoMensal é atualizado na mesma transação e um único
+registro de auditoria resume o lote. Um commit por lote, não dois por envelope.
+"""
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, Lancamento, Membro
+from utils.auditoria import registrar_log
+from utils.dinheiro import para_centavos, de_centavos
+from services.dashboard_service import cache_dashboard
+from services.financeiro_service import aplicar_no_saldo_mensal, cache_dizimistas
+
+TIPOS = ('entrada', 'saida')
+# R$ 10 trilhões por linha: longe do limite do BigInteger mesmo somado no lote e no SaldoMensal
+MAX_CENTAVOS = 10 ** 15
+TAMANHOS = {coluna.name: coluna.type.length for coluna in Lancamento.__table__.columns if getattr(coluna.type, 'length', None)}
+
+
+class ResultadoLote:
+    def __init__(self):
+        self.criados = 0
+        self.entradas_centavos = 0
+        self.saidas_centavos = 0
+        self.erros = []  # (índice da linha, mensagem)
+
+    @property
+    def entradas(self):
+        return de_centavos(self.entradas_centavos)
+
+    @property
+    def saidas(self):
+        return de_centavos(self.saidas_centavos)
+
+
+class LoteLancamentosService:
+    """Valida e grava vários lançamentos de uma igreja numa única transação."""
+
+    def __init__(self, igreja_id):
+        self.igreja_id = igreja_id
+
+    def validar(self, item, padrao):
+        """Linha do lote (campos ausentes vêm de `padrao`) -> dict pronto para o INSERT (levanta ValueError)."""
+        if not isinstance(item, dict):
+            raise ValueError('Linha inválida')
+        campos = {**padrao, **{k: v for k, v in item.items() if v not in (None, '')}}
+
+        tipo = str(campos.get('tipo', '')).strip()
+        if tipo not in TIPOS:
+            raise ValueError(f'Tipo inválido: {tipo or "em branco"}')
+        categoria = str(campos.get('categoria', '')).strip()
+        if not categoria:
+            raise ValueError('Categoria em branco')
+        try:
+            data = datetime.strptime(str(campos.get('data', '')).strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Data inválida: {campos.get('data') or 'em branco'}")
+        if campos.get('valor') in (None, ''):
+            raise ValueError('Valor em branco')
+        try:
+            valor_centavos = para_centavos(campos['valor'])
+        except ValueError:
+            raise ValueError(f"Valor inválido: {campos['valor']}")
+        if valor_centavos <= 0:
+            raise ValueError('Valor precisa ser maior que zero')
+        if valor_centavos > MAX_CENTAVOS:
+            raise ValueError(f'Valor acima do máximo de R$ {de_centavos(MAX_CENTAVOS)}')
+        membro_id = campos.get('membro_id')
+        if membro_id is not None:
+            try:
+                membro_id = int(membro_id)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f'Membro inválido: {membro_id}')
+            if not 0 < membro_id < 2 ** 31:
+                raise ValueError(f'Membro inválido: {membro_id}')
+
+        lancamento = {
+            'igreja_id': self.igreja_id,
+            'data': data,
+            'tipo': tipo,
+            'categoria': categoria,
+            'descricao': str(campos.get('descricao', '')).strip(),
+            'valor_centavos': valor_centavos,
+            'membro_id': membro_id,
+        }
+        for campo, valor in lancamento.items():
+            if isinstance(valor, str) and campo in TAMANHOS and len(valor) > TAMANHOS[campo]:
+                raise ValueError(f'{campo} maior que {TAMANHOS[campo]} caracteres')
+        return lancamento
+
+    def registrar(self, itens, padrao=None, descricao_lote=None):
+        """Grava o lote inteiro ou nada. Retorna ResultadoLote (com `erros` se não gravou)."""
+        resultado = ResultadoLote()
+        linhas = []
+        for indice, item in enumerate(itens):
+            try:
+                linhas.append((indice, self.validar(item, padrao or {})))
+            except ValueError as e:
+                resultado.erros.append((indice, str(e)))
+
+        # Membros vinculados: uma consulta só, dentro da igreja e sem os arquivados
+        ids = {linha['membro_id'] for _, linha in linhas if linha['membro_id']}
+        if ids:
+            validos = {m.id for m in Membro.query.with_entities(Membro.id)
+                       .filter(Membro.igreja_id == self.igreja_id, Membro.deleted_at.is_(None), Membro.id.in_(ids))}
+            for indice, linha in linhas:
+                if linha['membro_id'] and linha['membro_id'] not in validos:
+                    resultado.erros.append((indice, f"Membro {linha['membro_id']} não encontrado"))
+        if resultado.erros or not linhas:
+            resultado.erros.sort()
+            return resultado
+
+        linhas = [linha for _, linha in linhas]
+        conexao = db.session.connection()
+        conexao.execute(insert(Lancamento.__table__), linhas)
+        # INSERT em lote não passa pelo after_flush: o saldo do mês é somado aqui, na mesma transação
+        aplicar_no_saldo_mensal(conexao, linhas)
+
+        resultado.criados = len(linhas)
+        resultado.entradas_centavos = sum(l['valor_centavos'] for l in linhas if l['tipo'] == 'entrada')
+        resultado.saidas_centavos = sum(l['valor_centavos'] for l in linhas if l['tipo'] == 'saida')
+        # Um único registro de auditoria para o lote inteiro
+        registrar_log("CREATE_FIN_LOTE", "Lancamento", None,
+                      f"{resultado.criados} lançamentos em lote{f' ({descricao_lote})' if descricao_lote else ''}: "
+                      f"entradas R$ {resultado.entradas}, saídas R$ {resultado.saidas}",
+                      igreja_id=self.igreja_id)
+        db.session.commit()
+
+        # Sem os eventos do ORM: painel e dizimistas recentes recalculam no próximo acesso
+        cache_dashboard.invalidar(self.igreja_id)
+        if ids:
+            cache_dizimistas.invalidar(self.igreja_id)
+        return resultado
@@ -0,0 +1,65 @@
+from sqlalchemy import or_, select, table, column
+from models import db, Membro
+from utils.paginacao import paginar_keyset
+from utils.validacao import termos_busca
+
+# Termos com 3+ caracteres usam o índice de trigramas (FTS5 no SQLite, pg_trgm no
+# PostgreSQL); termos de 1-2 caracteres só filtram o que sobrou, como início de palavra.
+MIN_TRIGRAMA = 3
+membro_busca = table('membro_busca', column('rowid'), column('membro_busca'))
+
+
+class MembroService:
+    """Consultas do diretório de membros (busca + paginação por chave)."""
+
+    def __init__(self, igreja_id):
+        self.igreja_id = igreja_id
+
+    @staticmethod
+    def filtrar_busca(consulta, busca):
+        """Busca sem acento por pedaços do nome, do CPF ou do telefone ('joao silv', '123.456', '9876')."""
+        termos = termos_busca(busca)
+        longos = [t for t in termos if len(t) >= MIN_TRIGRAMA]
+        curtos = [t for t in termos if len(t) < MIN_TRIGRAMA]
+
+        if longos and db.session.get_bind().dialect.name == 'sqlite':
+            # Termos já normalizados (só [a-z0-9]): podem ir entre aspas direto na expressão do FTS5
+            expressao = ' '.join(f'"{t}"' for t in longos)
+            consulta = consulta.filter(Membro.id.in_(
+                select(membro_busca.c.rowid).where(membro_busca.c.membro_busca.op('MATCH')(expressao))
+            ))
+        else:
+            for termo in longos:
+                consulta = consulta.filter(Membro.busca.like(f'%{termo}%'))
+        for termo in curtos:
+            consulta = consulta.filter(or_(Membro.busca.like(f'{termo}%'), Membro.busca.like(f'% {termo}%')))
+        return consulta
+
+    def consulta(self, busca=None, cargo=None, ativo=None):
+        consulta = Membro.query.filter_by(igreja_id=self.igreja_id, deleted_at=None)
+
+        if busca:
+            consulta = self.filtrar_busca(consulta, busca)
+        if cargo:
+            consulta = consulta.filter(Membro.cargo == cargo)
+        if ativo is not None:
+            consulta = consulta.filter(Membro.ativo == ativo)
+        return consulta
+
+    def sugestoes(self, busca, limite=10, ativo=None):
+        """Type-ahead: poucos campos, ordenados por nome."""
+        if not termos_busca(busca):
+            return []
+        linhas = (self.consulta(busca, ativo=ativo)
+                  .with_entities(Membro.id, Membro.nome, Membro.cargo, Membro.cpf)
+                  .order_by(Membro.nome, Membro.id).limit(limite))
+        return [{'id': m.id, 'nome': m.nome, 'cargo': m.cargo, 'cpf': m.cpf} for m in linhas]
+
+    def pagina(self, busca=None, cargo=None, ativo=None, cursor=None, limite=50):
+        """Retorna (membros, proximo_cursor) ordenados por (nome, id)."""
+        return paginar_keyset(
+            self.consulta(busca, cargo, ativo),
+            [Membro.nome, Membro.id],
+            cursor=cursor,
+            limite=limite,
+        )
@@ -1,34 +1,114 @@
 from fpdf import FPDF
+from PIL import Image
 from config import Config
+import io
 import os
 from datetime import datetime
+from functools import lru_cache
 from flask_login import current_user
+from services.render_cache import chave_conteudo, mtime
+
+
+# --- CACHE DO PROCESSO: logo lida uma vez, já no tamanho de impressão e em JPEG ---
+
+LOGO_LARGURA_MM = 30
+LOGO_LARGURA_PX = 354  # 30mm a 300 dpi
+
+
+@lru_cache(maxsize=32)
+def _logo_pdf_em_cache(caminho, mtime):
+    """
+    Bytes da logo como vão para o PDF, sempre em JPEG: o FPDF embute JPEG sem decodificar,
+    enquanto um PNG seria descomprimido e recomprimido a cada documento. A transparência
+    vai para o branco da página e a imagem é reduzida ao tamanho de impressão.
+    O mtime na chave invalida quando a igreja troca a logo.
+    """
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    logo = Image.open(io.BytesIO(conteudo))
+    if logo.format == 'JPEG' and logo.width <= LOGO_LARGURA_PX:
+        return conteudo
+    logo = logo.convert('RGBA')
+    if logo.width > LOGO_LARGURA_PX:
+        logo = logo.resize((LOGO_LARGURA_PX, max(1, round(logo.height * LOGO_LARGURA_PX / logo.width))))
+    fundo = Image.new('RGB', logo.size, 'white')
+    fundo.paste(logo, mask=logo.getchannel('A'))
+    saida = io.BytesIO()
+    fundo.save(saida, 'JPEG', quality=95)
+    return saida.getvalue()
+
+
+def limpar_caches():
+    _logo_pdf_em_cache.cache_clear()
+
+
+def caminho_logo(igreja_id):
+    """Logo personalizada (static/logos/logo_ID.png), senão a padrão, senão None."""
+    caminho_custom = os.path.join(Config.BASE_DIR, 'static', 'logos', f"logo_{igreja_id}.png")
+    if os.path.exists(caminho_custom):
+        return caminho_custom
+    if os.path.exists(Config.LOGO_PATH):
+        return Config.LOGO_PATH
+    return None
+
+
+def dados_documento(membro, **extras):
+    """Dados do membro usados pelos documentos (dict simples: entra no hash do cache)."""
+    dados = {
+        'nome': membro.nome, 'rg': membro.rg, 'cpf': membro.cpf,
+        'estado_civil': membro.estado_civil, 'endereco': membro.endereco, 'sexo': membro.sexo,
+        'data_batismo': membro.data_batismo.strftime('%Y-%m-%d') if membro.data_batismo else None,
+        'data_emissao': datetime.today().strftime('%Y-%m-%d'),
+    }
+    dados.update(extras)
+    return dados
+
 
 class PDFService(FPDF):
+    """
+    Documentos oficiais da igreja (declaração, carta de transferência, certificado de batismo).
+    Todos usam o mesmo cabeçalho/rodapé e o mesmo esqueleto; cada tipo só define título e texto.
+    """
+
+    # Mude quando o texto/layout dos documentos mudar (invalida o cache de renderização)
+    VERSAO_LAYOUT = 3
+
+    # tipo -> (título, método que monta o texto do corpo)
+    DOCUMENTOS = {
+        'declaracao': ("DECLARAÇÃO DE MEMBRESIA", '_texto_declaracao'),
+        'transferencia': ("CARTA DE TRANSFERÊNCIA", '_texto_transferencia'),
+        'batismo': ("CERTIFICADO DE BATISMO", '_texto_batismo'),
+    }
+
+    def __init__(self, igreja=None, **kwargs):
+        super().__init__(**kwargs)
+        # Igreja e logo resolvidas uma vez por documento (e não a cada página)
+        self.igreja = igreja or current_user.igreja
+        self.logo = caminho_logo(self.igreja.id)
+        # Mesmos bytes em todas as páginas: o FPDF reconhece a imagem e a embute uma vez por arquivo
+        self.logo_imagem = _logo_pdf_em_cache(self.logo, mtime(self.logo)) if self.logo else None
+
+    @classmethod
+    def chave_documento(cls, tipo, dados_membro, igreja):
+        """Hash das entradas do documento: tipo, dados do membro, da igreja e a logo em uso."""
+        logo = caminho_logo(igreja.id)
+        return chave_conteudo(
+            tipo, cls.VERSAO_LAYOUT, dados_membro,
+            igreja.id, igreja.nome, igreja.cnpj, igreja.endereco, igreja.cidade_uf,
+            igreja.responsavel, igreja.cargo_responsavel,
+            logo, mtime(logo) if logo else None,
+        )
+
     def header(self):
-        # 1. Pega os dados da igreja do usuário logado
-        igreja = current_user.igreja
-        
-        # 2. Lógica Inteligente da Logo
-        # Tenta pegar a logo personalizada (ex: static/logos/logo_1.png)
-        nome_logo_custom = f"logo_{igreja.id}.png"
-        caminho_logo_custom = os.path.join(Config.BASE_DIR, 'static', 'logos', nome_logo_custom)
-        
-        # Define qual logo usar
-        logo_para_usar = None
-        if os.path.exists(caminho_logo_custom):
-            logo_para_usar = caminho_logo_custom
-        elif os.path.exists(Config.LOGO_PATH): # Fallback para logo padrão
-            logo_para_usar = Config.LOGO_PATH
-            
-        # Desenha a logo se encontrou alguma
-        if logo_para_usar:
-            # Centraliza a logo (A4=210mm. Margem=25mm. Logo=30mm)
-            self.image(logo_para_usar, x=90, y=10, w=30)
+        igreja = self.igreja
+
+        # Logo centralizada (A4=210mm. Logo=30mm)
+        if self.logo:
+            self.image(self.logo_imagem, x=90, y=10, w=LOGO_LARGURA_MM)
         
         self.ln(35) # Espaço vertical após a logo
 
-        # 3. Cabeçalho com dados do Banco
+        # Cabeçalho com dados do Banco
         self.set_font("Helvetica", "B", 14)
         self.cell(0, 10, self._tratar_texto(igreja.nome), align="C", new_x="LMARGIN", new_y="NEXT")
         
@@ -38,7 +118,7 @@ class PDFService(FPDF):
 
     def footer(self):
         # Rodapé com endereço do Banco
-        igreja = current_user.igreja
+        igreja = self.igreja
         self.set_y(-15)
         self.set_font("Helvetica", "I", 8)
         texto_rodape = f"{igreja.endereco}, {igreja.cidade_uf}"
@@ -52,53 +132,81 @@ class PDFService(FPDF):
         except:
             return texto
 
-    def gerar_declaracao(self, dados_membro):
-        igreja = current_user.igreja
-        
-        self.add_page()
-        self.set_margins(25, 25, 25) 
-        
-        self.set_font("Helvetica", "B", 16)
-        self.cell(0, 10, self._tratar_texto("DECLARAÇÃO DE MEMBRESIA"), align="C", new_x="LMARGIN", new_y="NEXT")
-        self.ln(15)
+    @staticmethod
+    def _data_br(data_iso):
+        return datetime.strptime(data_iso, '%Y-%m-%d').strftime('%d/%m/%Y')
 
-        self.set_font("Helvetica", "", 12)
-        
-        # Lógica de Gênero
+    @staticmethod
+    def _genero(dados_membro):
         if dados_membro.get('sexo') == 'M':
-            tratamento = "o Sr."
-            nacionalidade = "brasileiro"
-            portador = "portador"
-            referido = "o referido membro"
-        else:
-            tratamento = "a Sra."
-            nacionalidade = "brasileira"
-            portador = "portadora"
-            referido = "a referida membro"
-
-        # Texto do Corpo
-        texto_corpo = (
+            return {'tratamento': "o Sr.", 'nacionalidade': "brasileiro", 'portador': "portador",
+                    'referido': "o referido membro", 'irmao': "o irmão", 'batizado': "batizado"}
+        return {'tratamento': "a Sra.", 'nacionalidade': "brasileira", 'portador': "portadora",
+                'referido': "a referida membro", 'irmao': "a irmã", 'batizado': "batizada"}
+
+    # --- Textos de cada tipo de documento ---
+
+    def _texto_declaracao(self, dados_membro):
+        g = self._genero(dados_membro)
+        return (
             f"Declaramos, para os devidos fins de direito e a quem possa interessar, "
-            f"especialmente para comprovação junto a instituições de ensino, que {tratamento} "
-            f"{dados_membro['nome'].upper()}, {nacionalidade}, {dados_membro['estado_civil']}, "
-            f"{portador} do RG nº {dados_membro['rg']}, CPF nº {dados_membro['cpf']}, "
+            f"especialmente para comprovação junto a instituições de ensino, que {g['tratamento']} "
+            f"{dados_membro['nome'].upper()}, {g['nacionalidade']}, {dados_membro['estado_civil']}, "
+            f"{g['portador']} do RG nº {dados_membro['rg']}, CPF nº {dados_membro['cpf']}, "
             f"residente e domiciliado(a) na {dados_membro['endereco']}, nesta cidade, "
             f"é membro ativo(a) e em regular comunhão com esta instituição religiosa.\n\n"
-            f"Atestamos que {referido} frequenta as atividades desta organização religiosa, "
+            f"Atestamos que {g['referido']} frequenta as atividades desta organização religiosa, "
             f"cuja natureza jurídica é de Organização Religiosa (322-0), devidamente inscrita "
-            f"no CNPJ sob o nº {igreja.cnpj}.\n\n"
+            f"no CNPJ sob o nº {self.igreja.cnpj}.\n\n"
             f"Por ser expressão da verdade, firmamos a presente declaração."
         )
 
+    def _texto_transferencia(self, dados_membro):
+        g = self._genero(dados_membro)
+        destino = dados_membro.get('igreja_destino') or "a igreja que o(a) receber"
+        return (
+            f"A {self.igreja.nome}, inscrita no CNPJ sob o nº {self.igreja.cnpj}, saúda "
+            f"{destino} no amor de Cristo.\n\n"
+            f"Apresentamos {g['irmao']} {dados_membro['nome'].upper()}, {g['portador']} do "
+            f"CPF nº {dados_membro['cpf']}, que foi membro desta igreja em plena comunhão "
+            f"até a presente data e que, a pedido, recebe esta carta de transferência.\n\n"
+            f"Recomendamos {g['referido']} aos cuidados pastorais dessa igreja, rogando que "
+            f"o(a) recebam como convém aos santos."
+        )
+
+    def _texto_batismo(self, dados_membro):
+        if not dados_membro.get('data_batismo'):
+            raise ValueError('Membro sem data de batismo cadastrada.')
+        g = self._genero(dados_membro)
+        return (
+            f"Certificamos que {dados_membro['nome'].upper()} foi {g['batizado']} nas águas, "
+            f"em nome do Pai, do Filho e do Espírito Santo, no dia "
+            f"{self._data_br(dados_membro['data_batismo'])}, tendo professado publicamente "
+            f"sua fé em Jesus Cristo e sendo recebido(a) como membro desta igreja."
+        )
+
+    # --- Geração ---
+
+    def _pagina_documento(self, tipo, dados_membro):
+        """Esqueleto comum: título, corpo, local/data e assinatura do responsável."""
+        titulo, metodo_texto = self.DOCUMENTOS[tipo]
+        igreja = self.igreja
+        texto_corpo = getattr(self, metodo_texto)(dados_membro)
+
+        self.set_margins(25, 25, 25)
+        self.add_page()
+        
+        self.set_font("Helvetica", "B", 16)
+        self.cell(0, 10, self._tratar_texto(titulo), align="C", new_x="LMARGIN", new_y="NEXT")
+        self.ln(15)
+
+        self.set_font("Helvetica", "", 12)
         self.multi_cell(0, 8, self._tratar_texto(texto_corpo), align="J")
         
         self.ln(20)
 
         # Data e Local
-        data_obj = datetime.strptime(dados_membro['data_declaracao'], '%Y-%m-%d')
-        data_formatada = data_obj.strftime('%d/%m/%Y')
-        
-        texto_data = f"{igreja.cidade_uf}, {data_formatada}."
+        texto_data = f"{igreja.cidade_uf}, {self._data_br(dados_membro['data_emissao'])}."
         self.cell(0, 10, self._tratar_texto(texto_data), align="R", new_x="LMARGIN", new_y="NEXT")
 
         self.ln(30) 
@@ -110,4 +218,66 @@ class PDFService(FPDF):
         self.set_font("Helvetica", "", 10)
         self.cell(0, 6, self._tratar_texto(igreja.cargo_responsavel), align="C", new_x="LMARGIN", new_y="NEXT")
 
-        return self.output()
\ No newline at end of file
+    def gerar_documento(self, tipo, dados_membro):
+        self._pagina_documento(tipo, dados_membro)
+        return self.output()
+
+    def gerar_lote(self, tipo, lista_dados):
+        """
+        Vários membros num único PDF. A logo entra uma vez no arquivo e todas as
+        páginas apontam para ela. Devolve (pdf, nomes_ignorados) - ex.: batismo sem data.
+        """
+        ignorados = []
+        for dados_membro in lista_dados:
+            try:
+                self._pagina_documento(tipo, dados_membro)
+            except ValueError:
+                ignorados.append(dados_membro['nome'])
+        return (self.output() if self.page else None), ignorados
+
+
+class RelatorioPDF(PDFService):
+    """Relatório tabular com o mesmo cabeçalho/rodapé da igreja das declarações."""
+
+    def gerar_relatorio(self, titulo, periodo, cabecalho, larguras, linhas):
+        """`linhas` pode ser um gerador: cada linha é desenhada assim que chega do banco."""
+        self.set_margins(20, 20, 20)
+        self.set_auto_page_break(True, margin=20)
+        self.add_page()
+
+        self.set_font("Helvetica", "B", 13)
+        self.cell(0, 8, self._tratar_texto(titulo.upper()), align="C", new_x="LMARGIN", new_y="NEXT")
+        self.set_font("Helvetica", "", 10)
+        self.cell(0, 6, self._tratar_texto(f"Período: {periodo}"), align="C", new_x="LMARGIN", new_y="NEXT")
+        self.ln(5)
+
+        self._linha_tabela(cabecalho, larguras, negrito=True)
+        quantidade = 0
+        for linha in linhas:
+            if self.will_page_break(6):
+                self.add_page()
+                self._linha_tabela(cabecalho, larguras, negrito=True)
+            self._linha_tabela(linha, larguras)
+            quantidade += 1
+
+        if not quantidade:
+            self.set_font("Helvetica", "I", 9)
+            self.cell(0, 8, self._tratar_texto("Nenhum lançamento no período."), new_x="LMARGIN", new_y="NEXT")
+
+        self.ln(4)
+        self.set_font("Helvetica", "I", 8)
+        self.cell(0, 5, self._tratar_texto(f"Emitido em {datetime.now().strftime('%d/%m/%Y %H:%M')}"), align="R")
+        return self.output()
+
+    def _linha_tabela(self, valores, larguras, negrito=False):
+        self.set_font("Helvetica", "B" if negrito else "", 8)
+        self.set_fill_color(230)
+        ultima = len(valores) - 1
+        for i, (valor, largura) in enumerate(zip(valores, larguras)):
+            texto = self._tratar_texto(str(valor))
+            # Corta o texto que não cabe na coluna (o relatório é de uma linha por registro)
+            while texto and self.get_string_width(texto) > largura - 2:
+                texto = texto[:-1]
+            alinhamento = "R" if i == ultima or isinstance(valor, int) else "L"
+            self.cell(largura, 6, texto, border=1, align=alinhamento, fill=negrito,
+                      new_x="RIGHT" if i < ultima else "LMARGIN", new_y="TOP" if i < ultima else "NEXT")
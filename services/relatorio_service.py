@@ -0,0 +1,122 @@
+import csv
+import io
+from datetime import date
+from sqlalchemy import func, select
+from models import db, Lancamento, Membro, SaldoMensal
+from utils.dinheiro import de_centavos
+
+MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho',
+         'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+# Nome -> (título, cabeçalho, larguras das colunas no PDF em mm)
+RELATORIOS = {
+    'categoria': ('Receitas e Despesas por Categoria', ['Tipo', 'Categoria', 'Lançamentos', 'Total (R$)'], [25, 80, 25, 30]),
+    'mensal': ('Demonstrativo Mensal', ['Mês', 'Entradas (R$)', 'Saídas (R$)', 'Saldo (R$)'], [40, 40, 40, 40]),
+    'dizimos': ('Dízimos e Ofertas por Membro', ['Membro', 'CPF', 'Contribuições', 'Total (R$)'], [75, 35, 25, 25]),
+    'extrato': ('Extrato de Lançamentos', ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor (R$)'], [22, 18, 35, 60, 25]),
+}
+
+
+def formatar_valor(centavos):
+    """1234567 -> '12.345,67' (padrão brasileiro, também no CSV para abrir certo no Excel)"""
+    return f"{de_centavos(centavos):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+class RelatorioFinanceiroService:
+    """
+    Relatórios da Tesouraria por período (ano inteiro ou um mês).
+    Cada relatório é um gerador de linhas lido de um cursor do lado do servidor
+    (yield_per/stream_results), então nem um ano inteiro de lançamentos fica na memória.
+    """
+
+    TAMANHO_LOTE = 500
+
+    def __init__(self, igreja_id, ano, mes=None):
+        self.igreja_id = igreja_id
+        self.ano = ano
+        self.mes = mes
+
+    @property
+    def periodo(self):
+        return f"{MESES[self.mes - 1]}/{self.ano}" if self.mes else str(self.ano)
+
+    def _intervalo(self):
+        if self.mes:
+            inicio = date(self.ano, self.mes, 1)
+            fim = date(self.ano + (self.mes == 12), self.mes % 12 + 1, 1)
+        else:
+            inicio, fim = date(self.ano, 1, 1), date(self.ano + 1, 1, 1)
+        return inicio, fim
+
+    def _filtro_periodo(self, consulta):
+        inicio, fim = self._intervalo()
+        return consulta.where(
+            Lancamento.igreja_id == self.igreja_id,
+            Lancamento.data >= inicio,
+            Lancamento.data < fim,
+        )
+
+    def _stream(self, consulta):
+        resultado = db.session.execute(consulta.execution_options(yield_per=self.TAMANHO_LOTE))
+        for linha in resultado:
+            yield linha
+
+    def linhas(self, nome):
+        return getattr(self, f'_linhas_{nome}')()
+
+    def _linhas_categoria(self):
+        total = func.sum(Lancamento.valor_centavos)
+        consulta = self._filtro_periodo(
+            select(Lancamento.tipo, Lancamento.categoria, func.count(Lancamento.id), total)
+        ).group_by(Lancamento.tipo, Lancamento.categoria).order_by(Lancamento.tipo, total.desc())
+        for tipo, categoria, quantidade, centavos in self._stream(consulta):
+            yield ['Entrada' if tipo == 'entrada' else 'Saída', categoria, quantidade, formatar_valor(centavos)]
+
+    def _linhas_mensal(self):
+        # Vem pronto da tabela de saldos mensais: no máximo 12 linhas
+        consulta = select(SaldoMensal).where(SaldoMensal.igreja_id == self.igreja_id, SaldoMensal.ano == self.ano)
+        if self.mes:
+            consulta = consulta.where(SaldoMensal.mes == self.mes)
+        for saldo in db.session.scalars(consulta.order_by(SaldoMensal.mes)):
+            yield [f"{MESES[saldo.mes - 1]}/{saldo.ano}", formatar_valor(saldo.entradas_centavos),
+                   formatar_valor(saldo.saidas_centavos),
+                   formatar_valor(saldo.entradas_centavos - saldo.saidas_centavos)]
+
+    def _linhas_dizimos(self):
+        total = func.sum(Lancamento.valor_centavos)
+        consulta = self._filtro_periodo(
+            select(Membro.nome, Membro.cpf, func.count(Lancamento.id), total)
+            .join(Membro, Lancamento.membro_id == Membro.id)
+            .where(Lancamento.tipo == 'entrada')
+        ).group_by(Membro.id, Membro.nome, Membro.cpf).order_by(Membro.nome)
+        for nome, cpf, quantidade, centavos in self._stream(consulta):
+            yield [nome, cpf or '', quantidade, formatar_valor(centavos)]
+
+    def _linhas_extrato(self):
+        consulta = self._filtro_periodo(
+            select(Lancamento.data, Lancamento.tipo, Lancamento.categoria, Lancamento.descricao,
+                   Lancamento.valor_centavos, Membro.nome)
+            .outerjoin(Membro, Lancamento.membro_id == Membro.id)
+        ).order_by(Lancamento.data, Lancamento.id)
+        for data, tipo, categoria, descricao, centavos, membro in self._stream(consulta):
+            if membro:
+                descricao = f"{descricao} ({membro})" if descricao else membro
+            sinal = '' if tipo == 'entrada' else '-'
+            yield [data.strftime('%d/%m/%Y'), 'Entrada' if tipo == 'entrada' else 'Saída', categoria,
+                   descricao or '', sinal + formatar_valor(centavos)]
+
+    # --- Exportação ---
+
+    def gerar_csv(self, nome, linhas_por_pedaco=200):
+        """Gera o CSV em pedaços (para Response em streaming). ';' e BOM para o Excel pt-BR."""
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, delimiter=';')
+        buffer.write('﻿')
+        escritor.writerow(RELATORIOS[nome][1])
+        for i, linha in enumerate(self.linhas(nome), start=1):
+            escritor.writerow(linha)
+            if i % linhas_por_pedaco == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+
+
+def mtime(caminho):
+    """mtime do arquivo (0 se não existir) — entra na chave para invalidar quando a imagem muda."""
+    try:
+        return os.path.getmtime(caminho)
+    except OSError:
+        return 0
+
+
+def chave_conteudo(*partes):
+    """Hash estável das entradas de uma renderização. Vira também o ETag da resposta."""
+    bruto = json.dumps(partes, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(bruto.encode('utf-8')).hexdigest()[:32]
+
+
+class RenderCache:
+    """
+    Cache LRU em memória para carteirinhas e declarações já renderizadas.
+
+    A chave é o hash de tudo que influencia o resultado (dados do membro, da igreja,
+    mtime de foto/logo e versão do layout), então entradas antigas simplesmente
+    deixam de ser usadas. As tags permitem ainda descartar na hora tudo de um
+    membro ou de uma igreja (edição, logo nova) sem esperar o LRU expulsar.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._itens = OrderedDict()   # chave -> (dados, tags)
+        self._por_tag = {}            # tag -> {chaves}
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def guardar(self, chave, dados, tags=()):
+        if len(dados) > self.limite_bytes:
+            return
+        with self._lock:
+            self._remover(chave)
+            self._itens[chave] = (dados, tuple(tags))
+            self._tamanho += len(dados)
+            for tag in tags:
+                self._por_tag.setdefault(tag, set()).add(chave)
+            while self._tamanho > self.limite_bytes:
+                self._remover(next(iter(self._itens)))
+
+    def invalidar(self, tag):
+        """Remove todas as entradas marcadas com a tag (ex: 'membro:12', 'igreja:3')."""
+        with self._lock:
+            for chave in list(self._por_tag.get(tag, ())):
+                self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._por_tag.clear()
+            self._tamanho = 0
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is None:
+            return
+        dados, tags = item
+        self._tamanho -= len(dados)
+        for tag in tags:
+            chaves = self._por_tag.get(tag)
+            if chaves:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+
+
+render_cache = RenderCache(Config.RENDER_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,107 @@
+"""
+Verificação das carteirinhas na porta (QR assinado, ver utils/credencial.py).
+
+A assinatura é conferida sem ir ao banco. A situação do membro (ativo, inativo,
+arquivado) vem de um cache por processo, invalidado pelas rotas que editam,
+arquivam ou reativam membros; o TTL cobre as alterações feitas em outros workers.
+Um lote de códigos custa no máximo UMA consulta, só para os membros fora do cache.
+"""
+import threading
+import time
+from sqlalchemy import select
+from models import db, Membro
+from utils.credencial import verificar
+
+LIMITE_ITENS = 50000
+
+
+class CacheStatusMembros:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._itens = {}  # membro_id -> (expira_em, dados)
+        self._lock = threading.Lock()
+
+    def obter_varios(self, ids):
+        """{id: dados} de quem está no cache e dentro do TTL."""
+        agora = time.monotonic()
+        encontrados = {}
+        for membro_id in ids:
+            item = self._itens.get(membro_id)
+            if item and item[0] > agora:
+                encontrados[membro_id] = item[1]
+        return encontrados
+
+    def guardar_varios(self, dados_por_id):
+        expira_em = time.monotonic() + self.ttl
+        with self._lock:
+            if len(self._itens) + len(dados_por_id) > LIMITE_ITENS:
+                self._itens.clear()
+            for membro_id, dados in dados_por_id.items():
+                self._itens[membro_id] = (expira_em, dados)
+
+    def invalidar(self, membro_id):
+        with self._lock:
+            self._itens.pop(membro_id, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_status = CacheStatusMembros(ttl=60)
+
+
+def configurar_cache_status(app):
+    cache_status.ttl = app.config.get('VERIFICACAO_CACHE_TTL', 60)
+
+
+def _situacao(membro):
+    if membro.deleted_at is not None:
+        return 'arquivado'
+    return 'ativo' if membro.ativo else 'inativo'
+
+
+def _carregar(ids):
+    """Situação dos membros pedidos: do cache, e o que faltar numa única consulta."""
+    dados = cache_status.obter_varios(ids)
+    faltando = [membro_id for membro_id in ids if membro_id not in dados]
+    if faltando:
+        # Pela conexão, sem o filtro por igreja: a assinatura já diz de qual igreja é o código
+        tabela = Membro.__table__
+        linhas = db.session.connection().execute(
+            select(tabela.c.id, tabela.c.nome, tabela.c.cargo, tabela.c.ativo, tabela.c.deleted_at, tabela.c.igreja_id)
+            .where(tabela.c.id.in_(faltando))
+        )
+        novos = {
+            m.id: {'nome': m.nome, 'cargo': m.cargo, 'igreja_id': m.igreja_id, 'situacao': _situacao(m)}
+            for m in linhas
+        }
+        cache_status.guardar_varios(novos)
+        dados.update(novos)
+    return dados
+
+
+def verificar_codigos(codigos, igreja_id=None):
+    """
+    Resultado por código, na ordem recebida. Com `igreja_id`, carteirinhas de
+    outra igreja aparecem como 'outra_igreja' (sem expor os dados do membro).
+    """
+    autenticos = {codigo: verificar(codigo) for codigo in codigos}
+    dados = _carregar(sorted({ids[1] for ids in autenticos.values() if ids}))
+
+    resultados = []
+    for codigo in codigos:
+        ids = autenticos[codigo]
+        resultado = {'codigo': codigo, 'valido': ids is not None}
+        membro = dados.get(ids[1]) if ids else None
+        if ids is None:
+            resultado['situacao'] = 'invalido'
+        elif membro is None or membro['igreja_id'] != ids[0]:
+            resultado['situacao'] = 'nao_encontrado'
+        elif igreja_id is not None and membro['igreja_id'] != igreja_id:
+            resultado['situacao'] = 'outra_igreja'
+        else:
+            resultado.update(membro_id=ids[1], nome=membro['nome'], cargo=membro['cargo'],
+                             situacao=membro['situacao'])
+        resultados.append(resultado)
+    return resultados
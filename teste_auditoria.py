@@ -1,6 +1,8 @@
-from app import app
+from app import create_app
 from models import db, Membro, Igreja
 
+app = create_app()
+
 with app.app_context():
     print("-" * 30)
     print("AUDITORIA DO BANCO DE DADOS (SEM FILTRO SAAS)")
@@ -0,0 +1,239 @@
+"""
+Auditoria assíncrona.
+
+As rotas chamam registrar_log() ANTES do commit da própria transação. O evento fica
+pendurado na sessão e só segue adiante se o commit acontecer (rollback descarta).
+
+- Modo 'async' (padrão): depois do commit, o evento vai para um spool local
+  (arquivo .jsonl por processo, com PID e um identificador da partida, já que
+  PIDs se repetem entre reinícios de contêiner) e para uma fila em memória. Uma thread de fundo
+  grava a fila em lotes com INSERT de várias linhas. Se o processo cair antes
+  disso, o spool é reprocessado pelo próximo processo que subir.
+- Modo 'sync' (testes/scripts): o LogAuditoria entra na mesma transação da rota,
+  como era antes, sem thread nem spool.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flask_login import current_user
+from models import db, LogAuditoria
+
+CHAVE_PENDENTES = 'auditoria_pendente'
+
+
+def registrar_log(acao, entidade, id_ref, detalhes, usuario_id=None, igreja_id=None):
+    """Registra um evento de auditoria na transação atual (gravado quando ela fizer commit)."""
+    try:
+        if current_user and current_user.is_authenticated:
+            if usuario_id is None:
+                usuario_id = current_user.id
+            if igreja_id is None:
+                igreja_id = current_user.igreja_id
+    except Exception:
+        pass
+
+    dados = {
+        'data_hora': datetime.utcnow(),
+        'acao': acao,
+        'entidade': entidade,
+        'entidade_id': id_ref,
+        'detalhes': detalhes,
+        'usuario_id': usuario_id,
+        'igreja_id': igreja_id,
+    }
+    if auditoria.modo == 'sync':
+        db.session.add(LogAuditoria(**dados))
+    else:
+        db.session.info.setdefault(CHAVE_PENDENTES, []).append(dados)
+
+
+class AuditoriaWriter:
+    def __init__(self):
+        self.app = None
+        self.modo = 'sync'
+        self._fila = queue.Queue()
+        self._lock_spool = threading.Lock()
+        self._lock_thread = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._partida = uuid.uuid4().hex[:12]
+        # Eventos deste processo já no spool e ainda sem commit no banco (na fila ou num
+        # lote em gravação). Só com zero o spool pode ser truncado.
+        self._pendentes = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.modo = app.config.get('AUDITORIA_MODO', 'async')
+        self.tamanho_lote = app.config.get('AUDITORIA_TAMANHO_LOTE', 200)
+        self.intervalo = app.config.get('AUDITORIA_INTERVALO', 1.0)
+        self.pasta_spool = app.config.get('AUDITORIA_SPOOL_DIR')
+        app.extensions['auditoria'] = self
+
+    # --- Lado da requisição ---
+
+    def enfileirar(self, eventos):
+        self._garantir_thread()
+        with self._lock_spool:
+            # Spool primeiro: se o processo cair, o evento não se perde
+            with open(self._caminho_spool(), 'a', encoding='utf-8') as spool:
+                for dados in eventos:
+                    spool.write(json.dumps(dados, default=str) + '\n')
+            for dados in eventos:
+                self._fila.put(dados)
+            self._pendentes += len(eventos)
+
+    def descarregar(self):
+        """
+        Grava imediatamente tudo o que estiver na fila (usado no desligamento). Se a thread
+        ainda tiver um lote em gravação, o spool fica como está e é reprocessado depois.
+        """
+        lote = self._drenar(limite=None)
+        if lote:
+            self._gravar(lote)
+            self._confirmar(len(lote))
+
+    # --- Thread de fundo ---
+
+    def _garantir_thread(self):
+        with self._lock_thread:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Após um fork (gunicorn) a fila herdada pertence ao processo pai
+                self._fila = queue.Queue()
+                self._pendentes = 0
+                self._pid = os.getpid()
+                self._partida = uuid.uuid4().hex[:12]  # spool próprio, nunca o de outro processo
+            self._thread = threading.Thread(target=self._executar, name='auditoria-writer', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        self._reprocessar_spools_orfaos()
+        while True:
+            lote = self._drenar(limite=self.tamanho_lote, espera=self.intervalo)
+            if not lote:
+                continue
+            try:
+                self._gravar(lote)
+            except Exception:
+                # Banco fora do ar: devolve para a fila e tenta de novo (continua no spool)
+                self.app.logger.exception('Erro ao gravar auditoria')
+                for dados in lote:
+                    self._fila.put(dados)
+                time.sleep(self.intervalo)
+                continue
+            self._confirmar(len(lote))
+
+    def _drenar(self, limite, espera=None):
+        lote = []
+        try:
+            if espera is not None:
+                lote.append(self._fila.get(timeout=espera))
+            while limite is None or len(lote) < limite:
+                lote.append(self._fila.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def _gravar(self, lote):
+        linhas = []
+        for dados in lote:
+            dados = dict(dados)
+            if isinstance(dados['data_hora'], str):
+                dados['data_hora'] = datetime.fromisoformat(dados['data_hora'])
+            dados.setdefault('igreja_id', None)  # spools gravados antes da coluna existir
+            linhas.append(dados)
+        with self.app.app_context():
+            # INSERT com várias linhas de uma vez (insertmanyvalues do SQLAlchemy 2)
+            db.session.execute(db.insert(LogAuditoria), linhas)
+            db.session.commit()
+            db.session.remove()
+
+    # --- Spool ---
+
+    def _caminho_spool(self):
+        os.makedirs(self.pasta_spool, exist_ok=True)
+        return os.path.join(self.pasta_spool, f'spool_{os.getpid()}_{self._partida}.jsonl')
+
+    def _confirmar(self, quantidade):
+        """Lote com commit feito. Sem pendentes, tudo o que está no spool já foi para o banco."""
+        # Sob o lock ninguém escreve no spool. A fila vazia não basta: o lote que a
+        # thread drenou e ainda está gravando também só existe no spool.
+        with self._lock_spool:
+            self._pendentes -= quantidade
+            if self._pendentes == 0:
+                open(self._caminho_spool(), 'w').close()
+
+    def _reprocessar_spools_orfaos(self):
+        """
+        Grava eventos deixados por processos que morreram antes de descarregar a fila.
+        Todo spool que não é o deste processo e cujo PID não está vivo em outro
+        processo é reprocessado, inclusive o de uma partida anterior com o mesmo
+        PID (comum em contêiner reiniciado) e os antigos spool_<pid>.jsonl.
+        """
+        proprio = self._caminho_spool()
+        for caminho in glob.glob(os.path.join(self.pasta_spool, 'spool_*.jsonl')):
+            if caminho == proprio:
+                continue
+            try:
+                pid = int(os.path.basename(caminho)[len('spool_'):-len('.jsonl')].split('_')[0])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _processo_vivo(pid):
+                continue
+            reivindicado = f'{caminho}.{os.getpid()}.replay'
+            try:
+                os.rename(caminho, reivindicado)  # atômico: só um processo pega o arquivo
+            except OSError:
+                continue
+            with open(reivindicado, encoding='utf-8') as spool:
+                lote = [json.loads(linha) for linha in spool if linha.strip()]
+            try:
+                for inicio in range(0, len(lote), self.tamanho_lote):
+                    self._gravar(lote[inicio:inicio + self.tamanho_lote])
+                os.remove(reivindicado)
+            except Exception:
+                self.app.logger.exception('Erro ao reprocessar spool de auditoria')
+                os.rename(reivindicado, caminho)
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+auditoria = AuditoriaWriter()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apos_commit(session):
+    pendentes = session.info.pop(CHAVE_PENDENTES, None)
+    if pendentes:
+        auditoria.enfileirar(pendentes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _apos_rollback(session):
+    session.info.pop(CHAVE_PENDENTES, None)
+
+
+@atexit.register
+def _ao_encerrar():
+    if auditoria.app is not None and auditoria.modo == 'async' and auditoria._pid == os.getpid():
+        try:
+            auditoria.descarregar()
+        except Exception:
+            pass
@@ -0,0 +1,124 @@
+"""
+Login: custo do hash configurável, rehash transparente e limite de tentativas.
+
+- O algoritmo/custo vem de SENHA_HASH_METODO (formato do werkzeug, ex.:
+  'scrypt:32768:8:1' ou 'pbkdf2:sha256:1000000'). Hashes antigos continuam
+  válidos; no primeiro login certo a senha é regravada com o método atual.
+- Falhas são contadas numa janela deslizante por e-mail e por IP. Estourado o
+  limite, o login é recusado ANTES de calcular o hash: um ataque de força bruta
+  não consome a CPU que os usuários de verdade precisam. Login certo não conta.
+
+O contador padrão é em memória (por processo). Para dividir a contagem entre
+workers, troque `limitador_login` por um objeto com os mesmos métodos
+(bloqueado_por, registrar_falha, limpar), por exemplo sobre o Redis.
+"""
+import threading
+import time
+from collections import deque
+from werkzeug.security import generate_password_hash, check_password_hash
+from models import db, Usuario
+
+
+class LimitadorTentativas:
+    """Janela deslizante de falhas por chave ('email:...', 'ip:...')."""
+
+    LIMITE_CHAVES = 10000  # acima disso, chaves sem falhas recentes são descartadas
+
+    def __init__(self, janela, limites):
+        self.janela = janela
+        self.limites = limites  # prefixo da chave -> máximo de falhas na janela
+        self._falhas = {}  # chave -> deque de instantes (monotonic)
+        self._lock = threading.Lock()
+
+    def _recentes(self, chave, agora):
+        falhas = self._falhas.get(chave)
+        if falhas is None:
+            return None
+        while falhas and falhas[0] <= agora - self.janela:
+            falhas.popleft()
+        return falhas
+
+    def bloqueado_por(self, *chaves):
+        """Segundos até liberar a chave mais restrita (0 se nenhuma estiver bloqueada)."""
+        agora = time.monotonic()
+        espera = 0
+        with self._lock:
+            for chave in chaves:
+                falhas = self._recentes(chave, agora)
+                limite = self.limites[chave.split(':', 1)[0]]
+                if falhas and len(falhas) >= limite:
+                    # Libera quando a falha que estourou o limite sair da janela
+                    espera = max(espera, falhas[-limite] + self.janela - agora)
+        return int(espera) + 1 if espera else 0
+
+    def registrar_falha(self, *chaves):
+        agora = time.monotonic()
+        with self._lock:
+            if len(self._falhas) > self.LIMITE_CHAVES:
+                self._falhas = {c: f for c, f in self._falhas.items() if self._recentes(c, agora)}
+            for chave in chaves:
+                falhas = self._falhas.setdefault(chave, deque())
+                falhas.append(agora)
+                # Só as últimas `limite` falhas importam para decidir o bloqueio
+                while len(falhas) > self.limites[chave.split(':', 1)[0]]:
+                    falhas.popleft()
+
+    def limpar(self, *chaves):
+        with self._lock:
+            for chave in chaves or list(self._falhas):
+                self._falhas.pop(chave, None)
+
+
+limitador_login = LimitadorTentativas(janela=300, limites={'email': 5, 'ip': 0})
+_hash_falso = None
+
+
+def configurar_autenticacao(app):
+    global _hash_falso
+    metodo = app.config.get('SENHA_HASH_METODO', Usuario.metodo_hash)
+    if ':' not in metodo:
+        # Forma curta ('scrypt', 'pbkdf2'): descobre os parâmetros padrão para comparar com os hashes salvos
+        metodo = generate_password_hash('', method=metodo).split('$', 1)[0]
+    Usuario.metodo_hash = metodo
+    _hash_falso = None
+
+    limitador_login.janela = app.config.get('LOGIN_JANELA', 300)
+    limitador_login.limites = {
+        'email': app.config.get('LOGIN_TENTATIVAS_EMAIL', 5),
+        'ip': app.config.get('LOGIN_TENTATIVAS_IP', 0),  # 0: sem limite por IP
+    }
+
+
+def _conferir_sem_usuario(senha):
+    """Gasta o mesmo tempo de um login real para e-mail inexistente (não revela quais e-mails existem)."""
+    global _hash_falso
+    if _hash_falso is None:
+        _hash_falso = generate_password_hash('senha-inexistente', method=Usuario.metodo_hash)
+    check_password_hash(_hash_falso, senha)
+
+
+def autenticar(email, senha, ip):
+    """
+    Devolve (usuario, espera): o usuário se a senha confere, ou None; `espera` > 0
+    indica quantos segundos faltam para liberar um e-mail/IP bloqueado.
+    """
+    email = (email or '').strip()
+    chaves = (f'email:{email.lower()}',)
+    if limitador_login.limites.get('ip') and ip:
+        chaves += (f'ip:{ip}',)
+    espera = limitador_login.bloqueado_por(*chaves)
+    if espera:
+        return None, espera
+
+    usuario = Usuario.query.filter_by(email=email).first()
+    if usuario is None:
+        _conferir_sem_usuario(senha)
+    elif usuario.check_senha(senha):
+        limitador_login.limpar(chaves[0])
+        if usuario.precisa_rehash():
+            usuario.set_senha(senha)
+            db.session.commit()
+        return usuario, 0
+
+    limitador_login.registrar_falha(*chaves)
+    return None, 0
@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class OrcamentoSQLExcedido(AssertionError):
+    """Uma rota disparou mais instruções SQL do que o orçamento permitido."""
+
+
+class RespostaInesperada(AssertionError):
+    """A rota verificada respondeu com outro status (ex.: 302 para o login, 500)."""
+
+
+class ContadorSQL:
+    """
+    Conta as instruções SQL enviadas ao banco enquanto estiver ativo.
+
+        with ContadorSQL(db.engine) as contador:
+            cliente.get('/financeiro/')
+        print(contador.total, contador.instrucoes)
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.instrucoes = []
+        self.tempo_total = 0.0
+        self._inicio = None
+
+    @property
+    def total(self):
+        return len(self.instrucoes)
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        self._inicio = time.perf_counter()
+
+    def _depois(self, conn, cursor, statement, parameters, context, executemany):
+        if self._inicio is not None:
+            self.tempo_total += time.perf_counter() - self._inicio
+            self._inicio = None
+        self.instrucoes.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._antes)
+        event.listen(self.engine, 'after_cursor_execute', self._depois)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._antes)
+        event.remove(self.engine, 'after_cursor_execute', self._depois)
+        return False
+
+
+@contextmanager
+def orcamento_sql(engine, maximo, rotulo='bloco'):
+    """Falha (OrcamentoSQLExcedido) se o bloco executar mais de `maximo` instruções."""
+    with ContadorSQL(engine) as contador:
+        yield contador
+    if contador.total > maximo:
+        detalhes = '\n'.join(f'  {i + 1}. {sql}' for i, sql in enumerate(contador.instrucoes))
+        raise OrcamentoSQLExcedido(
+            f'{rotulo}: {contador.total} instruções SQL (orçamento: {maximo})\n{detalhes}'
+        )
+
+
+def verificar_rota(cliente, url, maximo, metodo='get', status=200, **kwargs):
+    """
+    Helper para testes: faz a requisição pelo test client do Flask e falha
+    se a rota passar do orçamento de consultas (pega N+1 em listagens) ou
+    responder com outro status que não `status` (RespostaInesperada): um
+    redirecionamento para o login também "cabe" no orçamento.
+
+        resposta = verificar_rota(cliente, '/financeiro/', maximo=6)
+    """
+    from models import db
+
+    with cliente.application.app_context():
+        engine = db.engine
+    with orcamento_sql(engine, maximo, rotulo=f'{metodo.upper()} {url}'):
+        resposta = getattr(cliente, metodo)(url, **kwargs)
+        resposta.get_data()  # respostas em streaming consultam o banco enquanto são lidas
+        if resposta.status_code != status:
+            raise RespostaInesperada(f'{metodo.upper()} {url}: status {resposta.status_code} (esperado: {status})')
+    return resposta
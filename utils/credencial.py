@@ -0,0 +1,62 @@
+"""
+Código assinado do QR da carteirinha.
+
+Formato: E1.<igreja_id>.<membro_id>.<assinatura>, onde a assinatura é um HMAC-SHA256
+truncado em 10 bytes (80 bits) e escrito em base32. Só maiúsculas, dígitos e '.':
+cabe no modo alfanumérico do QR (módulos menores, leitura mais rápida na porta).
+
+A chave vem de CARTEIRINHA_CHAVE (ou, na falta dela, da SECRET_KEY). Trocar a
+chave invalida todas as carteirinhas impressas. Processos que não passam pelo
+create_app (o pool das carteirinhas) recebem a chave por definir_chave(); sem
+chave, assinar e verificar falham em vez de usar um HMAC de chave vazia.
+"""
+import base64
+import hashlib
+import hmac
+import re
+
+PREFIXO = 'E1'
+BYTES_ASSINATURA = 10
+# Só ASCII: isdigit() aceitaria '²' e int() de milhares de dígitos estoura (o leitor da porta nunca pode dar 500)
+FORMATO = re.compile(r'E1\.(\d{1,10})\.(\d{1,10})\.([A-Z2-7]{16})', re.ASCII)
+
+_chave = b''
+
+
+def definir_chave(chave):
+    global _chave
+    _chave = chave.encode('utf-8') if isinstance(chave, str) else bytes(chave or b'')
+
+
+def chave_atual():
+    return _chave
+
+
+def configurar_credencial(app):
+    definir_chave(app.config.get('CARTEIRINHA_CHAVE') or app.config['SECRET_KEY'])
+
+
+def _assinatura(igreja_id, membro_id):
+    if not _chave:
+        raise RuntimeError('Chave das carteirinhas não configurada (configurar_credencial/definir_chave)')
+    mensagem = f'{PREFIXO}.{igreja_id}.{membro_id}'.encode('ascii')
+    digest = hmac.new(_chave, mensagem, hashlib.sha256).digest()[:BYTES_ASSINATURA]
+    return base64.b32encode(digest).decode('ascii')
+
+
+def assinar(igreja_id, membro_id):
+    """Código que vai no QR da carteirinha."""
+    return f'{PREFIXO}.{igreja_id}.{membro_id}.{_assinatura(igreja_id, membro_id)}'
+
+
+def verificar(codigo):
+    """(igreja_id, membro_id) se o código for autêntico, senão None. Não consulta o banco."""
+    if not isinstance(codigo, str):
+        return None
+    encontrado = FORMATO.fullmatch(codigo.strip().upper())
+    if encontrado is None:
+        return None
+    igreja_id, membro_id = int(encontrado[1]), int(encontrado[2])
+    if not hmac.compare_digest(encontrado[3], _assinatura(igreja_id, membro_id)):
+        return None
+    return igreja_id, membro_id
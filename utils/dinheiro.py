@@ -0,0 +1,34 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENTAVO = Decimal('0.01')
+
+
+def para_centavos(valor):
+    """
+    Converte o valor digitado em centavos (int), sem passar por float.
+    Aceita '10.50', '10,50', '1.234,56', Decimal ou int. Qualquer valor inválido
+    (inclusive 'NaN', 'Infinity' e '1e400') levanta ValueError.
+    """
+    if isinstance(valor, int):
+        return valor * 100
+    if not isinstance(valor, Decimal):
+        texto = str(valor).strip().replace('R$', '').replace(' ', '')
+        if ',' in texto:
+            # Formato brasileiro: ponto é milhar, vírgula é decimal
+            texto = texto.replace('.', '').replace(',', '.')
+        try:
+            valor = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError(f'Valor inválido: {texto}')
+    if not valor.is_finite():
+        raise ValueError(f'Valor inválido: {valor}')
+    try:
+        return int((valor * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        # Expoente grande demais para a precisão do contexto (ex.: '1e400')
+        raise ValueError(f'Valor inválido: {valor}')
+
+
+def de_centavos(centavos):
+    """Centavos (int) -> Decimal com 2 casas, para exibir e somar sem erro de arredondamento."""
+    return (Decimal(centavos or 0) / 100).quantize(CENTAVO)
@@ -0,0 +1,290 @@
+"""
+Instrumentação por requisição (opcional: INSTRUMENTACAO=1).
+
+Para cada requisição mede o tempo total, as instruções SQL (quantidade e tempo,
+via eventos do Engine), o tempo de templates Jinja e o de renderização pesada
+(PIL nas carteirinhas, FPDF nos documentos, marcados com `cronometro('render')`).
+
+- Header Server-Timing em toda resposta (aparece no DevTools do navegador).
+- GET /metrics no formato texto do Prometheus, com histogramas por blueprint.
+
+Com vários workers do gunicorn, cada scrape cai num worker qualquer. Para os
+contadores não "voltarem" de um scrape para o outro, cada processo grava um
+retrato dos seus histogramas em METRICAS_DIR (no máximo a cada
+INTERVALO_GRAVACAO segundos, troca atômica de arquivo), e o /metrics soma os
+retratos de todos os processos. Isso inclui os que já terminaram, para que as
+séries nunca diminuam; limpar a pasta no deploy equivale a um reset.
+
+Sem METRICAS_TOKEN o /metrics não é publicado. Respostas em streaming (zip,
+csv) são medidas até o início do envio.
+"""
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from flask import g, has_request_context, request, Response, abort, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+ETAPAS = ('sql', 'template', 'render')
+INTERVALO_GRAVACAO = 1.0  # segundos entre retratos do processo em METRICAS_DIR
+
+
+class MedicaoRequisicao:
+    __slots__ = ('inicio', 'consultas', 'tempos', 'inicio_template')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempos = dict.fromkeys(ETAPAS, 0.0)
+        self.inicio_template = []
+
+
+def _medicao_atual():
+    if not has_request_context():
+        return None
+    return g.get('_instrumentacao')
+
+
+@contextmanager
+def cronometro(etapa='render'):
+    """Soma o tempo do bloco na etapa da requisição atual (não faz nada se a instrumentação estiver desligada)."""
+    medicao = _medicao_atual()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.tempos[etapa] += time.perf_counter() - inicio
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus, com um rótulo por série."""
+
+    def __init__(self, nome, ajuda, buckets):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = buckets
+        self._series = {}  # rotulos (tupla de pares) -> [contagens por bucket..., soma, total]
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        serie = self._series.get(chave)
+        if serie is None:
+            serie = self._series[chave] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def retrato(self):
+        return [[list(map(list, chave)), serie] for chave, serie in self._series.items()]
+
+    def exportar(self, series=None):
+        """Formato texto do Prometheus (das séries do processo, ou das somadas em `series`)."""
+        series = self._series if series is None else series
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        for chave, serie in sorted(series.items()):
+            rotulos = ','.join(f'{nome}="{valor}"' for nome, valor in chave)
+            separador = ',' if rotulos else ''
+            for limite, contagem in zip(self.buckets, serie):
+                linhas.append(f'{self.nome}_bucket{{{rotulos}{separador}le="{limite}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{rotulos}{separador}le="+Inf"}} {serie[-1]}')
+            linhas.append(f'{self.nome}_sum{{{rotulos}}} {serie[-2]:.6f}')
+            linhas.append(f'{self.nome}_count{{{rotulos}}} {serie[-1]}')
+        return linhas
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pasta = None
+        self._pid = None
+        self._arquivo = None
+        self._gravado_em = 0.0
+        self._criar_histogramas()
+
+    def _criar_histogramas(self):
+        self.duracao = Histograma('ekklesia_requisicao_segundos',
+                                  'Tempo total da requisição por blueprint.', BUCKETS_SEGUNDOS)
+        self.etapas = Histograma('ekklesia_requisicao_etapa_segundos',
+                                 'Tempo gasto em SQL, templates e renderização (PIL/FPDF) por requisição.',
+                                 BUCKETS_SEGUNDOS)
+        self.consultas = Histograma('ekklesia_requisicao_consultas_sql',
+                                    'Instruções SQL por requisição.', BUCKETS_CONSULTAS)
+
+    def _histogramas(self):
+        return (self.duracao, self.etapas, self.consultas)
+
+    def _verificar_processo(self):
+        # Após um fork (gunicorn com --preload) o processo recomeça do zero, com arquivo próprio
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._arquivo = None
+            self._criar_histogramas()
+
+    def registrar(self, blueprint, total, medicao):
+        with self._lock:
+            self._verificar_processo()
+            self.duracao.observar(total, blueprint=blueprint)
+            self.consultas.observar(medicao.consultas, blueprint=blueprint)
+            for etapa, segundos in medicao.tempos.items():
+                self.etapas.observar(segundos, blueprint=blueprint, etapa=etapa)
+            if self.pasta and time.monotonic() - self._gravado_em >= INTERVALO_GRAVACAO:
+                self._gravar()
+
+    def _gravar(self):
+        """Retrato dos histogramas deste processo (chamado com o lock)."""
+        if self._arquivo is None:
+            os.makedirs(self.pasta, exist_ok=True)
+            # PID + identificador da partida: PIDs se repetem entre reinícios
+            self._arquivo = os.path.join(self.pasta, f'metricas_{os.getpid()}_{uuid.uuid4().hex[:12]}.json')
+        temporario = f'{self._arquivo}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({h.nome: h.retrato() for h in self._histogramas()}, arquivo)
+        os.replace(temporario, self._arquivo)
+        self._gravado_em = time.monotonic()
+
+    def _somar_processos(self):
+        """{nome do histograma: {rótulos: série}} somando os retratos de todos os processos."""
+        somadas = {h.nome: {} for h in self._histogramas()}
+        for caminho in glob.glob(os.path.join(self.pasta, 'metricas_*.json')):
+            try:
+                with open(caminho, encoding='utf-8') as arquivo:
+                    retrato = json.load(arquivo)
+            except (OSError, ValueError):
+                continue
+            for nome, series in retrato.items():
+                destino = somadas.get(nome)
+                if destino is None:
+                    continue
+                for rotulos, serie in series:
+                    chave = tuple(map(tuple, rotulos))
+                    atual = destino.get(chave)
+                    destino[chave] = serie if atual is None else [a + b for a, b in zip(atual, serie)]
+        return somadas
+
+    def exportar(self):
+        with self._lock:
+            self._verificar_processo()
+            if not self.pasta:
+                linhas = [l for h in self._histogramas() for l in h.exportar()]
+            else:
+                self._gravar()
+                somadas = self._somar_processos()
+                linhas = [l for h in self._histogramas() for l in h.exportar(somadas[h.nome])]
+        return '\n'.join(linhas) + '\n'
+
+    def descarregar(self):
+        """Grava o último retrato (desligamento do processo)."""
+        with self._lock:
+            if self.pasta and self._pid == os.getpid():
+                self._gravar()
+
+    def limpar(self):
+        with self._lock:
+            self._criar_histogramas()
+
+
+metricas = Metricas()
+atexit.register(metricas.descarregar)
+
+
+# --- Eventos do SQLAlchemy (nível de classe: vale para qualquer Engine criado depois) ---
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    if _medicao_atual() is not None:
+        conn.info.setdefault('instrumentacao_inicio', []).append(time.perf_counter())
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    medicao = _medicao_atual()
+    inicios = conn.info.get('instrumentacao_inicio')
+    if medicao is None or not inicios:
+        return
+    medicao.consultas += 1
+    medicao.tempos['sql'] += time.perf_counter() - inicios.pop()
+
+
+def _erro_sql(contexto):
+    # Instrução que falhou não passa pelo after_cursor_execute: descarta o início pendente
+    inicios = contexto.connection.info.get('instrumentacao_inicio') if contexto.connection else None
+    if inicios:
+        inicios.pop()
+
+
+# --- Templates (sinais do Flask) ---
+
+def _antes_template(sender, template, context, **extra):
+    medicao = _medicao_atual()
+    if medicao is not None:
+        medicao.inicio_template.append(time.perf_counter())
+
+
+def _depois_template(sender, template, context, **extra):
+    medicao = _medicao_atual()
+    if medicao is not None and medicao.inicio_template:
+        decorrido = time.perf_counter() - medicao.inicio_template.pop()
+        if not medicao.inicio_template:  # includes/extends aninhados contam só uma vez
+            medicao.tempos['template'] += decorrido
+
+
+def server_timing(medicao, total):
+    return ', '.join([
+        f'sql;dur={medicao.tempos["sql"] * 1000:.1f};desc="{medicao.consultas} consultas"',
+        f'tpl;dur={medicao.tempos["template"] * 1000:.1f}',
+        f'render;dur={medicao.tempos["render"] * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+def configurar_instrumentacao(app):
+    """Liga a instrumentação se INSTRUMENTACAO estiver ativo na configuração."""
+    if not app.config.get('INSTRUMENTACAO'):
+        return
+
+    metricas.pasta = app.config.get('METRICAS_DIR')
+
+    if not event.contains(Engine, 'before_cursor_execute', _antes_sql):
+        event.listen(Engine, 'before_cursor_execute', _antes_sql)
+        event.listen(Engine, 'after_cursor_execute', _depois_sql)
+        event.listen(Engine, 'handle_error', _erro_sql)
+    before_render_template.connect(_antes_template, app)
+    template_rendered.connect(_depois_template, app)
+
+    @app.before_request
+    def _iniciar_medicao():
+        if request.endpoint not in ('static', 'metricas'):
+            g._instrumentacao = MedicaoRequisicao()
+
+    @app.after_request
+    def _encerrar_medicao(response):
+        medicao = g.pop('_instrumentacao', None)
+        if medicao is not None:
+            total = time.perf_counter() - medicao.inicio
+            response.headers['Server-Timing'] = server_timing(medicao, total)
+            metricas.registrar(request.blueprint or 'app', total, medicao)
+        return response
+
+    token = app.config.get('METRICAS_TOKEN')
+    if not token:
+        # Sem token o /metrics ficaria público: só o Server-Timing continua ligado
+        app.logger.warning('INSTRUMENTACAO=1 sem METRICAS_TOKEN: /metrics não será publicado.')
+        return
+    esperado = f'Bearer {token}'.encode('utf-8')
+
+    @app.route('/metrics', endpoint='metricas')
+    def _metricas():
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode('utf-8'), esperado):
+            abort(401)
+        return Response(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
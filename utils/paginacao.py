@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import tuple_
+
+
+def codificar_cursor(valores):
+    """Transforma os valores da última linha da página num cursor opaco (base64)."""
+    normalizados = []
+    for valor in valores:
+        if isinstance(valor, datetime):
+            normalizados.append({'dt': valor.isoformat()})
+        elif isinstance(valor, date):
+            normalizados.append({'d': valor.isoformat()})
+        else:
+            normalizados.append(valor)
+    bruto = json.dumps(normalizados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor. Cursor inválido vira None (volta para a 1ª página)."""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = []
+        for valor in json.loads(bruto):
+            if isinstance(valor, dict) and 'dt' in valor:
+                valor = datetime.fromisoformat(valor['dt'])
+            elif isinstance(valor, dict) and 'd' in valor:
+                valor = date.fromisoformat(valor['d'])
+            valores.append(valor)
+        return valores
+    except (ValueError, TypeError):
+        return None
+
+
+def paginar_keyset(consulta, colunas, cursor=None, limite=50, decrescente=False):
+    """
+    Paginação por chave (keyset/seek): em vez de OFFSET, continua a partir da
+    última linha vista usando comparação de tupla, ex: (nome, id) > ('Maria', 42).
+    O custo de cada página fica constante, não importa o quão fundo se navega.
+
+    `colunas` define a ordenação e precisa terminar numa coluna única (geralmente o id).
+    Retorna (itens, proximo_cursor); proximo_cursor é None na última página.
+    """
+    valores = decodificar_cursor(cursor)
+    if valores and len(valores) == len(colunas):
+        chave = tuple_(*colunas)
+        consulta = consulta.filter(chave < tuple_(*valores) if decrescente else chave > tuple_(*valores))
+
+    ordem = [c.desc() for c in colunas] if decrescente else list(colunas)
+    # Busca um item a mais só para saber se existe próxima página
+    itens = consulta.order_by(*ordem).limit(limite + 1).all()
+
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        ultimo = itens[-1]
+        proximo = codificar_cursor([getattr(ultimo, c.key) for c in colunas])
+    return itens, proximo
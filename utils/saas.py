@@ -1,48 +1,80 @@
+from functools import lru_cache
+from flask import g, has_app_context
+from flask_login import current_user, user_logged_in, user_logged_out
 from sqlalchemy import event
 from sqlalchemy.orm import Session, with_loader_criteria
-from flask_login import current_user
-from models import Membro, Lancamento, Usuario
+from models import Membro, Lancamento, SaldoMensal, LogAuditoria
 
-def configurar_isolamento_saas(db_session):
+
+@lru_cache(maxsize=1024)
+def criterios_do_tenant(tenant_id):
+    """
+    Monta UMA vez (por igreja) as opções de filtro do Guarda-Costas.
+
+    O SQLAlchemy identifica o lambda pelo código, e a variável 'tenant_id' do
+    closure vira parâmetro (igreja_id = ?). Por isso todas as igrejas
+    compartilham o mesmo SQL compilado no cache de statements.
+    """
+    return (
+        # Protege a tabela Membros
+        with_loader_criteria(Membro, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+        # Protege a tabela Financeiro
+        with_loader_criteria(Lancamento, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+        with_loader_criteria(SaldoMensal, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+        # Protege o visualizador de auditoria
+        with_loader_criteria(LogAuditoria, lambda cls: cls.igreja_id == tenant_id, include_aliases=True),
+    )
+
+
+def definir_tenant(tenant_id):
+    """Fixa a igreja da requisição atual (chamado uma vez, quando o usuário é carregado)."""
+    g.saas_tenant_id = tenant_id
+    g.saas_criterios = criterios_do_tenant(tenant_id) if tenant_id is not None else None
+
+
+def limpar_tenant():
+    g.pop('saas_tenant_id', None)
+    g.pop('saas_criterios', None)
+
+
+def interceptar_consulta(execute_state):
     """
-    Ativa o 'Guarda-Costas' do Banco de Dados.
     Intercepta TODAS as consultas SQL e adiciona o filtro da igreja automaticamente.
+    Só lê o que já foi preparado para a requisição: nada de current_user aqui
+    (ler current_user dentro do hook disparava o user_loader em recursão).
     """
-    
-    @event.listens_for(Session, 'do_orm_execute')
-    def interceptar_consulta(execute_state):
-        
-        # 1. Só age se for uma consulta de LEITURA (SELECT)
-        if not execute_state.is_select:
-            return
-
-        # 2. Só age se tiver alguém logado
-        if not current_user or not current_user.is_authenticated:
-            return
-            
-        # 3. TRUQUE ANTI-RECURSÃO (Safety Fix):
-        # Precisamos capturar o ID da igreja AGORA, numa variável local.
-        # Se tentarmos ler 'current_user.igreja_id' dentro do lambda do SQLAlchemy,
-        # isso pode disparar uma nova consulta e criar um Loop Infinito.
-        try:
-            tenant_id = current_user.igreja_id
-        except:
-            # Se der erro ao ler o ID (ex: usuário ainda carregando), não aplica filtro
-            return
-
-        # 4. APLICA O FILTRO AUTOMÁTICO (Simulação de RLS)
-        execute_state.statement = execute_state.statement.options(
-            # Protege a tabela Membros
-            with_loader_criteria(
-                Membro, 
-                lambda cls: cls.igreja_id == tenant_id,
-                include_aliases=True
-            ),
-            # Protege a tabela Financeiro
-            with_loader_criteria(
-                Lancamento, 
-                lambda cls: cls.igreja_id == tenant_id,
-                include_aliases=True
-            )
-            
-        )
\ No newline at end of file
+    # 1. Só age se for uma consulta de LEITURA (SELECT)
+    if not execute_state.is_select or not has_app_context():
+        return
+
+    # 2. Só age se a requisição tiver uma igreja definida (alguém logado)
+    criterios = g.get('saas_criterios')
+    if criterios is None:
+        return
+
+    # 3. APLICA O FILTRO AUTOMÁTICO (Simulação de RLS)
+    execute_state.statement = execute_state.statement.options(*criterios)
+
+
+def configurar_isolamento_saas(app):
+    """
+    Ativa o 'Guarda-Costas' do Banco de Dados.
+    O igreja_id é resolvido uma vez por requisição e reaproveitado em todas as consultas.
+    """
+    if not event.contains(Session, 'do_orm_execute', interceptar_consulta):
+        event.listen(Session, 'do_orm_execute', interceptar_consulta)
+
+    @app.before_request
+    def _resolver_tenant():
+        # Carrega o usuário logo no início (o user_loader roda sem filtro, como antes)
+        # e fixa a igreja para o resto da requisição.
+        if 'saas_tenant_id' not in g and current_user.is_authenticated:
+            definir_tenant(current_user.igreja_id)
+
+    @user_logged_in.connect_via(app)
+    def _ao_logar(sender, user, **extra):
+        definir_tenant(user.igreja_id)
+
+    @user_logged_out.connect_via(app)
+    def _ao_deslogar(sender, user, **extra):
+        limpar_tenant()
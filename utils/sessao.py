@@ -0,0 +1,98 @@
+"""
+Cache do usuário logado (o "principal" da sessão).
+
+O Flask-Login chama o user_loader em TODA requisição autenticada. Em vez de ir ao
+banco (usuário + igreja, que o PDFService lia de novo a cada página), guardamos uma
+cópia leve por alguns segundos no processo.
+
+Cada worker do gunicorn tem o seu cache. Invalidações explícitas só valem no
+processo atual; nos outros, o TTL limita quanto tempo um dado alterado sobrevive.
+"""
+import threading
+import time
+from flask_login import UserMixin
+from models import db, Usuario, Igreja
+
+CAMPOS_IGREJA = ('id', 'nome', 'cnpj', 'endereco', 'cidade_uf', 'responsavel', 'cargo_responsavel')
+
+
+class IgrejaSessao:
+    """Dados institucionais usados em cabeçalhos, rodapés e declarações."""
+
+    __slots__ = CAMPOS_IGREJA
+
+    def __init__(self, igreja):
+        for campo in CAMPOS_IGREJA:
+            setattr(self, campo, getattr(igreja, campo))
+
+
+class UsuarioSessao(UserMixin):
+    """Cópia somente-leitura do Usuario logado (mesmos atributos usados nas rotas e templates)."""
+
+    def __init__(self, usuario, igreja):
+        self.id = usuario.id
+        self.nome = usuario.nome
+        self.email = usuario.email
+        self.role = usuario.role
+        self.igreja_id = usuario.igreja_id
+        self.igreja = IgrejaSessao(igreja)
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+class CacheSessao:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._itens = {}  # user_id -> (expira_em, UsuarioSessao)
+        self._lock = threading.Lock()
+
+    def obter(self, user_id):
+        item = self._itens.get(user_id)
+        if item and item[0] > time.monotonic():
+            return item[1]
+        return None
+
+    def guardar(self, usuario_sessao):
+        with self._lock:
+            self._itens[usuario_sessao.id] = (time.monotonic() + self.ttl, usuario_sessao)
+
+    def invalidar_usuario(self, user_id):
+        with self._lock:
+            self._itens.pop(user_id, None)
+
+    def invalidar_igreja(self, igreja_id):
+        with self._lock:
+            for user_id in [uid for uid, (_, u) in self._itens.items() if u.igreja_id == igreja_id]:
+                del self._itens[user_id]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_sessao = CacheSessao(ttl=60)
+
+
+def configurar_cache_sessao(app):
+    cache_sessao.ttl = app.config.get('SESSAO_CACHE_TTL', 60)
+
+
+def carregar_usuario_sessao(user_id):
+    """user_loader: devolve do cache ou busca usuário + igreja numa única consulta."""
+    usuario_sessao = cache_sessao.obter(user_id)
+    if usuario_sessao is not None:
+        return usuario_sessao
+
+    linha = (db.session.query(Usuario, Igreja)
+             .join(Igreja, Usuario.igreja_id == Igreja.id)
+             .filter(Usuario.id == user_id)
+             .first())
+    if linha is None:
+        return None
+
+    usuario_sessao = UsuarioSessao(*linha)
+    if cache_sessao.ttl > 0:
+        cache_sessao.guardar(usuario_sessao)
+    return usuario_sessao
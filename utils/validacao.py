@@ -0,0 +1,72 @@
+import re
+import unicodedata
+from datetime import date, datetime
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y')
+
+
+def normalizar_cpf(valor):
+    """
+    Valida os dígitos verificadores e devolve o CPF no formato do cadastro
+    ('000.000.000-00'). Aceita com ou sem máscara; levanta ValueError se inválido.
+    """
+    digitos = re.sub(r'\D', '', str(valor or ''))
+    if len(digitos) < 11 and digitos:
+        digitos = digitos.zfill(11)  # Planilhas costumam comer os zeros à esquerda
+    if len(digitos) != 11 or digitos == digitos[0] * 11:
+        raise ValueError(f'CPF inválido: {valor}')
+    for posicao in (9, 10):
+        soma = sum(int(digitos[i]) * (posicao + 1 - i) for i in range(posicao))
+        verificador = (soma * 10) % 11 % 10
+        if verificador != int(digitos[posicao]):
+            raise ValueError(f'CPF inválido: {valor}')
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def ler_data(valor):
+    """Data de planilha (date/datetime do Excel ou texto dd/mm/aaaa, aaaa-mm-dd) -> date, ou None se vazia."""
+    if valor in (None, ''):
+        return None
+    if isinstance(valor, datetime):
+        data = valor.date()
+    elif isinstance(valor, date):
+        data = valor
+    else:
+        data = _converter_texto(str(valor).strip())
+    if not date(1900, 1, 1) <= data <= date.today():
+        raise ValueError(f'Data fora do intervalo: {data.strftime("%d/%m/%Y")}')
+    return data
+
+
+def _converter_texto(texto):
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Data inválida: {texto}')
+
+
+def sem_acento(texto):
+    """'João Conceição' -> 'joao conceicao' (minúsculo, sem acentos, só letras/dígitos e espaços)."""
+    decomposto = unicodedata.normalize('NFKD', str(texto or '')).lower()
+    sem_marcas = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', sem_marcas).split())
+
+
+def texto_busca_membro(nome, cpf=None, telefone=None):
+    """Conteúdo indexado para a busca de membros: nome normalizado + dígitos do CPF e do telefone."""
+    partes = [sem_acento(nome), re.sub(r'\D', '', cpf or ''), re.sub(r'\D', '', telefone or '')]
+    return ' '.join(p for p in partes if p)
+
+
+def termos_busca(consulta):
+    """
+    Termos normalizados de uma busca digitada. CPF/telefone com máscara viram
+    um termo só de dígitos ('123.456' -> ['123456']).
+    """
+    consulta = (consulta or '').strip()
+    if re.fullmatch(r'[\d\s.\-/()]+', consulta):
+        digitos = re.sub(r'\D', '', consulta)
+        return [digitos] if digitos else []
+    return sem_acento(consulta).split()